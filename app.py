@@ -8,15 +8,45 @@ Atributos principales:
     gestor_vehiculos: Manejador de operaciones CRUD para vehículos
     gestor_lista_espera: Manejador del sistema de cola de espera
     gestor_salidas: Manejador de salidas temporales de vehículos
+    servicios: Servicios en memoria de cada condominio
+    estimador_estancias: Estimador de la estancia de cada vehículo
+    motor_pilas: Motor en memoria de las pilas de vehículos por fila
+    cache_dashboard: Caché versionada de los datos del dashboard
+    cache_fragmentos: Caché del HTML de cada sección y fila del dashboard
+    importador: Importador masivo de usuarios y vehículos
+    activos_estaticos: Archivos estáticos con huella y precomprimidos
+    drenador_espera: Hilo que estaciona la lista de espera al liberarse espacio
+
+    estimador_estancias, motor_pilas, cache_dashboard, cache_fragmentos y
+    drenador_espera son proxies a los servicios del condominio de la
+    solicitud (ver app/condominios.py).
 """
 
-from flask import Flask, render_template, request, redirect, url_for
-import pyodbc
-from app.db_config import get_conexion
+import functools
+import io
+import math
+import os
+from flask import Flask, Response, g, render_template, request, redirect, url_for, jsonify
+from werkzeug.local import LocalProxy
+from app import condominios, metricas
+from app.db_config import (get_conexion, inicializar_pool, iniciar_unidad_trabajo,
+                           finalizar_unidad_trabajo, estadisticas_pool, escritura_para_cliente,
+                           RETRASO_REPLICA)
+from app.unidad_trabajo import ejecutar_al_terminar
 from app.models.usuario import Usuario, GestorUsuarios  
 from app.models.vehiculo import Vehiculo, GestorVehiculos
 from app.models.lista_espera import ListaEspera, GestorListaEspera
 from app.models.salidas_temporales import SalidaTemporal, GestorSalidasTemporales
+from app.models.pila_vehiculos import MotorPilas
+from app.ocupacion_compartida import OcupacionCompartida
+from app.models.estancias import EstimadorEstancias
+from app.cache_dashboard import CacheDashboard
+from app.fragmentos import CacheFragmentos, ExtensionFragmentos, version_de
+from app.estaticos import ActivosEstaticos
+from app.importacion import ImportadorMasivo, detectar_formato, leer_registros
+from app.perfilado import PerfiladorSolicitudes
+from app.drenado_espera import DrenadorListaEspera
+from app.archivado import ArchivadorHistorial
 from datetime import datetime, timedelta
 
 # Configuración inicial de Flask
@@ -26,6 +56,11 @@ app = Flask(
     static_folder='app/static'
 )
 app.config['DEBUG'] = True
+app.jinja_env.add_extension(ExtensionFragmentos)
+
+# Archivos estáticos con huella, precomprimidos y con caché immutable en /activos/
+activos_estaticos = ActivosEstaticos.desde_entorno(app.static_folder)
+activos_estaticos.registrar(app)
 
 # Inicialización de gestores
 gestor_usuarios = GestorUsuarios()
@@ -33,6 +68,183 @@ gestor_vehiculos = GestorVehiculos()
 gestor_lista_espera = GestorListaEspera()
 gestor_salidas = GestorSalidasTemporales()
 
+# Pre-calentamiento del pool de conexiones de cada condominio
+inicializar_pool()
+
+def crear_servicios(condominio) -> dict:
+    """
+    Crea los servicios en memoria de un condominio: estimador de estancias,
+    motor de pilas, cachés del dashboard y de sus fragmentos, drenado de la
+    lista de espera y archivado del historial.
+    Se invoca con el condominio activo, así que cargan desde su propia base.
+    
+    Args:
+        condominio: Configuración del condominio
+        
+    Returns:
+        dict: Servicios del condominio por nombre
+    """
+    # Estancias aprendidas de hora_entrada/hora_salida para asignar filas
+    estimador = EstimadorEstancias()
+    estimador.cargar()
+
+    # Motor en memoria de las pilas por fila (cargado una sola vez);
+    # con PARQUEO_OCUPACION_COMPARTIDA los procesos comparten la ocupación
+    motor = MotorPilas(estimador, ocupacion=OcupacionCompartida.desde_entorno(condominio.clave))
+    motor.cargar()
+
+    # Caché del dashboard invalidada por las rutas que modifican datos
+    cache = CacheDashboard.desde_entorno()
+
+    # HTML de las secciones y filas del dashboard por versión de sus datos
+    fragmentos = CacheFragmentos.desde_entorno()
+
+    # Drenado automático de la lista de espera (PARQUEO_DRENADO=0 lo deshabilita)
+    drenador = DrenadorListaEspera(
+        motor, gestor_lista_espera,
+        float(os.environ.get('PARQUEO_DRENADO_INTERVALO', 5)),
+        al_drenar=lambda estacionados: cache.invalidar(),
+        condominio=condominio.clave
+    )
+    if os.environ.get('PARQUEO_DRENADO', '1') != '0':
+        drenador.iniciar()
+
+    # Archivado periódico del historial finalizado (PARQUEO_ARCHIVADO=0 lo deshabilita)
+    archivador = ArchivadorHistorial.desde_entorno(gestor_lista_espera, gestor_salidas, condominio.clave)
+    if os.environ.get('PARQUEO_ARCHIVADO', '1') != '0':
+        archivador.iniciar()
+
+    return {'estimador': estimador, 'motor': motor, 'cache': cache, 'fragmentos': fragmentos,
+            'drenador': drenador, 'archivador': archivador}
+
+# Servicios por condominio, todos creados al iniciar; las rutas usan los
+# del condominio de la solicitud a través de estos proxies
+servicios = condominios.PorCondominio(crear_servicios)
+for clave_condominio in condominios.configurados:
+    servicios.obtener(clave_condominio)
+estimador_estancias = LocalProxy(lambda: servicios.obtener()['estimador'])
+motor_pilas = LocalProxy(lambda: servicios.obtener()['motor'])
+cache_dashboard = LocalProxy(lambda: servicios.obtener()['cache'])
+cache_fragmentos = LocalProxy(lambda: servicios.obtener()['fragmentos'])
+app.jinja_env.cache_fragmentos = cache_fragmentos
+drenador_espera = LocalProxy(lambda: servicios.obtener()['drenador'])
+
+def invalida_dashboard(vista):
+    """
+    Decorador para rutas que modifican datos: invalida la caché del
+    dashboard del condominio de la solicitud al terminar la vista, sin
+    importar su resultado. Si hay una unidad de trabajo activa, la
+    invalidación ocurre después de confirmarla, para que ninguna lectura
+    guarde datos anteriores al commit.
+    
+    Args:
+        vista: Función de vista de Flask
+        
+    Returns:
+        function: Vista envuelta
+    """
+    @functools.wraps(vista)
+    def envoltura(*args, **kwargs):
+        try:
+            return vista(*args, **kwargs)
+        finally:
+            ejecutar_al_terminar(servicios.obtener()['cache'].invalidar)
+    return envoltura
+
+# Importación masiva por lotes de usuarios y vehículos
+importador = ImportadorMasivo(int(os.environ.get('PARQUEO_IMPORTACION_LOTE', 1000)))
+
+# Perfilado bajo demanda (sin hooks si PARQUEO_PERFILADO no está habilitado)
+perfilador = PerfiladorSolicitudes.desde_entorno()
+if perfilador:
+    perfilador.registrar(app)
+
+@app.before_request
+def iniciar_metricas_solicitud():
+    """Etiqueta las consultas de la solicitud con su ruta y empieza a medirla."""
+    metricas.iniciar_solicitud(request.endpoint)
+
+@app.after_request
+def registrar_metricas_solicitud(respuesta):
+    """
+    Registra la duración de la solicitud por ruta, método y estado.
+    
+    Args:
+        respuesta: Respuesta de la vista
+        
+    Returns:
+        Response: La misma respuesta
+    """
+    metricas.finalizar_solicitud(request.method, respuesta.status_code)
+    return respuesta
+
+@app.before_request
+def fijar_condominio_solicitud():
+    """
+    Activa el condominio de la solicitud antes de abrir su unidad de
+    trabajo, de modo que la conexión salga del pool de ese condominio.
+    
+    Returns:
+        Response: 404 si el condominio indicado no existe, None para continuar
+    """
+    try:
+        g.token_condominio = condominios.activar(
+            condominios.clave_de_solicitud(request) or condominios.predeterminado)
+    except condominios.CondominioDesconocidoError as error:
+        return jsonify({'error': str(error)}), 404
+
+@app.teardown_request
+def restablecer_condominio_solicitud(error):
+    """Desactiva el condominio de la solicitud después de cerrar su unidad de trabajo."""
+    token = g.pop('token_condominio', None)
+    if token is not None:
+        condominios.restablecer(token)
+
+# Cookie con la hora de la última escritura del cliente: sus lecturas van a
+# la primaria aunque la siguiente solicitud la atienda otro proceso
+COOKIE_ESCRITURA = 'parqueo_escritura'
+
+@app.before_request
+def iniciar_unidad_solicitud():
+    """
+    Abre la unidad de trabajo de la solicitud: todos los gestores comparten
+    una conexión, tomada del pool en el primer uso, y un solo commit.
+    """
+    try:
+        escritura_cliente = float(request.cookies.get(COOKIE_ESCRITURA, 0))
+    except ValueError:
+        escritura_cliente = 0.0
+    iniciar_unidad_trabajo(escritura_cliente)
+
+@app.after_request
+def marcar_escritura_cliente(respuesta):
+    """
+    Si la solicitud escribió y hay réplica, guarda la hora en una cookie
+    que dura lo mismo que PARQUEO_REPLICA_RETRASO.
+    
+    Args:
+        respuesta: Respuesta de la vista
+        
+    Returns:
+        Response: La misma respuesta
+    """
+    escritura = escritura_para_cliente()
+    if escritura is not None:
+        respuesta.set_cookie(COOKIE_ESCRITURA, f"{escritura:.3f}", max_age=math.ceil(RETRASO_REPLICA),
+                             httponly=True, samesite='Lax')
+    return respuesta
+
+@app.teardown_request
+def finalizar_unidad_solicitud(error):
+    """
+    Confirma la unidad de trabajo de la solicitud, o la revierte si alguna
+    sentencia falló o la vista lanzó una excepción.
+    
+    Args:
+        error: Excepción no controlada de la vista o None
+    """
+    finalizar_unidad_trabajo(error)
+
 @app.route('/')
 def mostrar_dashboard():
     """
@@ -42,12 +254,7 @@ def mostrar_dashboard():
         template: Renderiza index.html con los datos del sistema
     """
     try:
-        datos = {
-            'usuarios': gestor_usuarios.obtener_todos(),
-            'vehiculos': gestor_vehiculos.obtener_todos(),
-            'lista_espera': gestor_lista_espera.obtener_pendientes(),
-            'espacios_fila': obtener_datos_espacios_fila()
-        }
+        datos = cache_dashboard.obtener(obtener_datos_dashboard)
         return render_template('index.html', **datos)
     except Exception as error:
         app.logger.error(f"Error en página principal: {str(error)}")
@@ -55,26 +262,85 @@ def mostrar_dashboard():
             'usuarios': [],
             'vehiculos': [],
             'lista_espera': [],
-            'espacios_fila': []
+            'espacios_fila': [],
+            'version_usuarios': version_de(),
+            'version_vehiculos': version_de(),
+            'version_espera': version_de()
         }
         return render_template('index.html', **datos)
 
+@app.route('/metrics')
+def exportar_metricas():
+    """
+    Expone las métricas de consultas, conexiones, solicitudes, pool y
+    cachés (estos por condominio) en formato de texto de Prometheus.
+    
+    Returns:
+        Response: Métricas en text/plain
+    """
+    for clave, servicios_condominio in servicios.creadas().items():
+        metricas.fijar_estadisticas(metricas.pool, estadisticas_pool(clave), (clave, 'primaria'))
+        metricas.fijar_estadisticas(metricas.pool, estadisticas_pool(clave, lectura=True), (clave, 'replica'))
+        metricas.fijar_estadisticas(metricas.cache, servicios_condominio['cache'].estadisticas(), (clave,))
+        metricas.fijar_estadisticas(metricas.fragmentos, servicios_condominio['fragmentos'].estadisticas(),
+                                    (clave,))
+    return Response(metricas.registro.exportar(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/condominios')
+def listar_condominios():
+    """
+    Lista los condominios configurados y el de la solicitud.
+    
+    Returns:
+        JSON: Condominios (clave y nombre) y la clave activa
+    """
+    return jsonify({
+        'condominios': [condominio.to_dict() for condominio in condominios.configurados.values()],
+        'actual': condominios.actual()
+    })
+
+@app.route('/condominio/<clave>')
+def seleccionar_condominio(clave):
+    """
+    Guarda en una cookie el condominio con el que trabaja el navegador.
+    
+    Args:
+        clave: Clave del condominio
+        
+    Returns:
+        redirect: Redirección al dashboard, o 404 si el condominio no existe
+    """
+    if clave not in condominios.configurados:
+        return jsonify({'error': f"Condominio desconocido: {clave}"}), 404
+    respuesta = redirect(url_for('mostrar_dashboard', condominio=clave))
+    respuesta.set_cookie(condominios.PARAMETRO, clave, samesite='Lax')
+    return respuesta
+
 @app.route('/usuarios')
 def listar_usuarios():
     """
-    Lista todos los usuarios registrados.
+    Lista los usuarios registrados, una página a la vez.
+    
+    Args (query):
+        limite: Usuarios por página (opcional)
+        despues_de: ID del último usuario de la página anterior (opcional)
+        buscar: Cédula exacta o inicio del nombre (opcional)
     
     Returns:
-        template: Renderiza usuarios.html con la lista de usuarios
+        template: Renderiza usuarios.html con la página de usuarios
     """
     try:
-        usuarios = gestor_usuarios.obtener_todos()
-        return render_template('usuarios.html', usuarios=usuarios)
+        pagina = gestor_usuarios.obtener_pagina(
+            buscar=request.args.get('buscar') or None,
+            **argumentos_pagina()
+        )
+        return render_template('usuarios.html', usuarios=pagina.items, pagina=pagina)
     except Exception as error:
         app.logger.error(f"Error al listar usuarios: {str(error)}")
         return render_template('error.html', mensaje="Error al obtener usuarios")
 
 @app.route('/usuarios/crear', methods=['POST'])
+@invalida_dashboard
 def crear_usuario():
     """
     Crea un nuevo usuario en el sistema.
@@ -110,6 +376,7 @@ def crear_usuario():
         return redirect(url_for('mostrar_dashboard'))
 
 @app.route('/usuarios/eliminar/<int:id_usuario>')
+@invalida_dashboard
 def eliminar_usuario(id_usuario):
     """
     Elimina un usuario del sistema.
@@ -130,22 +397,48 @@ def eliminar_usuario(id_usuario):
         app.logger.error(f"Error al eliminar usuario: {str(error)}")
         return render_template('error.html', mensaje="Error al eliminar usuario")
 
+@app.route('/usuarios/importar', methods=['POST'])
+@invalida_dashboard
+def importar_usuarios():
+    """
+    Importa usuarios desde un archivo CSV o NDJSON.
+    
+    Args (form):
+        archivo: Archivo con columnas cedula, nombre, telefono, email
+        formato: 'csv' o 'ndjson' (opcional, por defecto según la extensión)
+        
+    Returns:
+        json: Resumen de la importación
+    """
+    return importar_desde_solicitud('usuarios')
+
 @app.route('/vehiculos')
 def listar_vehiculos():
     """
-    Lista todos los vehículos registrados.
+    Lista los vehículos registrados, una página a la vez.
+    
+    Args (query):
+        limite: Vehículos por página (opcional)
+        despues_de: ID del último vehículo de la página anterior (opcional)
+        id_usuario: ID del propietario (opcional)
+        placa: Inicio de la placa (opcional)
     
     Returns:
-        template: Renderiza vehiculos.html con la lista de vehículos
+        template: Renderiza vehiculos.html con la página de vehículos
     """
     try:
-        vehiculos = gestor_vehiculos.obtener_todos()
-        return render_template('vehiculos.html', vehiculos=vehiculos)
+        pagina = gestor_vehiculos.obtener_pagina(
+            id_usuario=request.args.get('id_usuario', type=int),
+            placa=request.args.get('placa') or None,
+            **argumentos_pagina()
+        )
+        return render_template('vehiculos.html', vehiculos=pagina.items, pagina=pagina)
     except Exception as error:
         app.logger.error(f"Error al listar vehículos: {str(error)}")
         return render_template('error.html', mensaje="Error al obtener vehículos")
 
 @app.route('/vehiculos/crear', methods=['POST'])
+@invalida_dashboard
 def crear_vehiculo():
     """
     Crea un nuevo vehículo en el sistema.
@@ -183,6 +476,7 @@ def crear_vehiculo():
         return render_template('error.html', mensaje="Error interno del sistema")
 
 @app.route('/vehiculos/eliminar/<int:id_vehiculo>')
+@invalida_dashboard
 def eliminar_vehiculo(id_vehiculo):
     """
     Elimina un vehículo del sistema.
@@ -203,22 +497,99 @@ def eliminar_vehiculo(id_vehiculo):
         app.logger.error(f"Error al eliminar vehículo: {str(error)}")
         return render_template('error.html', mensaje="Error al eliminar vehículo")
 
+@app.route('/vehiculos/importar', methods=['POST'])
+@invalida_dashboard
+def importar_vehiculos():
+    """
+    Importa vehículos desde un archivo CSV o NDJSON.
+    
+    Args (form):
+        archivo: Archivo con columnas placa, marca, modelo e id_usuario o cedula
+        formato: 'csv' o 'ndjson' (opcional, por defecto según la extensión)
+        
+    Returns:
+        json: Resumen de la importación
+    """
+    return importar_desde_solicitud('vehiculos')
+
 @app.route('/lista_espera')
 def listar_espera():
     """
-    Lista todos los vehículos en espera.
+    Lista los registros de la lista de espera, una página a la vez.
+    
+    Args (query):
+        limite: Registros por página (opcional)
+        despues_de: ID del último registro de la página anterior (opcional)
+        estado: pendiente, atendido o cancelado (opcional)
     
     Returns:
-        template: Renderiza lista_espera.html con la lista de espera
+        template: Renderiza lista_espera.html con la página de la lista de espera
     """
     try:
-        lista_espera = gestor_lista_espera.obtener_todos()
-        return render_template('lista_espera.html', lista_espera=lista_espera)
+        pagina = gestor_lista_espera.obtener_pagina(
+            estado=request.args.get('estado') or None,
+            **argumentos_pagina()
+        )
+        return render_template('lista_espera.html', lista_espera=pagina.items, pagina=pagina)
+    except ValueError as error:
+        return render_template('error.html', mensaje=str(error))
     except Exception as error:
         app.logger.error(f"Error al listar espera: {str(error)}")
         return render_template('error.html', mensaje="Error al obtener lista de espera")
 
+@app.route('/reportes/historial')
+def reporte_historial():
+    """
+    Historial de la lista de espera o de las salidas temporales, incluidos
+    los registros ya archivados.
+    
+    Args (query):
+        tipo: 'lista_espera' (por defecto) o 'salidas'
+        id_vehiculo: Filtra por vehículo (opcional)
+        desde: Fecha 'AAAA-MM-DD[ HH:MM]' mínima (opcional)
+        hasta: Fecha 'AAAA-MM-DD[ HH:MM]' máxima, exclusiva (opcional)
+        limite: Registros máximos (opcional)
+        
+    Returns:
+        json: Registros del historial, del más reciente al más antiguo
+    """
+    try:
+        tipo = request.args.get('tipo', 'lista_espera')
+        if tipo not in ('lista_espera', 'salidas'):
+            raise ValueError("tipo debe ser 'lista_espera' o 'salidas'")
+        filtros = {
+            'id_vehiculo': request.args.get('id_vehiculo', type=int),
+            'desde': leer_fecha(request.args.get('desde')),
+            'hasta': leer_fecha(request.args.get('hasta')),
+            'limite': request.args.get('limite', type=int)
+        }
+        if tipo == 'lista_espera':
+            registros = [{
+                'id': item.id,
+                'id_vehiculo': item.id_vehiculo,
+                'placa': item.placa,
+                'fecha_solicitud': formatear_fecha(item.fecha_solicitud),
+                'estado': item.estado
+            } for item in gestor_lista_espera.obtener_historial(**filtros)]
+        else:
+            registros = [{
+                'id': movimiento.id,
+                'id_vehiculo': movimiento.id_vehiculo,
+                'placa': movimiento.placa,
+                'id_espacio_fila': movimiento.id_espacio_fila,
+                'posicion_origen': movimiento.posicion_origen,
+                'fecha_movimiento': formatear_fecha(movimiento.fecha_movimiento),
+                'fecha_retorno': formatear_fecha(movimiento.fecha_retorno)
+            } for movimiento in gestor_salidas.obtener_historial(**filtros)]
+        return jsonify({'tipo': tipo, 'registros': registros})
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    except Exception as error:
+        app.logger.error(f"Error al obtener historial: {str(error)}")
+        return jsonify({'error': 'Error interno del sistema'}), 500
+
 @app.route('/lista_espera/agregar', methods=['POST'])
+@invalida_dashboard
 def agregar_lista_espera():
     """
     Agrega un vehículo a la lista de espera.
@@ -238,6 +609,8 @@ def agregar_lista_espera():
         )
         
         if gestor_lista_espera.crear(nueva_espera):
+            # Puede haber espacio libre: el drenador revisa tras el commit
+            ejecutar_al_terminar(drenador_espera.avisar)
             return redirect(url_for('mostrar_dashboard'))
         
         raise Exception("No se pudo agregar a la lista de espera")
@@ -249,54 +622,18 @@ def agregar_lista_espera():
         return render_template('error.html', mensaje="Error interno del sistema")
 
 @app.route('/lista_espera/procesar')
+@invalida_dashboard
 def procesar_lista_espera():
     """
-    Procesa el primer vehículo de la lista de espera si hay espacio disponible.
+    Estaciona en orden de llegada tantos vehículos de la lista de espera
+    como espacios libres haya, cada uno en la fila donde menos estorba
+    según su salida esperada. Normalmente el drenador lo hace solo.
     
     Returns:
         redirect: Redirecciona al dashboard
     """
     try:
-        lista_espera = gestor_lista_espera.obtener_pendientes()
-        if not lista_espera:
-            return redirect(url_for('mostrar_dashboard'))
-            
-        espera = lista_espera[0]
-        conn = get_conexion()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT ef.id_espacio_fila
-            FROM EspaciosFila ef
-            LEFT JOIN (
-                SELECT id_espacio_fila, COUNT(*) as total
-                FROM PilaVehiculos
-                GROUP BY id_espacio_fila
-            ) pv ON ef.id_espacio_fila = pv.id_espacio_fila
-            WHERE pv.total IS NULL OR pv.total < 3
-            ORDER BY ef.numero_espacio
-        """)
-        
-        espacio_disponible = cursor.fetchone()
-        
-        if espacio_disponible:
-            cursor.execute("""
-                SELECT COUNT(*) FROM PilaVehiculos 
-                WHERE id_espacio_fila = ?
-            """, (espacio_disponible[0],))
-            
-            posicion = cursor.fetchone()[0] + 1
-            
-            cursor.execute("""
-                INSERT INTO PilaVehiculos 
-                (id_espacio_fila, id_vehiculo, posicion, fecha_entrada)
-                VALUES (?, ?, ?, GETDATE())
-            """, (espacio_disponible[0], espera['id_vehiculo'], posicion))
-            
-            gestor_lista_espera.eliminar(espera['id'])
-        
-        conn.commit()
-        conn.close()
+        drenador_espera.drenar()
         return redirect(url_for('mostrar_dashboard'))
         
     except Exception as error:
@@ -304,6 +641,7 @@ def procesar_lista_espera():
         return redirect(url_for('mostrar_dashboard'))
 
 @app.route('/lista_espera/eliminar/<int:id_espera>')
+@invalida_dashboard
 def eliminar_espera(id_espera):
     """
     Elimina un vehículo de la lista de espera.
@@ -325,6 +663,7 @@ def eliminar_espera(id_espera):
         return redirect(url_for('mostrar_dashboard'))
     
 @app.route('/fila/mover', methods=['POST'])
+@invalida_dashboard
 def mover_vehiculo_fila():
     """
     Mueve un vehículo dentro de la fila o lo saca del parqueo.
@@ -341,54 +680,66 @@ def mover_vehiculo_fila():
         id_vehiculo = request.form.get('id_vehiculo')
         
         if id_espacio_fila and id_vehiculo:
-            conn = get_conexion()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                DELETE FROM PilaVehiculos 
-                WHERE id_espacio_fila = ? AND id_vehiculo = ?
-            """, (id_espacio_fila, id_vehiculo))
-            
-            cursor.execute("""
-                SELECT TOP 1 id_espera, id_vehiculo
-                FROM ListaEspera 
-                WHERE estado = 'pendiente'
-                ORDER BY fecha_solicitud
-            """)
-            
-            siguiente_en_espera = cursor.fetchone()
-            
-            if siguiente_en_espera:
-                cursor.execute("""
-                    SELECT COUNT(*) FROM PilaVehiculos 
-                    WHERE id_espacio_fila = ?
-                """, (id_espacio_fila,))
-                
-                posicion = cursor.fetchone()[0] + 1
-                
-                if posicion <= 3:
-                    cursor.execute("""
-                        INSERT INTO PilaVehiculos 
-                        (id_espacio_fila, id_vehiculo, posicion, fecha_entrada)
-                        VALUES (?, ?, ?, GETDATE())
-                    """, (id_espacio_fila, siguiente_en_espera[1], posicion))
-                    
-                    cursor.execute("""
-                        UPDATE ListaEspera 
-                        SET estado = 'atendido'
-                        WHERE id_espera = ?
-                    """, (siguiente_en_espera[0],))
-            
-            conn.commit()
-            conn.close()
-            
+            id_espacio_fila = int(id_espacio_fila)
+
+            if motor_pilas.sacar(id_espacio_fila, int(id_vehiculo)) and not drenador_espera.activo:
+                asignar_siguiente_en_espera()
+
         return redirect(url_for('mostrar_dashboard'))
         
     except Exception as error:
         print(f"Error al mover vehículo: {str(error)}")
         return redirect(url_for('mostrar_dashboard'))
 
+@app.route('/fila/extraer', methods=['POST'])
+@invalida_dashboard
+def extraer_vehiculo_fila():
+    """
+    Saca un vehículo aunque tenga otros encima: aparta los bloqueadores
+    en filas con espacio, saca el vehículo y los regresa, todo en una
+    sola transacción. El siguiente en espera ocupa el espacio liberado.
+    
+    Args (form):
+        id_vehiculo: ID del vehículo a sacar
+        retornar: '0' para dejar los bloqueadores en la fila donde se apartaron (opcional)
+        
+    Returns:
+        redirect: Redirecciona al dashboard
+    """
+    try:
+        id_vehiculo = request.form.get('id_vehiculo')
+        if not id_vehiculo:
+            return redirect(url_for('mostrar_dashboard'))
+
+        plan = motor_pilas.extraer(int(id_vehiculo), retornar=request.form.get('retornar') != '0')
+        if plan and not drenador_espera.activo:
+            asignar_siguiente_en_espera()
+
+        return redirect(url_for('mostrar_dashboard'))
+        
+    except Exception as error:
+        app.logger.error(f"Error al extraer vehículo: {str(error)}")
+        return redirect(url_for('mostrar_dashboard'))
+
+@app.route('/vehiculos/<int:id_vehiculo>/extraccion')
+def plan_extraccion_vehiculo(id_vehiculo):
+    """
+    Muestra, sin ejecutarlo, el plan de movimientos para sacar un vehículo.
+    
+    Args:
+        id_vehiculo: ID del vehículo
+        retornar (query): '0' para planificar sin regreso de bloqueadores (opcional)
+        
+    Returns:
+        json: Plan de extracción o error 404 si el vehículo no está estacionado
+    """
+    plan = motor_pilas.planificar_extraccion(id_vehiculo, retornar=request.args.get('retornar') != '0')
+    if plan is None:
+        return jsonify({'error': 'El vehículo no está estacionado'}), 404
+    return jsonify(plan.to_dict())
+
 @app.route('/fila/retornar/<int:id_espacio_fila>')
+@invalida_dashboard
 def retornar_vehiculos_fila(id_espacio_fila):
     """
     Retorna los vehículos que salieron temporalmente a su fila original.
@@ -400,22 +751,32 @@ def retornar_vehiculos_fila(id_espacio_fila):
         redirect: Redirecciona al dashboard
     """
     try:
-        conn = get_conexion()
-        cursor = conn.cursor()
-        
-        movimientos = gestor_salidas.obtener_movimientos_pendientes(id_espacio_fila)
+        motor_pilas.retornar(gestor_salidas, [id_espacio_fila])
+
+        return redirect(url_for('mostrar_dashboard'))
         
-        for movimiento in movimientos:
-            cursor.execute("""
-                INSERT INTO PilaVehiculos (id_espacio_fila, id_vehiculo, posicion, fecha_entrada)
-                VALUES (?, ?, ?, GETDATE())
-            """, (id_espacio_fila, movimiento[1], movimiento[3]))
-            
-            gestor_salidas.registrar_retorno(movimiento[0])
+    except Exception as error:
+        app.logger.error(f"Error al retornar vehículos: {str(error)}")
+        return redirect(url_for('mostrar_dashboard'))
+
+@app.route('/filas/retornar', methods=['POST'])
+@invalida_dashboard
+def retornar_vehiculos_filas():
+    """
+    Retorna a la vez los vehículos con salida temporal de varias filas,
+    por ejemplo al cambio de turno.
+    
+    Args (form):
+        id_espacio_fila: IDs de las filas (repetible; si se omite, todas las filas)
         
-        conn.commit()
-        conn.close()
-            
+    Returns:
+        redirect: Redirecciona al dashboard
+    """
+    try:
+        ids_espacio_fila = [int(id_fila) for id_fila in request.form.getlist('id_espacio_fila')] or None
+
+        motor_pilas.retornar(gestor_salidas, ids_espacio_fila)
+
         return redirect(url_for('mostrar_dashboard'))
         
     except Exception as error:
@@ -423,13 +784,17 @@ def retornar_vehiculos_fila(id_espacio_fila):
         return redirect(url_for('mostrar_dashboard'))
     
 @app.route('/fila/estacionar', methods=['POST'])
+@invalida_dashboard
 def estacionar_vehiculo_fila():
     """
-    Estaciona un vehículo en una fila específica o lo agrega a la lista de espera si está llena.
+    Estaciona un vehículo en una fila específica, o en la que elija el motor
+    según su salida esperada si no se indica, o lo agrega a la lista de
+    espera si no hay espacio.
     
     Args (form):
-        id_espacio_fila: ID del espacio de fila
+        id_espacio_fila: ID del espacio de fila (opcional; si se omite se asigna)
         id_vehiculo: ID del vehículo a estacionar
+        horas_estimadas: Horas que el vehículo dice que se quedará (opcional)
         
     Returns:
         redirect: Redirecciona al dashboard
@@ -437,93 +802,202 @@ def estacionar_vehiculo_fila():
     try:
         id_espacio_fila = request.form.get('id_espacio_fila')
         id_vehiculo = request.form.get('id_vehiculo')
+        horas_estimadas = request.form.get('horas_estimadas')
         
-        if not all([id_espacio_fila, id_vehiculo]):
+        if not id_vehiculo:
             return redirect(url_for('mostrar_dashboard'))
         
-        conn = get_conexion()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT COUNT(*) FROM PilaVehiculos 
-            WHERE id_vehiculo = ?
-        """, (id_vehiculo,))
-        
-        if cursor.fetchone()[0] > 0:
+        id_vehiculo = int(id_vehiculo)
+        salida_estimada = None
+        if horas_estimadas:
+            salida_estimada = datetime.now().timestamp() + float(horas_estimadas) * 3600
+
+        if motor_pilas.esta_estacionado(id_vehiculo):
             print("El vehículo ya está estacionado")
             return redirect(url_for('mostrar_dashboard'))
-        
-        cursor.execute("""
-            SELECT COUNT(*) FROM PilaVehiculos 
-            WHERE id_espacio_fila = ?
-        """, (id_espacio_fila,))
-        
-        posicion_actual = cursor.fetchone()[0]
-        
-        if posicion_actual < 3:
-            cursor.execute("""
-                INSERT INTO PilaVehiculos 
-                (id_espacio_fila, id_vehiculo, posicion, fecha_entrada)
-                VALUES (?, ?, ?, GETDATE())
-            """, (id_espacio_fila, id_vehiculo, posicion_actual + 1))
-            
+
+        if id_espacio_fila:
+            id_espacio_fila = int(id_espacio_fila)
         else:
-            cursor.execute("""
-                INSERT INTO ListaEspera 
-                (id_vehiculo, fecha_solicitud, estado)
-                VALUES (?, GETDATE(), 'pendiente')
-            """, (id_vehiculo,))
+            id_espacio_fila = motor_pilas.elegir_fila(id_vehiculo, salida_estimada)
+
+        if id_espacio_fila and motor_pilas.tiene_espacio(id_espacio_fila):
+            motor_pilas.estacionar(id_espacio_fila, id_vehiculo, salida_estimada=salida_estimada)
+
+        elif id_espacio_fila is None or motor_pilas.obtener_fila(id_espacio_fila):
+            gestor_lista_espera.crear(ListaEspera(id_vehiculo=id_vehiculo))
             print(f"Espacio lleno, vehículo {id_vehiculo} agregado a lista de espera")
-            
-        conn.commit()
-        conn.close()
+
         return redirect(url_for('mostrar_dashboard'))
         
     except Exception as error:
         print(f"Error al estacionar vehículo: {str(error)}")
         return redirect(url_for('mostrar_dashboard'))
 
+def asignar_siguiente_en_espera():
+    """
+    Estaciona al siguiente vehículo de la lista de espera, si hay espacio,
+    en la fila que elija el motor según su salida esperada.
+    """
+    siguiente_en_espera = gestor_lista_espera.obtener_siguiente()
+    if not siguiente_en_espera:
+        return
+
+    id_espacio_fila = motor_pilas.elegir_fila(siguiente_en_espera.id_vehiculo)
+    if id_espacio_fila:
+        motor_pilas.estacionar(id_espacio_fila,
+                               siguiente_en_espera.id_vehiculo,
+                               id_espera=siguiente_en_espera.id)
+
+def argumentos_pagina():
+    """
+    Lee los parámetros de paginación por clave de la solicitud.
+    
+    Returns:
+        dict: limite y despues_de (None si no se indicaron o no son enteros)
+    """
+    return {
+        'limite': request.args.get('limite', type=int),
+        'despues_de': request.args.get('despues_de', type=int),
+    }
+
+def leer_fecha(texto):
+    """
+    Convierte un parámetro 'AAAA-MM-DD[ HH:MM[:SS]]' en datetime.
+    
+    Raises:
+        ValueError: Si el texto no es una fecha válida
+    """
+    return datetime.fromisoformat(texto) if texto else None
+
+def formatear_fecha(fecha):
+    """Da formato 'AAAA-MM-DD HH:MM:SS' a una fecha, o '' si no hay."""
+    return fecha.strftime('%Y-%m-%d %H:%M:%S') if fecha else ''
+
+def importar_desde_solicitud(tipo):
+    """
+    Importa el archivo subido en la solicitud leyéndolo como flujo,
+    sin cargarlo completo en memoria.
+    
+    Args:
+        tipo: 'usuarios' o 'vehiculos'
+        
+    Returns:
+        json: Resumen de la importación o mensaje de error
+    """
+    archivo = request.files.get('archivo')
+    if not archivo or not archivo.filename:
+        return jsonify({'error': 'Debe adjuntar un archivo CSV o NDJSON'}), 400
+
+    try:
+        formato = request.form.get('formato') or detectar_formato(archivo.filename)
+        flujo = io.TextIOWrapper(archivo.stream, encoding='utf-8-sig', newline='')
+        resultado = importador.importar(tipo, leer_registros(flujo, formato))
+        return jsonify(resultado.to_dict())
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    except Exception as error:
+        app.logger.error(f"Error al importar {tipo}: {str(error)}")
+        return jsonify({'error': 'Error interno del sistema'}), 500
+
+def obtener_datos_dashboard():
+    """
+    Calcula todos los datos que muestra el dashboard.
+    Se invoca a través de cache_dashboard sólo cuando cambió la versión de datos.
+    Incluye la versión de cada sección para la caché de fragmentos.
+    
+    Returns:
+        dict: Usuarios, vehículos, lista de espera y espacios de fila, con sus versiones
+    """
+    usuarios = gestor_usuarios.obtener_todos()
+    vehiculos = gestor_vehiculos.obtener_todos()
+    lista_espera = gestor_lista_espera.obtener_pendientes()
+    return {
+        'usuarios': usuarios,
+        'vehiculos': vehiculos,
+        'lista_espera': lista_espera,
+        'espacios_fila': obtener_datos_espacios_fila(),
+        'version_usuarios': version_de(*((usuario.id, usuario.cedula, usuario.nombre,
+                                          usuario.telefono, usuario.email) for usuario in usuarios)),
+        'version_vehiculos': version_de(*((vehiculo.id, vehiculo.placa, vehiculo.marca,
+                                           vehiculo.modelo, vehiculo.propietario) for vehiculo in vehiculos)),
+        'version_espera': version_de(*(tuple(espera.values()) for espera in lista_espera))
+    }
+
 def obtener_datos_espacios_fila():
     """
     Obtiene los datos de todos los espacios de fila y sus vehículos asociados.
+
+    Usa un número fijo de consultas (una para las filas con su pila de
+    vehículos y otra para los movimientos temporales pendientes) sin importar
+    cuántos EspaciosFila existan; la agrupación por fila se hace en memoria.
+    Lee de la réplica del condominio si tiene una. Cada espacio lleva la
+    versión de su contenido para la caché de fragmentos.
     
     Returns:
         list: Lista de diccionarios con información de cada espacio de fila
     """
     espacios = []
     try:
-        conn = get_conexion()
+        conn = get_conexion(lectura=True)
         cursor = conn.cursor()
         
-        espacios_query = """
-            SELECT ef.id_espacio_fila, ef.numero_espacio 
+        cursor.execute("""
+            SELECT ef.id_espacio_fila, ef.numero_espacio,
+                   v.id_vehiculo, v.placa, pv.posicion
             FROM EspaciosFila ef
-            ORDER BY ef.numero_espacio
-        """
-        cursor.execute(espacios_query)
-        espacios_raw = cursor.fetchall()
-        
-        for espacio in espacios_raw:
-            vehiculos_query = """
-                SELECT v.id_vehiculo, v.placa, pv.posicion
-                FROM PilaVehiculos pv
-                JOIN Vehiculos v ON v.id_vehiculo = pv.id_vehiculo
-                WHERE pv.id_espacio_fila = ?
-                ORDER BY pv.posicion DESC
-            """
-            cursor.execute(vehiculos_query, (espacio[0],))
-            vehiculos = cursor.fetchall()
+            LEFT JOIN PilaVehiculos pv ON pv.id_espacio_fila = ef.id_espacio_fila
+            LEFT JOIN Vehiculos v ON v.id_vehiculo = pv.id_vehiculo
+            ORDER BY ef.numero_espacio, ef.id_espacio_fila, pv.posicion DESC
+        """)
+        filas = cursor.fetchall()
+        
+        cursor.execute("""
+            SELECT mt.id_movimiento, mt.id_espacio_fila, mt.id_vehiculo,
+                   v.placa, mt.posicion_origen
+            FROM MovimientosTemporales mt
+            JOIN Vehiculos v ON v.id_vehiculo = mt.id_vehiculo
+            WHERE mt.fecha_retorno IS NULL
+            ORDER BY mt.fecha_movimiento DESC
+        """)
+        movimientos = cursor.fetchall()
+        conn.close()
+        
+        espacios_por_id = {}
+        for fila in filas:
+            espacio = espacios_por_id.get(fila[0])
+            if espacio is None:
+                espacio = {
+                    'id': fila[0],
+                    'numero_espacio': fila[1],
+                    'vehiculos': [],
+                    'total_vehiculos': 0,
+                    'movimientos_temporales': []
+                }
+                espacios_por_id[fila[0]] = espacio
+                espacios.append(espacio)
             
-            espacio_data = {
-                'id': espacio[0],
-                'numero_espacio': espacio[1],
-                'vehiculos': vehiculos,
-                'total_vehiculos': len(vehiculos),
-                'movimientos_temporales': []
-            }
-            espacios.append(espacio_data)
+            # LEFT JOIN: una fila vacía trae los datos del vehículo en NULL
+            if fila[2] is not None:
+                espacio['vehiculos'].append((fila[2], fila[3], fila[4]))
+                espacio['total_vehiculos'] += 1
+        
+        for movimiento in movimientos:
+            espacio = espacios_por_id.get(movimiento[1])
+            if espacio is not None:
+                espacio['movimientos_temporales'].append({
+                    'id': movimiento[0],
+                    'id_vehiculo': movimiento[2],
+                    'placa': movimiento[3],
+                    'posicion_origen': movimiento[4]
+                })
+        
+        for espacio in espacios:
+            espacio['version'] = version_de(
+                espacio['numero_espacio'], tuple(espacio['vehiculos']),
+                tuple((movimiento['id'], movimiento['placa']) for movimiento in espacio['movimientos_temporales'])
+            )
             
-        conn.close()
         return espacios
         
     except Exception as error:
@@ -0,0 +1,5 @@
+"""
+Paquete del sistema de parqueo para invitados de condominio.
+Contiene la configuración de base de datos, los modelos y los recursos
+web; la aplicación Flask se define en app.py en la raíz del proyecto.
+"""
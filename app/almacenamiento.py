@@ -0,0 +1,228 @@
+"""
+Módulo de backends de almacenamiento.
+Abstrae el motor de base de datos usado por los gestores para poder
+elegir por configuración entre SQL Server (ODBC) y SQLite embebido.
+
+Variables de entorno:
+    PARQUEO_BACKEND: 'sqlserver' (por defecto) o 'sqlite'
+    PARQUEO_SQLITE_RUTA: Archivo de la base SQLite (por defecto 'parqueo.db').
+        Acepta URIs 'file:...' como 'file:parqueo?mode=memory&cache=shared'
+
+El esquema se crea y versiona con las migraciones de app/migraciones.py,
+que preparar() aplica al iniciar. Un backend de sólo lectura (réplica) no
+migra: en SQL Server pide ApplicationIntent=ReadOnly para llegar a una
+secundaria legible y en SQLite abre la copia con query_only, por ejemplo 'file:copia.db?mode=ro'.
+"""
+import os
+import re
+import sqlite3
+from abc import ABC, abstractmethod
+from datetime import datetime
+from app import migraciones
+
+# Las fechas se guardan como texto ISO y se leen de vuelta como datetime
+sqlite3.register_adapter(datetime, lambda fecha: fecha.isoformat(' '))
+sqlite3.register_converter('TIMESTAMP', lambda valor: datetime.fromisoformat(valor.decode()))
+
+
+class BackendAlmacenamiento(ABC):
+    """
+    Clase base abstracta para los motores de almacenamiento.
+    Define cómo abrir conexiones y las diferencias de dialecto SQL.
+
+    Atributos:
+        nombre (str): Identificador del backend
+        errores (tuple): Excepciones de conexión propias del motor
+    """
+    nombre = None
+    errores = ()
+    solo_lectura = False
+
+    @abstractmethod
+    def conectar(self):
+        """Abre una conexión nueva con interfaz DB-API (paramstyle '?')."""
+        pass
+
+    def preparar(self):
+        """Aplica las migraciones pendientes del esquema (salvo en una réplica)."""
+        if self.solo_lectura:
+            return
+        migraciones.migrar(self)
+
+    @abstractmethod
+    def listar_indices(self, cursor, tabla: str) -> list:
+        """Devuelve (nombre, único, columnas clave, columnas incluidas) de cada índice de la tabla."""
+        pass
+
+    @abstractmethod
+    def listar_columnas(self, cursor, tabla: str) -> set:
+        """Devuelve los nombres de las columnas de la tabla, en minúsculas."""
+        pass
+
+    @abstractmethod
+    def limitar(self, consulta: str, cantidad: int) -> str:
+        """Devuelve la consulta SELECT limitada a las primeras filas."""
+        pass
+
+    def preparar_carga_masiva(self, cursor):
+        """Ajusta un cursor para inserciones con executemany (por defecto no hace nada)."""
+        pass
+
+    def ultimo_id(self, cursor) -> int:
+        """Devuelve el ID autonumérico generado por el último INSERT del cursor."""
+        return cursor.lastrowid
+
+
+class BackendSQLServer(BackendAlmacenamiento):
+    """
+    Backend de SQL Server a través de ODBC (pyodbc).
+
+    Atributos:
+        cadena_conexion (str): Cadena ODBC de conexión
+        solo_lectura (bool): Si conecta a una réplica de sólo lectura
+    """
+    nombre = 'sqlserver'
+
+    def __init__(self, cadena_conexion: str, solo_lectura: bool = False):
+        """
+        Inicializa el backend; pyodbc se importa aquí para que las
+        instalaciones sólo con SQLite no requieran controladores ODBC.
+
+        Args:
+            cadena_conexion: Cadena ODBC de conexión
+            solo_lectura: True para conectar con intención de sólo lectura
+        """
+        import pyodbc
+        self._pyodbc = pyodbc
+        self.errores = (pyodbc.Error,)
+        self.solo_lectura = solo_lectura
+        if solo_lectura and 'applicationintent' not in cadena_conexion.lower():
+            cadena_conexion = cadena_conexion.rstrip(';') + ';ApplicationIntent=ReadOnly;'
+        self.cadena_conexion = cadena_conexion
+
+    def conectar(self):
+        """Abre una conexión ODBC nueva."""
+        return self._pyodbc.connect(self.cadena_conexion)
+
+    def listar_columnas(self, cursor, tabla: str) -> set:
+        """Consulta sys.columns de la tabla."""
+        cursor.execute("SELECT name FROM sys.columns WHERE object_id = OBJECT_ID(?)", (tabla,))
+        return {row[0].lower() for row in cursor.fetchall()}
+
+    def listar_indices(self, cursor, tabla: str) -> list:
+        """Consulta sys.indexes y sys.index_columns de la tabla."""
+        cursor.execute("""
+            SELECT i.name, i.is_unique, c.name, ic.is_included_column
+            FROM sys.indexes i
+            JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+            JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+            WHERE i.object_id = OBJECT_ID(?)
+            ORDER BY i.index_id, ic.is_included_column, ic.key_ordinal, ic.index_column_id
+        """, (tabla,))
+        indices = {}
+        for nombre, unico, columna, incluida in cursor.fetchall():
+            _, _, columnas, incluidas = indices.setdefault(nombre, (nombre, bool(unico), [], []))
+            (incluidas if incluida else columnas).append(columna)
+        return [(nombre, unico, tuple(columnas), tuple(incluidas))
+                for nombre, unico, columnas, incluidas in indices.values()]
+
+    def limitar(self, consulta: str, cantidad: int) -> str:
+        """Agrega TOP n al primer SELECT de la consulta."""
+        return re.sub(r'^\s*SELECT\b', f'SELECT TOP {int(cantidad)}', consulta, count=1)
+
+    def preparar_carga_masiva(self, cursor):
+        """Envía cada lote de executemany en un solo viaje al servidor."""
+        cursor.fast_executemany = True
+
+    def ultimo_id(self, cursor) -> int:
+        """Consulta @@IDENTITY: pyodbc no expone lastrowid y SCOPE_IDENTITY() queda en otro ámbito."""
+        cursor.execute("SELECT CAST(@@IDENTITY AS INT)")
+        return cursor.fetchone()[0]
+
+
+class BackendSQLite(BackendAlmacenamiento):
+    """
+    Backend SQLite embebido, en el mismo proceso y con modo WAL.
+    Registra GETDATE() para que el SQL de los gestores funcione sin cambios.
+
+    Atributos:
+        ruta (str): Archivo de la base de datos o URI 'file:...'
+        solo_lectura (bool): Si la base es una copia de sólo lectura
+    """
+    nombre = 'sqlite'
+    errores = (sqlite3.Error,)
+
+    def __init__(self, ruta: str, solo_lectura: bool = False):
+        """
+        Inicializa el backend SQLite.
+
+        Args:
+            ruta: Archivo de la base de datos o URI 'file:...'
+            solo_lectura: True para rechazar cualquier escritura (por defecto False)
+        """
+        self.ruta = ruta
+        self.solo_lectura = solo_lectura
+
+    def conectar(self):
+        """Abre una conexión SQLite configurada para el sistema."""
+        conexion = sqlite3.connect(
+            self.ruta,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,  # El pool entrega cada conexión a un hilo a la vez
+            uri=self.ruta.startswith('file:')
+        )
+        conexion.create_function('GETDATE', 0, lambda: datetime.now().isoformat(' '))
+        conexion.execute('PRAGMA foreign_keys = ON')
+        conexion.execute('PRAGMA busy_timeout = 5000')
+        if self.solo_lectura:
+            conexion.execute('PRAGMA query_only = ON')
+        elif not self._en_memoria():
+            conexion.execute('PRAGMA journal_mode = WAL')
+            conexion.execute('PRAGMA synchronous = NORMAL')
+        return conexion
+
+    def listar_columnas(self, cursor, tabla: str) -> set:
+        """Consulta PRAGMA table_info."""
+        return {row[1].lower() for row in cursor.execute(f"PRAGMA table_info('{tabla}')").fetchall()}
+
+    def listar_indices(self, cursor, tabla: str) -> list:
+        """Consulta PRAGMA index_list e index_info (incluye los índices de UNIQUE)."""
+        indices = []
+        for _, nombre, unico, *_ in cursor.execute(f"PRAGMA index_list('{tabla}')").fetchall():
+            columnas = cursor.execute(f"PRAGMA index_info('{nombre}')").fetchall()
+            indices.append((nombre, bool(unico),
+                            tuple(columna for _, _, columna in sorted(columnas)), ()))
+        return indices
+
+    def limitar(self, consulta: str, cantidad: int) -> str:
+        """Agrega LIMIT n al final de la consulta."""
+        return f"{consulta.rstrip()} LIMIT {int(cantidad)}"
+
+    def _en_memoria(self) -> bool:
+        """Indica si la base de datos vive sólo en memoria."""
+        return self.ruta == ':memory:' or 'mode=memory' in self.ruta
+
+
+def crear_backend(nombre: str = None, cadena_conexion: str = None,
+                  sqlite_ruta: str = None, solo_lectura: bool = False) -> BackendAlmacenamiento:
+    """
+    Crea el backend indicado por parámetro o por la variable PARQUEO_BACKEND.
+
+    Args:
+        nombre: 'sqlserver' o 'sqlite' (opcional)
+        cadena_conexion: Cadena ODBC para SQL Server (opcional)
+        sqlite_ruta: Archivo de la base SQLite (por defecto PARQUEO_SQLITE_RUTA)
+        solo_lectura: True para una réplica de sólo lectura (por defecto False)
+
+    Returns:
+        BackendAlmacenamiento: Backend configurado
+
+    Raises:
+        ValueError: Si el backend no existe
+    """
+    nombre = (nombre or os.environ.get('PARQUEO_BACKEND', 'sqlserver')).lower()
+    if nombre == 'sqlite':
+        return BackendSQLite(sqlite_ruta or os.environ.get('PARQUEO_SQLITE_RUTA', 'parqueo.db'), solo_lectura)
+    if nombre == 'sqlserver':
+        return BackendSQLServer(cadena_conexion, solo_lectura)
+    raise ValueError(f"Backend de almacenamiento desconocido: {nombre}")
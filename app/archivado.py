@@ -0,0 +1,178 @@
+"""
+Módulo del archivado del historial de la lista de espera y de las salidas
+temporales. ListaEspera y MovimientosTemporales sólo necesitan los
+registros pendientes para operar; los atendidos, cancelados y retornados
+se acumulan para siempre y encarecen cada consulta. Un hilo por condominio
+mueve periódicamente los finalizados con más de cierta antigüedad a
+ListaEsperaHistorico y MovimientosTemporalesHistorico, por lotes, un lote
+por transacción. Los reportes los consultan con obtener_historial() de
+cada gestor, que une ambas tablas.
+
+Variables de entorno:
+    PARQUEO_ARCHIVADO: '0' deshabilita el archivado periódico (por defecto habilitado)
+    PARQUEO_ARCHIVADO_DIAS: Días que los finalizados siguen en las tablas activas (por defecto 30)
+    PARQUEO_ARCHIVADO_INTERVALO: Segundos entre archivados (por defecto 3600)
+    PARQUEO_ARCHIVADO_LOTE: Registros por transacción (por defecto 1000)
+
+Uso desde la línea de comandos (por ejemplo, desde cron):
+    python -m app.archivado
+    python -m app.archivado --dias 90 --condominio torre-norte
+"""
+import argparse
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+from app import condominios, db_config
+from app.db_config import transaccion
+from app.metricas import instrumentar_clase
+from app.models.lista_espera import GestorListaEspera
+from app.models.salidas_temporales import GestorSalidasTemporales
+
+DIAS_ACTIVOS = 30
+INTERVALO_ARCHIVADO = 3600.0
+TAMANO_LOTE = 1000
+
+
+@instrumentar_clase
+class ArchivadorHistorial:
+    """
+    Mueve el historial finalizado a las tablas de archivo.
+
+    Atributos:
+        gestor_espera (GestorListaEspera): Gestor de la lista de espera
+        gestor_salidas (GestorSalidasTemporales): Gestor de las salidas temporales
+        dias (float): Antigüedad mínima para archivar
+        lote (int): Registros por transacción
+        intervalo (float): Segundos entre archivados del hilo
+        condominio (str): Clave del condominio que archiva el hilo
+        _detener (threading.Event): Se activa para terminar el hilo
+        _hilo (threading.Thread): Hilo de trabajo o None si no se inició
+        _lock (threading.Lock): Evita dos archivados simultáneos
+    """
+
+    def __init__(self, gestor_espera, gestor_salidas, dias: float = DIAS_ACTIVOS,
+                 lote: int = TAMANO_LOTE, intervalo: float = INTERVALO_ARCHIVADO,
+                 condominio: str = None):
+        """
+        Inicializa el archivador.
+
+        Args:
+            gestor_espera: Gestor de la lista de espera
+            gestor_salidas: Gestor de las salidas temporales
+            dias: Días que los finalizados siguen en las tablas activas (por defecto 30)
+            lote: Registros por transacción (por defecto 1000)
+            intervalo: Segundos entre archivados del hilo (por defecto 3600)
+            condominio: Clave del condominio (por defecto el activo al crearlo)
+        """
+        self.gestor_espera = gestor_espera
+        self.gestor_salidas = gestor_salidas
+        self.dias = dias
+        self.lote = lote
+        self.intervalo = intervalo
+        self.condominio = condominio or condominios.actual()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def desde_entorno(cls, gestor_espera, gestor_salidas, condominio: str = None):
+        """
+        Crea el archivador según las variables de entorno.
+
+        Returns:
+            ArchivadorHistorial: Archivador configurado (sin iniciar)
+        """
+        return cls(gestor_espera, gestor_salidas,
+                   float(os.environ.get('PARQUEO_ARCHIVADO_DIAS', DIAS_ACTIVOS)),
+                   int(os.environ.get('PARQUEO_ARCHIVADO_LOTE', TAMANO_LOTE)),
+                   float(os.environ.get('PARQUEO_ARCHIVADO_INTERVALO', INTERVALO_ARCHIVADO)),
+                   condominio)
+
+    @property
+    def activo(self) -> bool:
+        """Indica si el hilo de archivado está corriendo."""
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def iniciar(self):
+        """Arranca el hilo de archivado, con un primer archivado inmediato."""
+        if self.activo:
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ejecutar, name=f'archivado-{self.condominio}',
+                                      daemon=True)
+        self._hilo.start()
+
+    def detener(self, espera: float = None):
+        """
+        Detiene el hilo de archivado.
+
+        Args:
+            espera: Segundos máximos a esperar que termine (por defecto sin límite)
+        """
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(espera)
+            self._hilo = None
+
+    def archivar(self, antes_de: datetime = None) -> dict:
+        """
+        Archiva por lotes todo el historial finalizado anterior a una fecha.
+
+        Args:
+            antes_de: Fecha límite (por defecto, hace 'dias' días)
+
+        Returns:
+            dict: Registros archivados por tabla ('lista_espera', 'movimientos_temporales')
+        """
+        antes_de = antes_de or datetime.now() - timedelta(days=self.dias)
+        archivados = {'lista_espera': 0, 'movimientos_temporales': 0}
+        tareas = (('lista_espera', self.gestor_espera.archivar_finalizados),
+                  ('movimientos_temporales', self.gestor_salidas.archivar_retornados))
+        with self._lock:
+            for tabla, archivar_lote in tareas:
+                while not self._detener.is_set():
+                    with transaccion() as unidad:
+                        movidos = archivar_lote(antes_de, self.lote)
+                        if unidad.fallida:
+                            movidos = 0
+                    archivados[tabla] += movidos
+                    if movidos < self.lote:
+                        break
+        return archivados
+
+    def _ejecutar(self):
+        """Ciclo del hilo: archiva y espera el intervalo."""
+        while not self._detener.is_set():
+            try:
+                with condominios.usar(self.condominio):
+                    self.archivar()
+            except Exception as error:
+                print(f"Error al archivar historial: {str(error)}")
+            self._detener.wait(self.intervalo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivado del historial de espera y salidas temporales")
+    parser.add_argument('--dias', type=float,
+                        default=float(os.environ.get('PARQUEO_ARCHIVADO_DIAS', DIAS_ACTIVOS)),
+                        help="Días que los finalizados siguen en las tablas activas")
+    parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Registros por transacción")
+    parser.add_argument('--condominio', choices=list(condominios.configurados),
+                        help="Condominio a archivar (por defecto todos)")
+    args = parser.parse_args()
+
+    if not db_config.inicializar_pool():
+        return 1
+
+    for clave in [args.condominio] if args.condominio else list(condominios.configurados):
+        with condominios.usar(clave):
+            archivador = ArchivadorHistorial(GestorListaEspera(), GestorSalidasTemporales(),
+                                             args.dias, args.lote, condominio=clave)
+            archivados = archivador.archivar()
+        print(f"{clave}: lista de espera {archivados['lista_espera']}, "
+              f"movimientos temporales {archivados['movimientos_temporales']}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,636 @@
+"""
+Módulo de la bitácora de eventos del parqueo.
+Cada estacionamiento, salida, salida temporal, retorno y cambio de la lista
+de espera se agrega como un registro binario de tamaño fijo al final de un
+archivo mapeado en memoria (mmap). Cada cierto número de eventos se guarda
+una instantánea del estado; al iniciar se carga la última instantánea y se
+reproducen los eventos posteriores; el motor de pilas usa ese estado al
+iniciar sólo si coincide exactamente con la base de datos. Con las
+instantáneas anteriores se reconstruye el estado de cualquier momento
+posterior a la más antigua; sólo se conservan las últimas
+PARQUEO_BITACORA_CONSERVAR.
+
+Los eventos se escriben cuando la unidad de trabajo que los produjo se
+confirma; los de una unidad revertida se descartan. Cada vez que el motor
+carga su estado desde la base de datos (al iniciar o tras revertir una
+unidad) lo compara con el de la bitácora y, sólo si difiere, guarda una
+instantánea base que corrige la diferencia. Un solo proceso debe escribir
+en la carpeta de la bitácora.
+
+Formato del archivo eventos.bin:
+    Cabecera de 16 bytes (magia, versión, tamaño de registro, reservado) y
+    registros de 36 bytes: CRC32 del resto, secuencia, marca de tiempo,
+    id_vehiculo, id_espacio_fila, dato (posición o id_espera) y tipo. Un
+    registro con CRC o secuencia inválidos marca el final de la bitácora.
+
+Cada condominio tiene su propia bitácora: la del predeterminado en la
+carpeta configurada y la de los demás en una subcarpeta con su clave.
+
+Variables de entorno:
+    PARQUEO_BITACORA_DIRECTORIO: Carpeta de la bitácora (sin definir = deshabilitada)
+    PARQUEO_BITACORA_INSTANTANEA: Eventos entre instantáneas (por defecto 10000)
+    PARQUEO_BITACORA_SINCRONIZAR: '1' para forzar a disco cada escritura (por defecto 0)
+    PARQUEO_BITACORA_CONSERVAR: Instantáneas que se conservan (por defecto 10)
+
+Uso:
+    python -m app.bitacora <carpeta> estado [--en '2026-10-17 12:00']
+    python -m app.bitacora <carpeta> eventos [--desde 1] [--limite 50]
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime
+from app import condominios
+from app.unidad_trabajo import ejecutar_al_confirmar
+
+ESTACIONAR = 1
+SALIR = 2
+SALIDA_TEMPORAL = 3
+RETORNO = 4
+ENCOLAR = 5
+DESENCOLAR = 6
+
+NOMBRES_EVENTOS = {
+    ESTACIONAR: 'estacionar',
+    SALIR: 'salir',
+    SALIDA_TEMPORAL: 'salida_temporal',
+    RETORNO: 'retorno',
+    ENCOLAR: 'encolar',
+    DESENCOLAR: 'desencolar',
+}
+
+VERSION = 1
+VERSION_INSTANTANEA = 2  # 2: cantidad de vehículos por fila en 16 bits
+MAGIA_EVENTOS = b'PQBT'
+MAGIA_INSTANTANEA = b'PQIN'
+ARCHIVO_EVENTOS = 'eventos.bin'
+EVENTOS_POR_INSTANTANEA = 10000
+INSTANTANEAS_CONSERVADAS = 10
+CRECIMIENTO = 1 << 20  # Bytes que se agregan al archivo cuando se llena
+
+CABECERA = struct.Struct('<4sHHQ')
+CUERPO = struct.Struct('<QdIIiB3x')  # secuencia, marca, vehículo, fila, dato, tipo
+CRC = struct.Struct('<I')
+TAMANO_REGISTRO = CRC.size + CUERPO.size
+
+CABECERA_INSTANTANEA = struct.Struct('<4sHQdIII')  # magia, versión, secuencia, marca, filas, espera, temporales
+FILA_INSTANTANEA = struct.Struct('<IHBH')  # id, capacidad, largo del número, vehículos
+VEHICULO_INSTANTANEA = struct.Struct('<Id')  # id_vehiculo, entrada
+ESPERA_INSTANTANEA = struct.Struct('<iI')  # id_espera, id_vehiculo
+TEMPORAL_INSTANTANEA = struct.Struct('<IIi')  # id_vehiculo, id_espacio_fila, posición de origen
+
+
+class Evento:
+    """
+    Evento leído de la bitácora.
+
+    Atributos:
+        secuencia (int): Número consecutivo del evento (desde 1)
+        marca (float): Hora del evento en segundos epoch
+        tipo (int): Tipo de evento (ESTACIONAR, SALIR, ...)
+        id_vehiculo (int): Vehículo del evento (0 si no aplica)
+        id_espacio_fila (int): Fila del evento (0 si no aplica)
+        dato (int): Posición en la fila, o id_espera en la lista de espera
+    """
+    __slots__ = ('secuencia', 'marca', 'tipo', 'id_vehiculo', 'id_espacio_fila', 'dato')
+
+    def __init__(self, secuencia: int, marca: float, tipo: int, id_vehiculo: int,
+                 id_espacio_fila: int, dato: int):
+        self.secuencia = secuencia
+        self.marca = marca
+        self.tipo = tipo
+        self.id_vehiculo = id_vehiculo
+        self.id_espacio_fila = id_espacio_fila
+        self.dato = dato
+
+    def to_dict(self) -> dict:
+        """Devuelve el evento como diccionario serializable a JSON."""
+        return {
+            'secuencia': self.secuencia,
+            'fecha': datetime.fromtimestamp(self.marca).isoformat(' ', 'seconds'),
+            'tipo': NOMBRES_EVENTOS.get(self.tipo, self.tipo),
+            'id_vehiculo': self.id_vehiculo,
+            'id_espacio_fila': self.id_espacio_fila,
+            'dato': self.dato,
+        }
+
+
+class EstadoParqueo:
+    """
+    Estado del parqueo que se reconstruye reproduciendo la bitácora.
+
+    Atributos:
+        secuencia (int): Último evento aplicado
+        marca (float): Hora del último evento aplicado (segundos epoch)
+        filas (dict): (numero_espacio, capacidad) por id_espacio_fila
+        pilas (dict): Vehículos del fondo al tope por id_espacio_fila
+        entradas (dict): Hora de entrada (segundos epoch) por id_vehiculo estacionado
+        espera (dict): id_vehiculo por id_espera pendiente, en orden de llegada
+        temporales (dict): (id_espacio_fila, posicion_origen) por vehículo con salida temporal
+    """
+
+    def __init__(self, secuencia: int = 0, marca: float = 0.0):
+        self.secuencia = secuencia
+        self.marca = marca
+        self.filas = {}
+        self.pilas = {}
+        self.entradas = {}
+        self.espera = {}
+        self.temporales = {}
+
+    def aplicar(self, evento: Evento):
+        """Aplica un evento al estado."""
+        tipo, id_vehiculo, id_espacio_fila = evento.tipo, evento.id_vehiculo, evento.id_espacio_fila
+        if tipo == ESTACIONAR or tipo == RETORNO:
+            self.pilas.setdefault(id_espacio_fila, []).append(id_vehiculo)
+            self.temporales.pop(id_vehiculo, None)
+            if tipo == ESTACIONAR:
+                self.entradas[id_vehiculo] = evento.marca
+            else:
+                self.entradas.setdefault(id_vehiculo, evento.marca)
+        elif tipo == SALIR or tipo == SALIDA_TEMPORAL:
+            pila = self.pilas.get(id_espacio_fila)
+            if pila and id_vehiculo in pila:
+                pila.remove(id_vehiculo)
+            if tipo == SALIR:
+                self.entradas.pop(id_vehiculo, None)
+            else:
+                self.temporales[id_vehiculo] = (id_espacio_fila, evento.dato)
+        elif tipo == ENCOLAR:
+            self.espera[evento.dato] = id_vehiculo
+        elif tipo == DESENCOLAR:
+            self.espera.pop(evento.dato, None)
+        self.secuencia = evento.secuencia
+        self.marca = evento.marca
+
+    def coincide(self, otro) -> bool:
+        """
+        Indica si otro estado tiene las mismas filas, pilas, lista de espera
+        y salidas temporales (las horas de entrada no se comparan).
+
+        Args:
+            otro: Estado a comparar
+
+        Returns:
+            bool: True si el contenido es el mismo
+        """
+        return (self.filas == otro.filas
+                and {fila: pila for fila, pila in self.pilas.items() if pila}
+                == {fila: pila for fila, pila in otro.pilas.items() if pila}
+                and list(self.espera.items()) == list(otro.espera.items())
+                and self.temporales == otro.temporales)
+
+    def to_dict(self) -> dict:
+        """Devuelve el estado como diccionario serializable a JSON."""
+        return {
+            'secuencia': self.secuencia,
+            'fecha': datetime.fromtimestamp(self.marca).isoformat(' ', 'seconds') if self.marca else None,
+            'filas': {numero: self.pilas.get(id_espacio_fila, [])
+                      for id_espacio_fila, (numero, _) in sorted(self.filas.items(), key=lambda item: item[1][0])},
+            'lista_espera': [{'id_espera': id_espera, 'id_vehiculo': id_vehiculo}
+                             for id_espera, id_vehiculo in self.espera.items()],
+            'temporales': [{'id_vehiculo': id_vehiculo, 'id_espacio_fila': id_fila, 'posicion_origen': posicion}
+                           for id_vehiculo, (id_fila, posicion) in self.temporales.items()],
+        }
+
+
+def guardar_instantanea(ruta: str, estado: EstadoParqueo):
+    """
+    Escribe el estado en un archivo binario, de forma atómica.
+
+    Args:
+        ruta: Archivo de la instantánea
+        estado: Estado a guardar
+    """
+    partes = [CABECERA_INSTANTANEA.pack(MAGIA_INSTANTANEA, VERSION_INSTANTANEA, estado.secuencia, estado.marca,
+                                        len(estado.filas), len(estado.espera), len(estado.temporales))]
+    for id_espacio_fila, (numero_espacio, capacidad) in estado.filas.items():
+        numero = numero_espacio.encode('utf-8')
+        pila = estado.pilas.get(id_espacio_fila, [])
+        partes.append(FILA_INSTANTANEA.pack(id_espacio_fila, capacidad, len(numero), len(pila)))
+        partes.append(numero)
+        for id_vehiculo in pila:
+            partes.append(VEHICULO_INSTANTANEA.pack(id_vehiculo, estado.entradas.get(id_vehiculo, estado.marca)))
+    for id_espera, id_vehiculo in estado.espera.items():
+        partes.append(ESPERA_INSTANTANEA.pack(id_espera, id_vehiculo))
+    for id_vehiculo, (id_espacio_fila, posicion) in estado.temporales.items():
+        partes.append(TEMPORAL_INSTANTANEA.pack(id_vehiculo, id_espacio_fila, posicion))
+
+    temporal = ruta + '.tmp'
+    with open(temporal, 'wb') as archivo:
+        archivo.write(b''.join(partes))
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(temporal, ruta)
+
+
+def leer_instantanea(ruta: str) -> EstadoParqueo:
+    """
+    Lee una instantánea escrita con guardar_instantanea().
+
+    Args:
+        ruta: Archivo de la instantánea
+
+    Returns:
+        EstadoParqueo: Estado guardado
+
+    Raises:
+        ValueError: Si el archivo no es una instantánea válida
+    """
+    with open(ruta, 'rb') as archivo:
+        datos = archivo.read()
+    magia, version, secuencia, marca, filas, espera, temporales = CABECERA_INSTANTANEA.unpack_from(datos)
+    if magia != MAGIA_INSTANTANEA or version != VERSION_INSTANTANEA:
+        raise ValueError(f"Instantánea inválida: {ruta}")
+
+    estado = EstadoParqueo(secuencia, marca)
+    desplazamiento = CABECERA_INSTANTANEA.size
+    for _ in range(filas):
+        id_espacio_fila, capacidad, largo, cantidad = FILA_INSTANTANEA.unpack_from(datos, desplazamiento)
+        desplazamiento += FILA_INSTANTANEA.size
+        numero = datos[desplazamiento:desplazamiento + largo].decode('utf-8')
+        desplazamiento += largo
+        estado.filas[id_espacio_fila] = (numero, capacidad)
+        pila = estado.pilas[id_espacio_fila] = []
+        for _ in range(cantidad):
+            id_vehiculo, entrada = VEHICULO_INSTANTANEA.unpack_from(datos, desplazamiento)
+            desplazamiento += VEHICULO_INSTANTANEA.size
+            pila.append(id_vehiculo)
+            estado.entradas[id_vehiculo] = entrada
+    for id_espera, id_vehiculo in ESPERA_INSTANTANEA.iter_unpack(
+            datos[desplazamiento:desplazamiento + espera * ESPERA_INSTANTANEA.size]):
+        estado.espera[id_espera] = id_vehiculo
+    desplazamiento += espera * ESPERA_INSTANTANEA.size
+    for id_vehiculo, id_espacio_fila, posicion in TEMPORAL_INSTANTANEA.iter_unpack(
+            datos[desplazamiento:desplazamiento + temporales * TEMPORAL_INSTANTANEA.size]):
+        estado.temporales[id_vehiculo] = (id_espacio_fila, posicion)
+    return estado
+
+
+def listar_instantaneas(directorio: str) -> list:
+    """
+    Lista las instantáneas de una carpeta.
+
+    Args:
+        directorio: Carpeta de la bitácora
+
+    Returns:
+        list[tuple]: (secuencia, ruta) ordenadas por secuencia
+    """
+    instantaneas = []
+    for nombre in os.listdir(directorio):
+        if nombre.startswith('instantanea-') and nombre.endswith('.bin'):
+            instantaneas.append((int(nombre[12:-4]), os.path.join(directorio, nombre)))
+    return sorted(instantaneas)
+
+
+def desplazamiento_evento(secuencia: int) -> int:
+    """Devuelve la posición en bytes del registro de un evento."""
+    return CABECERA.size + (secuencia - 1) * TAMANO_REGISTRO
+
+
+def decodificar_evento(datos, desplazamiento: int, secuencia: int) -> Evento:
+    """
+    Decodifica el registro de un evento y verifica su CRC y su secuencia.
+
+    Returns:
+        Evento: Evento válido o None si el registro no está escrito o está dañado
+    """
+    if desplazamiento + TAMANO_REGISTRO > len(datos):
+        return None
+    crc, = CRC.unpack_from(datos, desplazamiento)
+    cuerpo = datos[desplazamiento + CRC.size:desplazamiento + TAMANO_REGISTRO]
+    if crc != zlib.crc32(cuerpo):
+        return None
+    leida, marca, id_vehiculo, id_espacio_fila, dato, tipo = CUERPO.unpack(cuerpo)
+    if leida != secuencia:
+        return None
+    return Evento(secuencia, marca, tipo, id_vehiculo, id_espacio_fila, dato)
+
+
+def leer_eventos(ruta: str, desde: int = 1):
+    """
+    Recorre los eventos de un archivo de bitácora a partir de una secuencia.
+    Lee el archivo con E/S normal, por lo que puede usarse mientras la
+    aplicación escribe.
+
+    Args:
+        ruta: Archivo eventos.bin
+        desde: Primera secuencia a leer (por defecto 1)
+
+    Yields:
+        Evento: Eventos válidos en orden hasta el primer registro inválido
+    """
+    bloque = 4096 * TAMANO_REGISTRO
+    with open(ruta, 'rb') as archivo:
+        secuencia = max(desde, 1)
+        while True:
+            archivo.seek(desplazamiento_evento(secuencia))
+            datos = archivo.read(bloque)
+            for inicio in range(0, len(datos) - TAMANO_REGISTRO + 1, TAMANO_REGISTRO):
+                evento = decodificar_evento(datos, inicio, secuencia)
+                if evento is None:
+                    return
+                yield evento
+                secuencia += 1
+            if len(datos) < bloque:
+                return
+
+
+def reconstruir(directorio: str, momento: float = None) -> EstadoParqueo:
+    """
+    Reconstruye el estado del parqueo en un momento dado a partir de la
+    última instantánea anterior a ese momento y los eventos siguientes.
+
+    Args:
+        directorio: Carpeta de la bitácora
+        momento: Hora en segundos epoch (por defecto, el estado más reciente)
+
+    Returns:
+        EstadoParqueo: Estado reconstruido o None si la bitácora no cubre ese momento
+    """
+    estado = None
+    for secuencia, ruta in reversed(listar_instantaneas(directorio)):
+        try:
+            candidato = leer_instantanea(ruta)
+        except (ValueError, struct.error):
+            continue
+        if momento is None or candidato.marca <= momento:
+            estado = candidato
+            break
+    if estado is None:
+        return None
+
+    for evento in leer_eventos(os.path.join(directorio, ARCHIVO_EVENTOS), estado.secuencia + 1):
+        if momento is not None and evento.marca > momento:
+            break
+        estado.aplicar(evento)
+    return estado
+
+
+class Bitacora:
+    """
+    Escritor de la bitácora de eventos sobre un archivo mapeado en memoria.
+    Mantiene el estado actual aplicando cada evento que escribe.
+
+    Atributos:
+        directorio (str): Carpeta con eventos.bin e instantanea-<secuencia>.bin
+        eventos_por_instantanea (int): Eventos entre instantáneas periódicas
+        conservar (int): Instantáneas que se conservan (0 = todas)
+        sincronizar (bool): Si cada escritura se fuerza a disco
+        estado (EstadoParqueo): Estado tras el último evento escrito
+        tiene_base (bool): Si hay al menos una instantánea de la cual partir
+        _secuencia (int): Último evento escrito
+        _sin_instantanea (int): Eventos escritos desde la última instantánea
+    """
+
+    def __init__(self, directorio: str, eventos_por_instantanea: int = EVENTOS_POR_INSTANTANEA,
+                 sincronizar: bool = False, conservar: int = INSTANTANEAS_CONSERVADAS):
+        """
+        Abre (o crea) la bitácora y recupera el estado más reciente.
+
+        Args:
+            directorio: Carpeta de la bitácora
+            eventos_por_instantanea: Eventos entre instantáneas (por defecto 10000)
+            sincronizar: Forzar a disco cada escritura (por defecto False)
+            conservar: Instantáneas que se conservan, 0 = todas (por defecto 10)
+
+        Raises:
+            ValueError: Si eventos.bin no es una bitácora de esta versión
+        """
+        self.directorio = directorio
+        self.eventos_por_instantanea = eventos_por_instantanea
+        self.conservar = conservar
+        self.sincronizar = sincronizar
+        self._lock = threading.Lock()
+        os.makedirs(directorio, exist_ok=True)
+
+        ruta = os.path.join(directorio, ARCHIVO_EVENTOS)
+        nuevo = not os.path.exists(ruta) or os.path.getsize(ruta) < CABECERA.size
+        self._archivo = open(ruta, 'w+b' if nuevo else 'r+b')
+        if nuevo:
+            self._archivo.write(CABECERA.pack(MAGIA_EVENTOS, VERSION, TAMANO_REGISTRO, 0))
+            self._archivo.truncate(CRECIMIENTO)
+        self._mapa = mmap.mmap(self._archivo.fileno(), 0)
+        magia, version, tamano, _ = CABECERA.unpack_from(self._mapa)
+        if magia != MAGIA_EVENTOS or version != VERSION or tamano != TAMANO_REGISTRO:
+            self.cerrar()
+            raise ValueError(f"Bitácora inválida: {ruta}")
+
+        # La última instantánea legible; las de otra versión se ignoran y el
+        # motor fija una base nueva desde la base de datos
+        self.estado, base, self.tiene_base = EstadoParqueo(), 0, False
+        for secuencia, ruta in reversed(listar_instantaneas(directorio)):
+            try:
+                self.estado, base, self.tiene_base = leer_instantanea(ruta), secuencia, True
+                break
+            except (ValueError, struct.error) as error:
+                print(f"Error al leer la instantánea de la bitácora: {str(error)}")
+
+        # Reproduce los eventos posteriores a la instantánea directamente del mapa
+        self._secuencia = self.estado.secuencia
+        while True:
+            evento = decodificar_evento(self._mapa, desplazamiento_evento(self._secuencia + 1),
+                                        self._secuencia + 1)
+            if evento is None:
+                break
+            self.estado.aplicar(evento)
+            self._secuencia = evento.secuencia
+        self._sin_instantanea = self._secuencia - base
+
+    @classmethod
+    def desde_entorno(cls, clave_condominio: str = None):
+        """
+        Abre la bitácora según las variables de entorno.
+
+        Args:
+            clave_condominio: Condominio dueño (por defecto el predeterminado)
+
+        Returns:
+            Bitacora: Bitácora abierta o None si está deshabilitada o no se pudo abrir
+        """
+        directorio = os.environ.get('PARQUEO_BITACORA_DIRECTORIO')
+        if not directorio:
+            return None
+        if clave_condominio and clave_condominio != condominios.predeterminado:
+            directorio = os.path.join(directorio, clave_condominio)
+        try:
+            return cls(directorio,
+                       int(os.environ.get('PARQUEO_BITACORA_INSTANTANEA', EVENTOS_POR_INSTANTANEA)),
+                       os.environ.get('PARQUEO_BITACORA_SINCRONIZAR', '0') == '1',
+                       int(os.environ.get('PARQUEO_BITACORA_CONSERVAR', INSTANTANEAS_CONSERVADAS)))
+        except (OSError, ValueError) as error:
+            print(f"Error al abrir la bitácora: {str(error)}")
+            return None
+
+    @property
+    def secuencia(self) -> int:
+        """Devuelve la secuencia del último evento escrito."""
+        return self._secuencia
+
+    def anexar(self, eventos: list):
+        """
+        Escribe eventos al final de la bitácora y los aplica al estado.
+
+        Args:
+            eventos: Tuplas (tipo, id_vehiculo, id_espacio_fila, dato, marca)
+        """
+        with self._lock:
+            for tipo, id_vehiculo, id_espacio_fila, dato, marca in eventos:
+                secuencia = self._secuencia + 1
+                inicio = desplazamiento_evento(secuencia)
+                if inicio + TAMANO_REGISTRO > len(self._mapa):
+                    self._crecer(inicio + TAMANO_REGISTRO)
+                cuerpo = CUERPO.pack(secuencia, marca, id_vehiculo, id_espacio_fila, dato, tipo)
+                self._mapa[inicio + CRC.size:inicio + TAMANO_REGISTRO] = cuerpo
+                self._mapa[inicio:inicio + CRC.size] = CRC.pack(zlib.crc32(cuerpo))
+                self._secuencia = secuencia
+                self.estado.aplicar(Evento(secuencia, marca, tipo, id_vehiculo, id_espacio_fila, dato))
+            if self.sincronizar:
+                self._mapa.flush()
+            self._sin_instantanea += len(eventos)
+            if self._sin_instantanea >= self.eventos_por_instantanea:
+                self._guardar_instantanea()
+
+    def fijar_base(self, estado: EstadoParqueo):
+        """
+        Reemplaza el estado por uno leído de la base de datos y lo guarda
+        como instantánea, para que los eventos siguientes partan de él.
+        Si coincide con el de la bitácora (lo normal tras revertir una
+        unidad, cuyos eventos nunca se escribieron) no guarda nada.
+
+        Args:
+            estado: Estado completo leído de la base de datos
+        """
+        with self._lock:
+            if self.tiene_base and self.estado.coincide(estado):
+                return
+            estado.secuencia = self._secuencia
+            estado.marca = time.time()
+            self.estado = estado
+            self._guardar_instantanea()
+            self.tiene_base = True
+
+    def estado_en(self, momento: float) -> EstadoParqueo:
+        """
+        Reconstruye el estado en un momento pasado.
+
+        Args:
+            momento: Hora en segundos epoch
+
+        Returns:
+            EstadoParqueo: Estado reconstruido o None si la bitácora no cubre ese momento
+        """
+        with self._lock:
+            self._mapa.flush()
+        return reconstruir(self.directorio, momento)
+
+    def cerrar(self):
+        """Fuerza a disco lo escrito y cierra el archivo."""
+        with self._lock:
+            if self._mapa is not None:
+                self._mapa.flush()
+                self._mapa.close()
+                self._mapa = None
+            self._archivo.close()
+
+    def _guardar_instantanea(self):
+        """
+        Guarda el estado actual como instantánea de la secuencia actual y
+        borra las más antiguas que excedan las conservadas.
+        """
+        self._mapa.flush()
+        guardar_instantanea(os.path.join(self.directorio, f"instantanea-{self._secuencia:012d}.bin"),
+                            self.estado)
+        self._sin_instantanea = 0
+        if self.conservar > 0:
+            for _, ruta in listar_instantaneas(self.directorio)[:-self.conservar]:
+                try:
+                    os.remove(ruta)
+                except OSError as error:
+                    print(f"Error al borrar la instantánea {ruta}: {str(error)}")
+
+    def _crecer(self, minimo: int):
+        """Agranda el archivo en bloques de CRECIMIENTO bytes y lo vuelve a mapear."""
+        self._mapa.flush()
+        self._mapa.close()
+        self._archivo.truncate((minimo // CRECIMIENTO + 1) * CRECIMIENTO)
+        self._mapa = mmap.mmap(self._archivo.fileno(), 0)
+
+
+bitacoras = condominios.PorCondominio(lambda condominio: Bitacora.desde_entorno(condominio.clave))
+
+
+def activa() -> Bitacora:
+    """Devuelve la bitácora del condominio activo o None si está deshabilitada."""
+    return bitacoras.obtener()
+
+
+def habilitada() -> bool:
+    """Indica si hay una bitácora activa."""
+    return activa() is not None
+
+
+def registrar(tipo: int, id_vehiculo: int = 0, id_espacio_fila: int = 0, dato: int = 0):
+    """Registra un evento; ver registrar_eventos()."""
+    registrar_eventos([(tipo, id_vehiculo, id_espacio_fila, dato)])
+
+
+def registrar_eventos(eventos: list):
+    """
+    Registra eventos en la bitácora activa al confirmarse la unidad de
+    trabajo (o de inmediato si no hay unidad). Sin bitácora no hace nada.
+
+    Args:
+        eventos: Tuplas (tipo, id_vehiculo, id_espacio_fila, dato)
+    """
+    bitacora = activa()
+    if bitacora is None or not eventos:
+        return
+    marca = time.time()
+    registros = [(tipo, id_vehiculo or 0, id_espacio_fila or 0, dato or 0, marca)
+                 for tipo, id_vehiculo, id_espacio_fila, dato in eventos]
+    ejecutar_al_confirmar(lambda: bitacora.anexar(registros))
+
+
+def fijar_base(estado: EstadoParqueo):
+    """Guarda en la bitácora activa un estado leído de la base de datos al confirmarse la unidad."""
+    bitacora = activa()
+    if bitacora is not None:
+        ejecutar_al_confirmar(lambda: bitacora.fijar_base(estado))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consulta la bitácora de eventos del parqueo")
+    parser.add_argument('directorio', help="Carpeta de la bitácora")
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+    estado = subcomandos.add_parser('estado', help="Estado del parqueo reconstruido")
+    estado.add_argument('--en', help="Fecha y hora 'AAAA-MM-DD HH:MM[:SS]' (por defecto, ahora)")
+    eventos = subcomandos.add_parser('eventos', help="Eventos registrados")
+    eventos.add_argument('--desde', type=int, default=1, help="Primera secuencia")
+    eventos.add_argument('--limite', type=int, default=50, help="Eventos a mostrar")
+    args = parser.parse_args()
+
+    if args.comando == 'estado':
+        momento = datetime.fromisoformat(args.en).timestamp() if args.en else None
+        resultado = reconstruir(args.directorio, momento)
+        if resultado is None:
+            print("La bitácora no cubre ese momento")
+            return 1
+        print(json.dumps(resultado.to_dict(), indent=2, ensure_ascii=False))
+    else:
+        ruta = os.path.join(args.directorio, ARCHIVO_EVENTOS)
+        for indice, evento in enumerate(leer_eventos(ruta, args.desde)):
+            if indice >= args.limite:
+                break
+            print(json.dumps(evento.to_dict(), ensure_ascii=False))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
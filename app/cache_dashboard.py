@@ -0,0 +1,114 @@
+"""
+Módulo de caché para los datos del dashboard.
+Guarda la última instantánea de datos junto con la versión global de datos
+con la que se calculó; cualquier ruta que modifica datos incrementa la
+versión, de modo que el dashboard sólo vuelve a consultar la base de datos
+cuando algo cambió.
+
+La versión es local al proceso: con varios procesos, los cambios hechos por
+otro proceso se ven cuando vence la instantánea. Por eso la vigencia tiene
+un límite por defecto; sólo con un único proceso conviene quitarlo.
+
+Variables de entorno:
+    PARQUEO_CACHE_VIGENCIA: Segundos máximos que se sirve una instantánea
+        (por defecto 5; '0' sin límite, sólo para un único proceso)
+"""
+import os
+import threading
+import time
+
+VIGENCIA = 5.0
+
+
+class CacheDashboard:
+    """
+    Caché de una sola instantánea indexada por versión de datos.
+
+    La versión es local al proceso; con varios procesos de la aplicación,
+    la vigencia limita cuánto puede tardar en verse un cambio hecho por
+    otro proceso.
+
+    Atributos:
+        _version (int): Versión global actual de los datos
+        _datos: Última instantánea calculada
+        _version_datos (int): Versión con la que se calculó la instantánea
+        vigencia (float): Segundos máximos que se sirve una instantánea (None = sin límite)
+    """
+
+    def __init__(self, vigencia: float = None):
+        """
+        Inicializa la caché vacía.
+
+        Args:
+            vigencia: Segundos máximos de validez de una instantánea (opcional)
+        """
+        self.vigencia = vigencia
+        self._version = 0
+        self._datos = None
+        self._version_datos = -1
+        self._momento_datos = 0.0
+        self._aciertos = 0
+        self._fallos = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def desde_entorno(cls):
+        """
+        Crea la caché según PARQUEO_CACHE_VIGENCIA.
+
+        Returns:
+            CacheDashboard: Caché con la vigencia configurada
+        """
+        vigencia = float(os.environ.get('PARQUEO_CACHE_VIGENCIA', VIGENCIA))
+        return cls(vigencia if vigencia > 0 else None)
+
+    @property
+    def version(self) -> int:
+        """Devuelve la versión global actual de los datos."""
+        return self._version
+
+    def invalidar(self):
+        """Incrementa la versión global; la próxima lectura recalcula los datos."""
+        with self._lock:
+            self._version += 1
+
+    def obtener(self, cargador):
+        """
+        Devuelve la instantánea vigente o la recalcula con el cargador.
+
+        Args:
+            cargador: Función sin argumentos que calcula los datos del dashboard
+
+        Returns:
+            Los datos en caché o los recién calculados
+        """
+        with self._lock:
+            version = self._version
+            if self._version_datos == version and not self._expirada():
+                self._aciertos += 1
+                return self._datos
+            self._fallos += 1
+
+        datos = cargador()
+
+        with self._lock:
+            # Si hubo una escritura mientras se calculaba, no se guarda
+            if self._version == version:
+                self._datos = datos
+                self._version_datos = version
+                self._momento_datos = time.monotonic()
+        return datos
+
+    def estadisticas(self) -> dict:
+        """Devuelve la versión actual y los aciertos/fallos de la caché."""
+        with self._lock:
+            return {
+                'version': self._version,
+                'aciertos': self._aciertos,
+                'fallos': self._fallos,
+            }
+
+    def _expirada(self) -> bool:
+        """Indica si la instantánea superó la vigencia configurada."""
+        return (self.vigencia is not None
+                and time.monotonic() - self._momento_datos > self.vigencia)
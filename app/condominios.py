@@ -0,0 +1,263 @@
+"""
+Módulo de los condominios atendidos por una misma instalación.
+Cada condominio tiene su propia base de datos (archivo SQLite o base de
+SQL Server) con su propio pool de conexiones, y su propio motor de pilas,
+caché del dashboard, bitácora y drenado de la lista de espera. Así
+Usuarios, Vehiculos, ListaEspera, MovimientosTemporales y EspaciosFila
+quedan particionados por condominio sin cambiar las consultas de los
+gestores, y el tráfico de un condominio grande no agota las conexiones ni
+invalida las cachés de los demás.
+
+El condominio activo se guarda en una ContextVar, igual que la unidad de
+trabajo: get_conexion() y los demás recursos por condominio lo consultan
+para elegir su instancia. En una solicitud se toma, en orden, de la
+cabecera X-Condominio, del parámetro ?condominio=, del subdominio o de la
+cookie 'condominio'; si no se indica ninguno se usa el predeterminado.
+
+Variables de entorno:
+    PARQUEO_CONDOMINIOS: Archivo JSON con los condominios (sin definir = uno
+        solo, 'principal', con la configuración de conexión de siempre)
+    PARQUEO_CONDOMINIO_PREDETERMINADO: Clave usada cuando la solicitud no
+        indica condominio (por defecto el primero del archivo)
+    PARQUEO_REPLICA_CADENA_CONEXION: Réplica SQL Server de 'principal' (opcional)
+    PARQUEO_REPLICA_SQLITE_RUTA: Copia SQLite de sólo lectura de 'principal' (opcional)
+
+Formato del archivo:
+    {
+        "torre-norte": {"nombre": "Torre Norte", "backend": "sqlite",
+                        "sqlite_ruta": "norte.db"},
+        "las-palmas": {"nombre": "Las Palmas",
+                       "cadena_conexion": "DRIVER=...;DATABASE=Palmas;...",
+                       "replica_cadena_conexion": "DRIVER=...;SERVER=lectura;..."}
+    }
+"""
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+CLAVE_PRINCIPAL = 'principal'
+CABECERA = 'X-Condominio'
+PARAMETRO = 'condominio'
+CLAVE_VALIDA = re.compile(r'^[a-z0-9][a-z0-9_-]{0,39}$')
+
+_condominio_actual = ContextVar('condominio', default=None)
+
+
+class CondominioDesconocidoError(Exception):
+    """Se lanza cuando se pide un condominio que no está configurado."""
+
+
+class Condominio:
+    """
+    Configuración de un condominio.
+
+    Atributos:
+        clave (str): Identificador corto (minúsculas, dígitos, '-' y '_')
+        nombre (str): Nombre para mostrar
+        backend (str): 'sqlserver' o 'sqlite' (None = PARQUEO_BACKEND)
+        cadena_conexion (str): Cadena ODBC de su base SQL Server (opcional)
+        sqlite_ruta (str): Archivo de su base SQLite (opcional)
+        replica_cadena_conexion (str): Cadena ODBC de su réplica de lectura (opcional)
+        replica_sqlite_ruta (str): Copia SQLite de sólo lectura (opcional)
+    """
+
+    def __init__(self, clave: str, nombre: str = None, backend: str = None,
+                 cadena_conexion: str = None, sqlite_ruta: str = None,
+                 replica_cadena_conexion: str = None, replica_sqlite_ruta: str = None):
+        """
+        Inicializa la configuración de un condominio.
+
+        Raises:
+            ValueError: Si la clave no es válida
+        """
+        if not CLAVE_VALIDA.match(clave or ''):
+            raise ValueError(f"Clave de condominio inválida: {clave!r}")
+        self.clave = clave
+        self.nombre = nombre or clave
+        self.backend = backend
+        self.cadena_conexion = cadena_conexion
+        self.sqlite_ruta = sqlite_ruta
+        self.replica_cadena_conexion = replica_cadena_conexion
+        self.replica_sqlite_ruta = replica_sqlite_ruta
+
+    @property
+    def tiene_replica(self) -> bool:
+        """Indica si el condominio tiene una réplica para las lecturas."""
+        return bool(self.replica_cadena_conexion or self.replica_sqlite_ruta)
+
+    def to_dict(self) -> dict:
+        """Devuelve la clave y el nombre (sin datos de conexión)."""
+        return {'clave': self.clave, 'nombre': self.nombre}
+
+
+def cargar_condominios(ruta: str = None) -> dict:
+    """
+    Lee los condominios configurados.
+
+    Args:
+        ruta: Archivo JSON (por defecto PARQUEO_CONDOMINIOS)
+
+    Returns:
+        dict: Condominio por clave, en el orden del archivo
+
+    Raises:
+        ValueError: Si el archivo no tiene el formato esperado
+    """
+    ruta = ruta or os.environ.get('PARQUEO_CONDOMINIOS')
+    if not ruta:
+        return {CLAVE_PRINCIPAL: Condominio(
+            CLAVE_PRINCIPAL,
+            replica_cadena_conexion=os.environ.get('PARQUEO_REPLICA_CADENA_CONEXION'),
+            replica_sqlite_ruta=os.environ.get('PARQUEO_REPLICA_SQLITE_RUTA')
+        )}
+
+    with open(ruta, encoding='utf-8') as archivo:
+        datos = json.load(archivo)
+    if not isinstance(datos, dict) or not datos:
+        raise ValueError(f"{ruta} debe tener al menos un condominio")
+    return {clave: Condominio(clave, **(opciones or {})) for clave, opciones in datos.items()}
+
+
+configurados = cargar_condominios()
+predeterminado = os.environ.get('PARQUEO_CONDOMINIO_PREDETERMINADO') or next(iter(configurados))
+if predeterminado not in configurados:
+    raise CondominioDesconocidoError(f"Condominio predeterminado desconocido: {predeterminado}")
+
+
+def obtener(clave: str = None) -> Condominio:
+    """
+    Devuelve la configuración de un condominio.
+
+    Args:
+        clave: Clave del condominio (por defecto el activo)
+
+    Returns:
+        Condominio: Configuración del condominio
+
+    Raises:
+        CondominioDesconocidoError: Si la clave no está configurada
+    """
+    clave = clave or actual()
+    if clave not in configurados:
+        raise CondominioDesconocidoError(f"Condominio desconocido: {clave}")
+    return configurados[clave]
+
+
+def actual() -> str:
+    """Devuelve la clave del condominio activo en el contexto (o la predeterminada)."""
+    return _condominio_actual.get() or predeterminado
+
+
+def activar(clave: str):
+    """
+    Fija el condominio activo del contexto actual.
+
+    Args:
+        clave: Clave del condominio
+
+    Returns:
+        Token para restablecer() el condominio anterior
+
+    Raises:
+        CondominioDesconocidoError: Si la clave no está configurada
+    """
+    return _condominio_actual.set(obtener(clave).clave)
+
+
+def restablecer(token):
+    """Vuelve al condominio que estaba activo antes de activar()."""
+    _condominio_actual.reset(token)
+
+
+@contextmanager
+def usar(clave: str):
+    """
+    Activa un condominio durante un bloque (consola, hilos de fondo).
+
+    Args:
+        clave: Clave del condominio
+
+    Yields:
+        Condominio: Configuración del condominio activo
+    """
+    token = activar(clave)
+    try:
+        yield configurados[clave]
+    finally:
+        restablecer(token)
+
+
+def clave_de_solicitud(solicitud) -> str:
+    """
+    Determina el condominio de una solicitud HTTP: cabecera X-Condominio,
+    parámetro ?condominio=, subdominio o cookie, en ese orden.
+
+    Args:
+        solicitud: Solicitud de Flask
+
+    Returns:
+        str: Clave indicada (puede no existir), o None si no indica ninguna
+    """
+    clave = solicitud.headers.get(CABECERA) or solicitud.args.get(PARAMETRO)
+    if clave:
+        return clave.strip().lower()
+    subdominio = solicitud.host.split(':')[0].split('.')[0].lower()
+    if subdominio in configurados:
+        return subdominio
+    return solicitud.cookies.get(PARAMETRO)
+
+
+class PorCondominio:
+    """
+    Recurso con una instancia por condominio, creada en su primer uso con
+    el condominio ya activo (para que la fábrica consulte su propia base).
+
+    Atributos:
+        fabrica (callable): Recibe el Condominio y devuelve su instancia
+        _instancias (dict): Instancia creada por clave
+        _creando (dict): Bloqueo por clave que evita crear dos veces la misma
+            instancia sin detener la creación de otros condominios
+        _lock (threading.Lock): Protege los diccionarios
+    """
+
+    def __init__(self, fabrica):
+        self.fabrica = fabrica
+        self._instancias = {}
+        self._creando = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: str = None):
+        """
+        Devuelve la instancia de un condominio, creándola si hace falta.
+
+        Args:
+            clave: Clave del condominio (por defecto el activo)
+
+        Returns:
+            Instancia del condominio (puede ser None si la fábrica la devuelve)
+        """
+        clave = clave or actual()
+        if clave in self._instancias:
+            return self._instancias[clave]
+        with self._lock:
+            creando = self._creando.setdefault(clave, threading.Lock())
+        with creando:
+            if clave not in self._instancias:
+                with usar(clave) as condominio:
+                    instancia = self.fabrica(condominio)
+                with self._lock:
+                    self._instancias[clave] = instancia
+            return self._instancias[clave]
+
+    def fijar(self, clave: str, instancia):
+        """Reemplaza la instancia de un condominio (por ejemplo, en benchmarks)."""
+        with self._lock:
+            self._instancias[clave] = instancia
+
+    def creadas(self) -> dict:
+        """Devuelve una copia de las instancias ya creadas por clave."""
+        with self._lock:
+            return dict(self._instancias)
@@ -1,17 +1,318 @@
 """
 Configuración de conexión a la base de datos.
 Utiliza variables de entorno para mayor seguridad.
+
+Las conexiones se obtienen de un pool compartido por todos los gestores,
+por lo que get_conexion() reutiliza conexiones abiertas y conn.close()
+las devuelve al pool en lugar de cerrarlas. El motor de base de datos
+(SQL Server o SQLite) se elige con PARQUEO_BACKEND; ver app/almacenamiento.py.
+Dentro de una unidad de trabajo (una por solicitud), get_conexion() entrega
+la conexión compartida de la unidad; ver app/unidad_trabajo.py. Las
+conexiones del pool miden cada sentencia; ver app/metricas.py.
+
+Cada condominio tiene su propio backend y su propio pool (mismos límites
+para todos), creados en su primer uso; get_conexion() usa los del
+condominio activo. Ver app/condominios.py.
+
+Si el condominio tiene réplica, get_conexion(lectura=True) entrega una
+conexión de su pool de lectura, para que las consultas del dashboard no
+compitan con las escrituras de la entrada. Para leer lo propio escrito, la
+lectura sigue en la primaria si la unidad de trabajo ya tomó su conexión
+o si hubo una escritura confirmada hace menos de PARQUEO_REPLICA_RETRASO
+segundos; también vuelve a la primaria si la réplica no responde. La
+última escritura confirmada se conoce sólo dentro del proceso; para que
+el cliente que escribió lea de la primaria aunque su siguiente solicitud
+llegue a otro proceso, la aplicación le devuelve la hora de su escritura
+(escritura_para_cliente()) y la pasa a iniciar_unidad_trabajo().
+
+Variables de entorno:
+    PARQUEO_CADENA_CONEXION: Cadena ODBC de conexión a SQL Server
+    PARQUEO_POOL_MIN: Conexiones pre-calentadas al iniciar (por defecto 2)
+    PARQUEO_POOL_MAX: Conexiones simultáneas máximas (por defecto 10)
+    PARQUEO_POOL_ESPERA: Segundos de espera por una conexión libre (por defecto 30)
+    PARQUEO_POOL_INACTIVIDAD: Segundos antes de cerrar una conexión ociosa (por defecto 300)
+    PARQUEO_POOL_VERIFICAR: Inactividad tras la cual se verifica la conexión (por defecto 30)
+    PARQUEO_REPLICA_RETRASO: Segundos tras una escritura en que se lee de la primaria (por defecto 2)
+    PARQUEO_REPLICA_ESPERA: Segundos de espera por una conexión libre de la réplica (por defecto 1)
 """
-import pyodbc
+import os
+import time
+from contextlib import contextmanager
+from app import condominios, metricas, migraciones, unidad_trabajo
+from app.almacenamiento import crear_backend
+from app.pool_conexiones import PoolConexiones, PoolAgotadoError
 
-def get_conexion():
-    try:
-        return pyodbc.connect(
-            'DRIVER={ODBC Driver 17 for SQL Server};'
-            'SERVER=SJO-5CG427530D\\SQLEXPRESS;'
-            'DATABASE=ParkingSystem;'
-            'Trusted_Connection=yes;'
+CADENA_CONEXION = os.environ.get(
+    'PARQUEO_CADENA_CONEXION',
+    'DRIVER={ODBC Driver 17 for SQL Server};'
+    'SERVER=SJO-5CG427530D\\SQLEXPRESS;'
+    'DATABASE=ParkingSystem;'
+    'Trusted_Connection=yes;'
+)
+
+RETRASO_REPLICA = float(os.environ.get('PARQUEO_REPLICA_RETRASO', 2))
+
+def _crear_pool(backend, tiempo_espera: float) -> PoolConexiones:
+    """Crea un pool de conexiones sobre un backend con los límites configurados."""
+    return PoolConexiones(
+        metricas.medir_fabrica(backend.conectar),
+        minimo=int(os.environ.get('PARQUEO_POOL_MIN', 2)),
+        maximo=int(os.environ.get('PARQUEO_POOL_MAX', 10)),
+        tiempo_espera=tiempo_espera,
+        tiempo_inactividad=float(os.environ.get('PARQUEO_POOL_INACTIVIDAD', 300)),
+        verificar_tras=float(os.environ.get('PARQUEO_POOL_VERIFICAR', 30))
+    )
+
+class RecursosCondominio:
+    """
+    Backends y pools de conexiones de un condominio.
+
+    Atributos:
+        backend: Backend de almacenamiento primario (SQL Server o SQLite)
+        pool (PoolConexiones): Pool de conexiones a la primaria
+        replica: Backend de sólo lectura o None si no hay réplica
+        pool_lectura (PoolConexiones): Pool de conexiones a la réplica o None
+        ultima_escritura (float): time.monotonic() de la última escritura confirmada
+    """
+
+    def __init__(self, backend, pool: PoolConexiones = None, replica=None):
+        self.backend = backend
+        self.pool = pool or _crear_pool(backend, float(os.environ.get('PARQUEO_POOL_ESPERA', 30)))
+        self.replica = replica
+        self.pool_lectura = _crear_pool(
+            replica, float(os.environ.get('PARQUEO_REPLICA_ESPERA', 1))) if replica else None
+        self.ultima_escritura = 0.0
+
+def _crear_recursos(condominio) -> RecursosCondominio:
+    """Crea los backends y pools de un condominio según su configuración."""
+    backend = crear_backend(
+        condominio.backend,
+        condominio.cadena_conexion or CADENA_CONEXION,
+        condominio.sqlite_ruta
+    )
+    replica = None
+    if condominio.tiene_replica:
+        replica = crear_backend(
+            condominio.backend,
+            condominio.replica_cadena_conexion or condominio.cadena_conexion or CADENA_CONEXION,
+            condominio.replica_sqlite_ruta,
+            solo_lectura=True
         )
-    except pyodbc.Error as e:
-        print(f"Error de conexión ODBC: {str(e)}")
+    return RecursosCondominio(backend, replica=replica)
+
+recursos = condominios.PorCondominio(_crear_recursos)
+
+def backend_actual():
+    """Devuelve el backend de almacenamiento del condominio activo."""
+    return recursos.obtener().backend
+
+def configurar_condominio(clave: str, backend, pool: PoolConexiones = None, replica=None):
+    """
+    Reemplaza el backend (y opcionalmente el pool) de un condominio,
+    por ejemplo para medir sentencias en benchmarks.
+
+    Args:
+        clave: Clave del condominio
+        backend: Backend de almacenamiento
+        pool: Pool de conexiones (por defecto uno nuevo sobre el backend)
+        replica: Backend de sólo lectura para las lecturas (opcional)
+    """
+    recursos.fijar(clave, RecursosCondominio(backend, pool, replica))
+
+def verificar_indices(clave: str, backend, destino: str = 'primaria') -> list:
+    """
+    Informa los índices requeridos que faltan en una base: sin ellos las
+    consultas frecuentes recorren tablas completas.
+
+    Args:
+        clave: Clave del condominio
+        backend: Backend de almacenamiento a revisar
+        destino: 'primaria' o 'réplica', para el mensaje
+
+    Returns:
+        list[Indice]: Índices faltantes
+    """
+    faltantes = migraciones.indices_faltantes(backend)
+    for indice in faltantes:
+        print(f"Advertencia: falta el índice {indice.nombre} en la {destino} ({clave}): {indice}")
+    return faltantes
+
+def inicializar_pool() -> bool:
+    """
+    Prepara el almacenamiento (migraciones pendientes), informa los índices
+    faltantes y pre-calienta el pool de cada condominio abriendo las
+    conexiones mínimas al iniciar la aplicación.
+
+    Returns:
+        bool: True si todos los pools quedaron listos, False si alguno no pudo conectar
+    """
+    listos = True
+    for clave in condominios.configurados:
+        actuales = recursos.obtener(clave)
+        try:
+            actuales.backend.preparar()
+            verificar_indices(clave, actuales.backend)
+            actuales.pool.precalentar()
+        except actuales.backend.errores as e:
+            print(f"Error al pre-calentar el pool de conexiones ({clave}): {str(e)}")
+            listos = False
+        if actuales.pool_lectura is not None:
+            try:
+                actuales.pool_lectura.precalentar()
+                verificar_indices(clave, actuales.replica, 'réplica')
+            except actuales.replica.errores as e:
+                # Sin réplica las lecturas siguen en la primaria
+                print(f"Error al pre-calentar el pool de la réplica ({clave}): {str(e)}")
+    return listos
+
+def estadisticas_pool(clave: str = None, lectura: bool = False) -> dict:
+    """
+    Devuelve las estadísticas actuales del pool de un condominio.
+
+    Args:
+        clave: Clave del condominio (por defecto el activo)
+        lectura: True para el pool de la réplica
+
+    Returns:
+        dict: Estadísticas del pool, o vacío si se pide la réplica y no hay
+    """
+    actuales = recursos.obtener(clave)
+    pool = actuales.pool_lectura if lectura else actuales.pool
+    return pool.estadisticas() if pool is not None else {}
+
+def registrar_escritura():
+    """
+    Marca que el condominio activo acaba de confirmar una escritura: durante
+    PARQUEO_REPLICA_RETRASO segundos sus lecturas se hacen en la primaria.
+    """
+    recursos.obtener().ultima_escritura = time.monotonic()
+
+def get_conexion(independiente: bool = False, lectura: bool = False):
+    """
+    Entrega una conexión a la base de datos. Si hay una unidad de trabajo
+    activa devuelve su conexión compartida, salvo que se pida una propia.
+    Las lecturas pueden ir a la réplica del condominio (ver arriba).
+    
+    Args:
+        independiente: True para obtener una conexión fuera de la unidad activa
+        lectura: True si la conexión sólo se usará para consultar
+        
+    Returns:
+        Conexión lista para usarse o None si no se pudo conectar
+    """
+    metricas.registrar_conexion_solicitada()
+    unidad = None if independiente else unidad_trabajo.unidad_actual()
+    if lectura:
+        conexion = _conexion_de_replica(unidad)
+        metricas.registrar_lectura('replica' if conexion is not None else 'primaria')
+        if conexion is not None:
+            return conexion
+    if unidad is not None:
+        return unidad.conexion()
+    return _conexion_del_pool()
+
+def _conexion_de_replica(unidad):
+    """
+    Entrega una conexión de la réplica si la lectura puede hacerse allí.
+
+    Args:
+        unidad: Unidad de trabajo activa o None
+
+    Returns:
+        Conexión de la réplica, o None si la lectura debe ir a la primaria
+    """
+    actuales = recursos.obtener()
+    if actuales.pool_lectura is None:
+        return None
+    if unidad is not None and unidad.tiene_conexion:
+        return None
+    if time.monotonic() - actuales.ultima_escritura < RETRASO_REPLICA:
+        return None
+    if unidad is not None and time.time() - unidad.escritura_cliente < RETRASO_REPLICA:
+        return None
+    try:
+        return actuales.pool_lectura.obtener()
+    except actuales.replica.errores as e:
+        print(f"Error de conexión a la réplica ({actuales.replica.nombre}): {str(e)}")
+        return None
+    except PoolAgotadoError as e:
+        print(f"Error de conexión a la réplica: {str(e)}")
         return None
+
+def _conexion_del_pool():
+    actuales = recursos.obtener()
+    backend = actuales.backend
+    try:
+        return actuales.pool.obtener()
+    except backend.errores as e:
+        print(f"Error de conexión ({backend.nombre}): {str(e)}")
+        return None
+    except PoolAgotadoError as e:
+        print(f"Error de conexión: {str(e)}")
+        return None
+
+def iniciar_unidad_trabajo(escritura_cliente: float = 0.0) -> bool:
+    """
+    Activa una unidad de trabajo en el contexto actual (una por solicitud).
+    
+    Args:
+        escritura_cliente: Hora (epoch) de la última escritura del cliente,
+            tal como la devolvió escritura_para_cliente() (opcional)
+        
+    Returns:
+        bool: True si se creó, False si ya había una activa
+    """
+    creada = unidad_trabajo.iniciar_unidad(_conexion_del_pool)
+    if creada:
+        unidad_trabajo.unidad_actual().escritura_cliente = escritura_cliente
+    return creada
+
+def escritura_para_cliente() -> float:
+    """
+    Devuelve la hora (epoch) que el cliente debe conservar si la unidad
+    activa escribió y el condominio tiene réplica.
+    
+    Returns:
+        float: Hora de la escritura o None si no hace falta
+    """
+    unidad = unidad_trabajo.unidad_actual()
+    if unidad is None or not unidad.escribio or unidad.fallida:
+        return None
+    if recursos.obtener().pool_lectura is None:
+        return None
+    return time.time()
+
+def finalizar_unidad_trabajo(error: BaseException = None) -> bool:
+    """
+    Confirma (o revierte si hubo fallas) la unidad de trabajo activa.
+    
+    Args:
+        error: Excepción que interrumpió la solicitud (opcional)
+        
+    Returns:
+        bool: True si se confirmó, False si se revirtió
+    """
+    unidad = unidad_trabajo.unidad_actual()
+    if unidad is not None and unidad.escribio:
+        unidad.al_confirmar(registrar_escritura)
+    return unidad_trabajo.finalizar_unidad(error)
+
+@contextmanager
+def transaccion():
+    """
+    Unidad de trabajo para código fuera de una solicitud (consola, tareas).
+    Si ya hay una unidad activa, el bloque se une a ella.
+    
+    Yields:
+        UnidadTrabajo: Unidad activa
+    """
+    creada = iniciar_unidad_trabajo()
+    error = None
+    try:
+        yield unidad_trabajo.unidad_actual()
+    except BaseException as falla:
+        error = falla
+        raise
+    finally:
+        if creada:
+            finalizar_unidad_trabajo(error)
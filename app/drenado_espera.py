@@ -0,0 +1,134 @@
+"""
+Módulo del drenado automático de la lista de espera.
+Un hilo en segundo plano despierta cuando el motor de pilas libera espacio
+(o cada cierto intervalo, por si la base de datos cambió por otra vía) y
+estaciona en orden FIFO tantos vehículos en espera como espacios libres
+haya, en una sola transacción. Cada condominio tiene su propio drenador,
+cuyo hilo trabaja con ese condominio activo.
+"""
+import threading
+from app import condominios
+from app.db_config import transaccion
+from app.metricas import instrumentar_clase
+
+INTERVALO_DRENADO = 5.0
+
+
+@instrumentar_clase
+class DrenadorListaEspera:
+    """
+    Estaciona a los vehículos en espera apenas se libera espacio.
+
+    Atributos:
+        motor (MotorPilas): Motor de pilas que elige filas y persiste
+        gestor (GestorListaEspera): Gestor de la lista de espera
+        intervalo (float): Segundos máximos entre revisiones sin avisos
+        al_drenar (callable): Función llamada con los vehículos estacionados
+        condominio (str): Clave del condominio que drena el hilo
+        _aviso (threading.Event): Se activa cuando hay espacio que revisar
+        _detener (threading.Event): Se activa para terminar el hilo
+        _hilo (threading.Thread): Hilo de trabajo o None si no se inició
+        _lock (threading.Lock): Evita dos drenados simultáneos
+    """
+
+    def __init__(self, motor, gestor, intervalo: float = INTERVALO_DRENADO, al_drenar=None,
+                 condominio: str = None):
+        """
+        Inicializa el drenador y se suscribe a las liberaciones del motor.
+
+        Args:
+            motor: Motor de pilas
+            gestor: Gestor de la lista de espera
+            intervalo: Segundos máximos entre revisiones (por defecto 5)
+            al_drenar: Función que recibe la lista de (id_vehiculo, id_espacio_fila)
+                estacionados, por ejemplo para invalidar cachés (opcional)
+            condominio: Clave del condominio (por defecto el activo al crearlo)
+        """
+        self.motor = motor
+        self.gestor = gestor
+        self.intervalo = intervalo
+        self.al_drenar = al_drenar
+        self.condominio = condominio or condominios.actual()
+        self._aviso = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._lock = threading.Lock()
+        motor.suscribir_liberacion(self.avisar)
+
+    @property
+    def activo(self) -> bool:
+        """Indica si el hilo de drenado está corriendo."""
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def iniciar(self):
+        """Arranca el hilo de drenado, con una primera revisión inmediata."""
+        if self.activo:
+            return
+        self._detener.clear()
+        self._aviso.set()
+        self._hilo = threading.Thread(target=self._ejecutar, name=f'drenado-lista-espera-{self.condominio}',
+                                      daemon=True)
+        self._hilo.start()
+
+    def detener(self, espera: float = None):
+        """
+        Detiene el hilo de drenado.
+
+        Args:
+            espera: Segundos máximos a esperar que termine (por defecto sin límite)
+        """
+        self._detener.set()
+        self._aviso.set()
+        if self._hilo is not None:
+            self._hilo.join(espera)
+            self._hilo = None
+
+    def avisar(self):
+        """Despierta al hilo para revisar la lista de espera."""
+        self._aviso.set()
+
+    def drenar(self) -> list:
+        """
+        Estaciona en orden FIFO tantos vehículos en espera como espacios
+        libres haya. Dentro de una unidad de trabajo activa (por ejemplo,
+        en una solicitud) se une a ella; si no, usa su propia transacción.
+
+        Returns:
+            list[tuple]: (id_vehiculo, id_espacio_fila) de los vehículos estacionados
+        """
+        with self._lock:
+            libres = self.motor.espacios_libres()
+            if not libres:
+                return []
+
+            estacionados = []
+            with transaccion() as unidad:
+                # Los pendientes de vehículos ya estacionados sólo se marcan
+                # atendidos, así que se vuelve a leer mientras quede espacio
+                while libres and not unidad.fallida:
+                    pendientes = self.gestor.obtener_siguientes(libres)
+                    if not pendientes:
+                        break
+                    estacionados += self.motor.estacionar_lote(pendientes)
+                    if len(pendientes) < libres:
+                        break
+                    libres = self.motor.espacios_libres()
+                if unidad.fallida:
+                    estacionados = []
+
+            if estacionados and self.al_drenar:
+                self.al_drenar(estacionados)
+            return estacionados
+
+    def _ejecutar(self):
+        """Ciclo del hilo: espera un aviso o el intervalo y drena."""
+        while not self._detener.is_set():
+            self._aviso.wait(self.intervalo)
+            self._aviso.clear()
+            if self._detener.is_set():
+                break
+            try:
+                with condominios.usar(self.condominio):
+                    self.drenar()
+            except Exception as error:
+                print(f"Error al drenar lista de espera: {str(error)}")
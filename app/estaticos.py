@@ -0,0 +1,280 @@
+"""
+Módulo de los archivos estáticos con huella y precomprimidos.
+El manejador estático de Flask lee y envía style.css y parqueo.png en cada
+carga del dashboard sin caché duradera. La construcción copia cada archivo
+de app/static con la huella de su contenido en el nombre
+(css/style.3f9c2a1b7d4e.css) y guarda junto a los de texto sus variantes
+.gz y .br (esta sólo si está instalado el paquete brotli). Como el nombre
+cambia con el contenido, /activos/ los sirve con Cache-Control immutable
+por un año y elige la variante comprimida según Accept-Encoding, sin
+comprimir nada por solicitud.
+
+En las plantillas, activo('css/style.css') devuelve la URL con huella; si
+no hay manifiesto (construcción deshabilitada y sin construir) devuelve la
+de /static/ de siempre.
+
+Variables de entorno:
+    PARQUEO_ESTATICOS: '0' deshabilita las URLs con huella (por defecto habilitadas)
+    PARQUEO_ESTATICOS_DIR: Carpeta de salida (por defecto app/static_dist)
+    PARQUEO_ESTATICOS_CONSTRUIR: '0' para no construir al iniciar y usar lo
+        ya construido con la línea de comandos (por defecto construye)
+
+Uso desde la línea de comandos (por ejemplo, al desplegar):
+    python -m app.estaticos
+    python -m app.estaticos --destino /srv/parqueo/estaticos
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sys
+import tempfile
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin él sólo se precomprime con gzip
+    brotli = None
+
+DIRECTORIO_APP = os.path.dirname(os.path.abspath(__file__))
+ORIGEN = os.path.join(DIRECTORIO_APP, 'static')
+DESTINO = os.path.join(DIRECTORIO_APP, 'static_dist')
+MANIFIESTO = 'manifiesto.json'
+EXTENSIONES_TEXTO = {'.css', '.js', '.svg', '.html', '.txt', '.json', '.map', '.xml'}
+LARGO_HUELLA = 12
+UN_ANO = 365 * 24 * 3600
+
+# Codificación HTTP y extensión de su variante, en orden de preferencia
+CODIFICACIONES = (('br', '.br'), ('gzip', '.gz'))
+
+# Nombre con huella de cualquier construcción: css/style.3f9c2a1b7d4e.css
+PATRON_HUELLA = re.compile(r'^[\w.-]+(/[\w.-]+)*\.[0-9a-f]{%d}\.\w+$' % LARGO_HUELLA)
+
+
+def comprimir(datos: bytes) -> dict:
+    """
+    Comprime un archivo de texto con cada codificación disponible.
+
+    Args:
+        datos: Contenido original
+
+    Returns:
+        dict: Contenido comprimido por extensión, sólo si resulta más pequeño
+    """
+    variantes = {'.gz': gzip.compress(datos, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variantes['.br'] = brotli.compress(datos, quality=11)
+    return {extension: comprimido for extension, comprimido in variantes.items()
+            if len(comprimido) < len(datos)}
+
+
+def nombre_con_huella(nombre: str, datos: bytes) -> str:
+    """Inserta la huella del contenido antes de la extensión: css/style.<huella>.css."""
+    base, extension = os.path.splitext(nombre)
+    huella = hashlib.sha256(datos).hexdigest()[:LARGO_HUELLA]
+    return f"{base}.{huella}{extension}"
+
+
+class ActivosEstaticos:
+    """
+    Construye y sirve los archivos estáticos con huella.
+
+    Atributos:
+        origen (str): Carpeta de los archivos originales
+        destino (str): Carpeta de los archivos con huella y sus variantes
+        _manifiesto (dict): Nombre con huella por nombre original
+        _archivos (set): Archivos existentes en destino (con huella y variantes)
+    """
+
+    def __init__(self, origen: str = ORIGEN, destino: str = DESTINO):
+        """
+        Inicializa los activos sin manifiesto (ver construir() y cargar()).
+
+        Args:
+            origen: Carpeta de los archivos originales (por defecto app/static)
+            destino: Carpeta de salida (por defecto app/static_dist)
+        """
+        self.origen = origen
+        self.destino = destino
+        self._manifiesto = {}
+        self._archivos = set()
+
+    @classmethod
+    def desde_entorno(cls, origen: str = ORIGEN):
+        """
+        Crea los activos según las variables de entorno, construyéndolos o
+        cargando el manifiesto ya construido.
+
+        Args:
+            origen: Carpeta de los archivos originales
+
+        Returns:
+            ActivosEstaticos: Activos listos (con manifiesto vacío si están deshabilitados)
+        """
+        activos = cls(origen, os.environ.get('PARQUEO_ESTATICOS_DIR', DESTINO))
+        if os.environ.get('PARQUEO_ESTATICOS', '1') == '0':
+            return activos
+        try:
+            if os.environ.get('PARQUEO_ESTATICOS_CONSTRUIR', '1') != '0':
+                activos.construir()
+            else:
+                activos.cargar()
+        except OSError as error:
+            print(f"Error al preparar archivos estáticos: {str(error)}")
+        return activos
+
+    def construir(self) -> dict:
+        """
+        Copia cada archivo de origen con su huella, escribe las variantes
+        comprimidas de los de texto y el manifiesto. Los archivos de
+        construcciones anteriores se conservan para las páginas ya servidas.
+
+        Returns:
+            dict: Manifiesto (nombre con huella por nombre original)
+        """
+        manifiesto = {}
+        for carpeta, _, archivos in os.walk(self.origen):
+            for archivo in sorted(archivos):
+                ruta = os.path.join(carpeta, archivo)
+                nombre = os.path.relpath(ruta, self.origen).replace(os.sep, '/')
+                with open(ruta, 'rb') as entrada:
+                    datos = entrada.read()
+                destino = nombre_con_huella(nombre, datos)
+                self._escribir(destino, datos)
+                if os.path.splitext(nombre)[1].lower() in EXTENSIONES_TEXTO:
+                    for extension, comprimido in comprimir(datos).items():
+                        self._escribir(destino + extension, comprimido)
+                manifiesto[nombre] = destino
+        self._escribir(MANIFIESTO, json.dumps(manifiesto, indent=2, sort_keys=True).encode(),
+                       reemplazar=True)
+        self.cargar()
+        return manifiesto
+
+    def cargar(self):
+        """
+        Lee el manifiesto de destino y los archivos disponibles.
+        Sin manifiesto, activo() sigue usando /static/.
+        """
+        ruta = os.path.join(self.destino, MANIFIESTO)
+        if not os.path.exists(ruta):
+            self._manifiesto, self._archivos = {}, set()
+            return
+        with open(ruta, encoding='utf-8') as archivo:
+            manifiesto = json.load(archivo)
+        archivos = set()
+        for destino in manifiesto.values():
+            for extension in ('',) + tuple(extension for _, extension in CODIFICACIONES):
+                if os.path.exists(os.path.join(self.destino, destino + extension)):
+                    archivos.add(destino + extension)
+        self._manifiesto, self._archivos = manifiesto, archivos
+
+    def codificaciones(self, destino: str) -> list:
+        """Devuelve las codificaciones precomprimidas disponibles de un archivo con huella."""
+        return [codificacion for codificacion, extension in CODIFICACIONES
+                if destino + extension in self._archivos]
+
+    def url(self, nombre: str) -> str:
+        """
+        Devuelve la URL de un archivo estático (requiere contexto de Flask).
+
+        Args:
+            nombre: Ruta dentro de app/static, por ejemplo 'css/style.css'
+
+        Returns:
+            str: URL de /activos/ con huella, o la de /static/ si no está construido
+        """
+        from flask import url_for
+        destino = self._manifiesto.get(nombre)
+        if destino is None:
+            return url_for('static', filename=nombre)
+        return url_for('servir_activo', nombre=destino)
+
+    def servir(self, nombre: str):
+        """
+        Envía un archivo con huella, comprimido si el cliente lo acepta.
+        Sirve también los de construcciones anteriores que sigan en destino
+        (páginas ya cargadas o en cachés intermedias los piden tras un
+        despliegue), no sólo los del manifiesto actual.
+
+        Args:
+            nombre: Nombre con huella
+
+        Returns:
+            Response: Archivo con Cache-Control immutable, o 404 si no existe
+        """
+        from flask import abort, request, send_from_directory
+        if nombre in self._archivos:
+            disponibles = self.codificaciones(nombre)
+        elif self._con_huella(nombre):
+            disponibles = [codificacion for codificacion, extension in CODIFICACIONES
+                           if os.path.isfile(os.path.join(self.destino, nombre + extension))]
+        else:
+            abort(404)
+        archivo, codificacion = nombre, None
+        for candidata in disponibles:
+            if request.accept_encodings[candidata]:
+                archivo, codificacion = nombre + dict(CODIFICACIONES)[candidata], candidata
+                break
+
+        respuesta = send_from_directory(self.destino, archivo, max_age=UN_ANO,
+                                        mimetype=mimetypes.guess_type(nombre)[0])
+        if codificacion:
+            respuesta.headers['Content-Encoding'] = codificacion
+        respuesta.vary.add('Accept-Encoding')
+        respuesta.cache_control.public = True
+        respuesta.cache_control.immutable = True
+        return respuesta
+
+    def _con_huella(self, nombre: str) -> bool:
+        """Indica si el nombre tiene forma de archivo con huella y existe en destino."""
+        if not PATRON_HUELLA.match(nombre) or '..' in nombre.split('/'):
+            return False
+        return os.path.isfile(os.path.join(self.destino, nombre))
+
+    def registrar(self, app):
+        """
+        Registra la ruta /activos/<nombre> y la función activo() de las plantillas.
+
+        Args:
+            app: Aplicación Flask
+        """
+        app.add_url_rule('/activos/<path:nombre>', 'servir_activo', self.servir)
+        app.add_template_global(self.url, 'activo')
+
+    def _escribir(self, nombre: str, datos: bytes, reemplazar: bool = False):
+        """
+        Escribe un archivo de destino de forma atómica (varios procesos pueden
+        construir a la vez). Los nombres con huella no se reescriben.
+        """
+        ruta = os.path.join(self.destino, nombre)
+        if not reemplazar and os.path.exists(ruta):
+            return
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), prefix='.tmp-')
+        try:
+            with os.fdopen(descriptor, 'wb') as salida:
+                salida.write(datos)
+            os.chmod(temporal, 0o644)  # mkstemp crea 0600; un proxy también debe leerlos
+            os.replace(temporal, ruta)
+        except OSError:
+            os.unlink(temporal)
+            raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construcción de los archivos estáticos con huella")
+    parser.add_argument('--origen', default=ORIGEN, help="Carpeta de los archivos originales")
+    parser.add_argument('--destino', default=os.environ.get('PARQUEO_ESTATICOS_DIR', DESTINO),
+                        help="Carpeta de salida")
+    args = parser.parse_args()
+
+    activos = ActivosEstaticos(args.origen, args.destino)
+    for nombre, destino in sorted(activos.construir().items()):
+        variantes = activos.codificaciones(destino)
+        print(f"{nombre} -> {destino}" + (f" ({', '.join(variantes)})" if variantes else ''))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
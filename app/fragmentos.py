@@ -0,0 +1,151 @@
+"""
+Módulo de caché de fragmentos de plantillas.
+El dashboard dibuja cada EspaciosFila con su pila, sus movimientos y un
+selector con todos los vehículos, así que renderizarlo completo cuesta
+filas × vehículos aunque sólo haya cambiado una fila. La etiqueta
+{% fragmento %} guarda el HTML de un bloque bajo una clave que incluye la
+versión de sus datos; mientras la versión no cambie se reutiliza el HTML
+sin volver a evaluar el bloque.
+
+Las versiones son huellas del contenido (ver version_de()), calculadas
+una sola vez cuando se recalcula la instantánea de cache_dashboard: una
+fila modificada cambia su huella y sólo ella se vuelve a renderizar.
+
+Uso en una plantilla:
+    {% fragmento 'fila', espacio.id, espacio.version, version_vehiculos %}
+        ...
+    {% endfragmento %}
+
+Variables de entorno:
+    PARQUEO_FRAGMENTOS_MAX: Fragmentos guardados por condominio (por defecto
+        10000, '0' deshabilita la caché)
+"""
+import os
+import threading
+from collections import OrderedDict
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+MAXIMO_FRAGMENTOS = 10000
+
+
+def version_de(*valores) -> int:
+    """
+    Calcula la huella de los datos de un fragmento.
+
+    Args:
+        *valores: Valores hashables (tuplas de columnas, por ejemplo)
+
+    Returns:
+        int: Huella válida dentro del proceso
+    """
+    return hash(valores)
+
+
+class CacheFragmentos:
+    """
+    Caché LRU acotada de HTML renderizado por clave de fragmento.
+    Las versiones viejas no se borran: dejan de pedirse y salen por LRU.
+
+    Atributos:
+        maximo (int): Cantidad máxima de fragmentos guardados
+        _fragmentos (OrderedDict): HTML por clave, del menos al más reciente
+        _lock (threading.Lock): Protege el diccionario y los contadores
+    """
+
+    def __init__(self, maximo: int = MAXIMO_FRAGMENTOS):
+        """
+        Inicializa la caché vacía.
+
+        Args:
+            maximo: Cantidad máxima de fragmentos (por defecto 10000)
+        """
+        self.maximo = maximo
+        self._fragmentos = OrderedDict()
+        self._aciertos = 0
+        self._fallos = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def desde_entorno(cls):
+        """
+        Crea la caché según PARQUEO_FRAGMENTOS_MAX.
+
+        Returns:
+            CacheFragmentos: Caché configurada (con máximo 0 no guarda nada)
+        """
+        return cls(int(os.environ.get('PARQUEO_FRAGMENTOS_MAX', MAXIMO_FRAGMENTOS)))
+
+    def obtener(self, clave: tuple, generador):
+        """
+        Devuelve el fragmento guardado o lo renderiza con el generador.
+
+        Args:
+            clave: Nombre del fragmento, identificadores y versiones
+            generador: Función sin argumentos que renderiza el fragmento
+
+        Returns:
+            El HTML del fragmento (Markup si la plantilla escapa)
+        """
+        if self.maximo <= 0:
+            return generador()
+        with self._lock:
+            html = self._fragmentos.get(clave)
+            if html is not None:
+                self._fragmentos.move_to_end(clave)
+                self._aciertos += 1
+                return html
+            self._fallos += 1
+
+        html = generador()
+
+        with self._lock:
+            self._fragmentos[clave] = html
+            self._fragmentos.move_to_end(clave)
+            while len(self._fragmentos) > self.maximo:
+                self._fragmentos.popitem(last=False)
+        return html
+
+    def vaciar(self):
+        """Descarta todos los fragmentos guardados (los contadores se conservan)."""
+        with self._lock:
+            self._fragmentos.clear()
+
+    def estadisticas(self) -> dict:
+        """Devuelve la cantidad de fragmentos y los aciertos/fallos."""
+        with self._lock:
+            return {
+                'fragmentos': len(self._fragmentos),
+                'aciertos': self._aciertos,
+                'fallos': self._fallos,
+            }
+
+
+class ExtensionFragmentos(Extension):
+    """
+    Extensión de Jinja con la etiqueta {% fragmento clave, ... %}.
+    Usa la caché en environment.cache_fragmentos; si es None el bloque se
+    renderiza siempre.
+    """
+    tags = {'fragmento'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(cache_fragmentos=None)
+
+    def parse(self, parser):
+        """Lee las expresiones de la clave y el cuerpo hasta {% endfragmento %}."""
+        lineno = next(parser.stream).lineno
+        partes = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            partes.append(parser.parse_expression())
+        cuerpo = parser.parse_statements(('name:endfragmento',), drop_needle=True)
+        llamada = self.call_method('_renderizar', [nodes.Tuple(partes, 'load')])
+        return nodes.CallBlock(llamada, [], [], cuerpo).set_lineno(lineno)
+
+    def _renderizar(self, clave, caller):
+        """Devuelve el fragmento de la caché o lo renderiza."""
+        cache = self.environment.cache_fragmentos
+        if cache is None:
+            return caller()
+        return cache.obtener(clave, caller)
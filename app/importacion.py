@@ -0,0 +1,386 @@
+"""
+Módulo de importación masiva de usuarios y vehículos.
+Lee archivos CSV o NDJSON registro por registro, valida en memoria que
+cédulas y placas no se repitan y escribe en lotes con executemany, una
+transacción por lote, por lo que la memoria usada no depende del tamaño
+del archivo sino del lote y de las claves ya registradas. Usa su propia
+conexión aunque haya una unidad de trabajo activa, ya que confirma cada
+lote por separado.
+
+Uso desde la línea de comandos:
+    python -m app.importacion usuarios residentes.csv
+    python -m app.importacion vehiculos vehiculos.ndjson --lote 5000
+    python -m app.importacion usuarios torre.csv --condominio torre-norte
+
+Columnas:
+    usuarios: cedula, nombre, telefono, email (opcional)
+    vehiculos: placa, marca, modelo y el propietario como id_usuario
+        o como cedula de un usuario ya registrado
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from app import condominios, db_config
+from app.db_config import get_conexion
+from app.metricas import instrumentar_clase
+
+FORMATOS = ('csv', 'ndjson')
+TIPOS = ('usuarios', 'vehiculos')
+TAMANO_LOTE = 1000
+MAX_ERRORES_REPORTADOS = 100
+
+INSERTAR_USUARIO = "INSERT INTO Usuarios (cedula, nombre, telefono, email) VALUES (?, ?, ?, ?)"
+INSERTAR_VEHICULO = "INSERT INTO Vehiculos (placa, marca, modelo, id_usuario) VALUES (?, ?, ?, ?)"
+
+# Longitudes máximas de las columnas VARCHAR del esquema
+LONGITUDES = {
+    'cedula': 20,
+    'nombre': 100,
+    'telefono': 20,
+    'email': 100,
+    'placa': 20,
+    'marca': 50,
+    'modelo': 50,
+}
+
+def detectar_formato(nombre_archivo: str) -> str:
+    """
+    Determina el formato de un archivo por su extensión.
+
+    Args:
+        nombre_archivo: Nombre o ruta del archivo
+
+    Returns:
+        str: 'csv' o 'ndjson'
+
+    Raises:
+        ValueError: Si la extensión no corresponde a un formato soportado
+    """
+    extension = os.path.splitext(nombre_archivo or '')[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    raise ValueError(f"Formato de archivo no soportado: '{extension}' (use .csv, .ndjson o .jsonl)")
+
+def leer_registros(flujo, formato: str):
+    """
+    Recorre un archivo de texto devolviendo un registro a la vez.
+
+    Args:
+        flujo: Archivo de texto abierto (con newline='' para CSV)
+        formato: 'csv' o 'ndjson'
+
+    Yields:
+        tuple: (número de línea, dict) o (número de línea, None) si la línea
+            no es un objeto JSON válido
+
+    Raises:
+        ValueError: Si el formato no es soportado
+    """
+    if formato == 'csv':
+        lector = csv.DictReader(flujo)
+        for registro in lector:
+            yield lector.line_num, registro
+    elif formato == 'ndjson':
+        for numero, linea in enumerate(flujo, start=1):
+            if not linea.strip():
+                continue
+            try:
+                registro = json.loads(linea)
+            except ValueError:
+                registro = None
+            yield numero, registro if isinstance(registro, dict) else None
+    else:
+        raise ValueError(f"Formato debe ser uno de: {FORMATOS}")
+
+class ResultadoImportacion:
+    """
+    Resumen de una importación masiva.
+
+    Atributos:
+        insertados (int): Registros escritos en la base de datos
+        duplicados (int): Registros omitidos por cédula o placa repetida
+        invalidos (int): Registros omitidos por datos incompletos o inválidos
+        fallidos (int): Registros de lotes que la base de datos rechazó
+        errores (list): (línea, mensaje) de los primeros registros omitidos
+    """
+
+    def __init__(self):
+        self.insertados = 0
+        self.duplicados = 0
+        self.invalidos = 0
+        self.fallidos = 0
+        self.errores = []
+
+    def registrar_error(self, linea: int, mensaje: str):
+        """Guarda el detalle de un registro omitido, hasta MAX_ERRORES_REPORTADOS."""
+        if len(self.errores) < MAX_ERRORES_REPORTADOS:
+            self.errores.append((linea, mensaje))
+
+    def to_dict(self) -> dict:
+        """Devuelve el resumen como diccionario serializable a JSON."""
+        return {
+            'insertados': self.insertados,
+            'duplicados': self.duplicados,
+            'invalidos': self.invalidos,
+            'fallidos': self.fallidos,
+            'errores': [{'linea': linea, 'mensaje': mensaje} for linea, mensaje in self.errores],
+        }
+
+@instrumentar_clase
+class ImportadorMasivo:
+    """
+    Importa usuarios y vehículos en lotes usando una sola conexión.
+
+    Atributos:
+        tamano_lote (int): Registros por executemany y por transacción
+    """
+
+    def __init__(self, tamano_lote: int = TAMANO_LOTE):
+        """
+        Inicializa el importador.
+
+        Args:
+            tamano_lote: Registros por lote (por defecto 1000)
+        """
+        if tamano_lote < 1:
+            raise ValueError("El tamaño de lote debe ser mayor que cero")
+        self.tamano_lote = tamano_lote
+
+    def importar(self, tipo: str, registros) -> ResultadoImportacion:
+        """
+        Importa registros del tipo indicado.
+
+        Args:
+            tipo: 'usuarios' o 'vehiculos'
+            registros: Iterable de (línea, dict) como el de leer_registros()
+
+        Returns:
+            ResultadoImportacion: Resumen de la importación
+
+        Raises:
+            ValueError: Si el tipo no es soportado
+        """
+        if tipo == 'usuarios':
+            return self.importar_usuarios(registros)
+        if tipo == 'vehiculos':
+            return self.importar_vehiculos(registros)
+        raise ValueError(f"Tipo debe ser uno de: {TIPOS}")
+
+    def importar_usuarios(self, registros) -> ResultadoImportacion:
+        """
+        Importa usuarios; las cédulas ya registradas o repetidas en el
+        archivo se omiten.
+
+        Args:
+            registros: Iterable de (línea, dict) con cedula, nombre, telefono y email
+
+        Returns:
+            ResultadoImportacion: Resumen de la importación
+        """
+        resultado = ResultadoImportacion()
+        conn = get_conexion(independiente=True)
+        if not conn:
+            resultado.registrar_error(0, "No hay conexión con la base de datos")
+            return resultado
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT cedula FROM Usuarios")
+            cedulas = {fila[0] for fila in cursor}
+            db_config.backend_actual().preparar_carga_masiva(cursor)
+
+            lote = []
+            for linea, registro in registros:
+                try:
+                    cedula, nombre, telefono = self._requeridos(registro, ('cedula', 'nombre', 'telefono'))
+                    email = self._texto(registro, 'email')
+                    if email and '@' not in email:
+                        raise ValueError("El email debe contener @")
+                except ValueError as error:
+                    resultado.invalidos += 1
+                    resultado.registrar_error(linea, str(error))
+                    continue
+
+                if cedula in cedulas:
+                    resultado.duplicados += 1
+                    resultado.registrar_error(linea, f"Cédula duplicada: {cedula}")
+                    continue
+
+                cedulas.add(cedula)
+                lote.append((linea, (cedula, nombre, telefono, email)))
+                if len(lote) >= self.tamano_lote:
+                    self._escribir_lote(conn, cursor, INSERTAR_USUARIO, lote, cedulas, resultado)
+
+            self._escribir_lote(conn, cursor, INSERTAR_USUARIO, lote, cedulas, resultado)
+            return resultado
+
+        except Exception as error:
+            print(f"Error al importar usuarios: {str(error)}")
+            resultado.registrar_error(0, str(error))
+            return resultado
+        finally:
+            if conn:
+                conn.close()
+
+    def importar_vehiculos(self, registros) -> ResultadoImportacion:
+        """
+        Importa vehículos; las placas ya registradas o repetidas en el
+        archivo se omiten. El propietario se indica con id_usuario o con
+        la cedula de un usuario existente.
+
+        Args:
+            registros: Iterable de (línea, dict) con placa, marca, modelo e id_usuario o cedula
+
+        Returns:
+            ResultadoImportacion: Resumen de la importación
+        """
+        resultado = ResultadoImportacion()
+        conn = get_conexion(independiente=True)
+        if not conn:
+            resultado.registrar_error(0, "No hay conexión con la base de datos")
+            return resultado
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT placa FROM Vehiculos")
+            placas = {fila[0] for fila in cursor}
+            cursor.execute("SELECT id_usuario, cedula FROM Usuarios")
+            usuarios_por_cedula = {fila[1]: fila[0] for fila in cursor}
+            ids_usuario = set(usuarios_por_cedula.values())
+            db_config.backend_actual().preparar_carga_masiva(cursor)
+
+            lote = []
+            for linea, registro in registros:
+                try:
+                    placa, marca, modelo = self._requeridos(registro, ('placa', 'marca', 'modelo'))
+                    id_usuario = self._propietario(registro, usuarios_por_cedula, ids_usuario)
+                except ValueError as error:
+                    resultado.invalidos += 1
+                    resultado.registrar_error(linea, str(error))
+                    continue
+
+                if placa in placas:
+                    resultado.duplicados += 1
+                    resultado.registrar_error(linea, f"Placa duplicada: {placa}")
+                    continue
+
+                placas.add(placa)
+                lote.append((linea, (placa, marca, modelo, id_usuario)))
+                if len(lote) >= self.tamano_lote:
+                    self._escribir_lote(conn, cursor, INSERTAR_VEHICULO, lote, placas, resultado)
+
+            self._escribir_lote(conn, cursor, INSERTAR_VEHICULO, lote, placas, resultado)
+            return resultado
+
+        except Exception as error:
+            print(f"Error al importar vehículos: {str(error)}")
+            resultado.registrar_error(0, str(error))
+            return resultado
+        finally:
+            if conn:
+                conn.close()
+
+    def _escribir_lote(self, conn, cursor, consulta: str, lote: list, claves: set,
+                       resultado: ResultadoImportacion):
+        """
+        Inserta un lote en una sola transacción y lo vacía. Si la base de
+        datos lo rechaza, se revierte completo y sus claves se liberan.
+        """
+        if not lote:
+            return
+        try:
+            cursor.executemany(consulta, [fila for _, fila in lote])
+            conn.commit()
+            db_config.registrar_escritura()
+            resultado.insertados += len(lote)
+        except Exception as error:
+            conn.rollback()
+            resultado.fallidos += len(lote)
+            resultado.registrar_error(lote[0][0], f"Lote rechazado ({len(lote)} registros): {str(error)}")
+            claves.difference_update(fila[0] for _, fila in lote)
+        lote.clear()
+
+    def _requeridos(self, registro: dict, campos: tuple) -> list:
+        """
+        Devuelve los campos obligatorios del registro ya normalizados.
+
+        Raises:
+            ValueError: Si el registro no es válido o falta algún campo
+        """
+        if registro is None:
+            raise ValueError("Registro con formato inválido")
+        valores = [self._texto(registro, campo) for campo in campos]
+        faltantes = [campo for campo, valor in zip(campos, valores) if not valor]
+        if faltantes:
+            raise ValueError(f"Faltan campos requeridos: {', '.join(faltantes)}")
+        return valores
+
+    def _texto(self, registro: dict, campo: str) -> str:
+        """
+        Devuelve un campo como texto sin espacios sobrantes.
+
+        Raises:
+            ValueError: Si supera la longitud de su columna
+        """
+        valor = registro.get(campo)
+        valor = '' if valor is None else str(valor).strip()
+        if len(valor) > LONGITUDES.get(campo, len(valor)):
+            raise ValueError(f"El campo {campo} supera {LONGITUDES[campo]} caracteres")
+        return valor
+
+    def _propietario(self, registro: dict, usuarios_por_cedula: dict, ids_usuario: set) -> int:
+        """
+        Resuelve el ID del propietario a partir de id_usuario o cedula.
+
+        Raises:
+            ValueError: Si no se indica o no existe el usuario
+        """
+        id_usuario = self._texto(registro, 'id_usuario')
+        if id_usuario:
+            try:
+                id_usuario = int(id_usuario)
+            except ValueError:
+                raise ValueError(f"id_usuario inválido: {id_usuario}")
+            if id_usuario not in ids_usuario:
+                raise ValueError(f"No existe el usuario {id_usuario}")
+            return id_usuario
+
+        cedula = self._texto(registro, 'cedula')
+        if not cedula:
+            raise ValueError("Falta el propietario: id_usuario o cedula")
+        if cedula not in usuarios_por_cedula:
+            raise ValueError(f"No existe un usuario con cédula {cedula}")
+        return usuarios_por_cedula[cedula]
+
+def main():
+    parser = argparse.ArgumentParser(description="Importación masiva de usuarios y vehículos")
+    parser.add_argument('tipo', choices=TIPOS)
+    parser.add_argument('archivo', help="Archivo .csv, .ndjson o .jsonl")
+    parser.add_argument('--formato', choices=FORMATOS, help="Formato del archivo (por defecto según la extensión)")
+    parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Registros por transacción")
+    parser.add_argument('--condominio', choices=list(condominios.configurados),
+                        default=condominios.predeterminado, help="Condominio destino")
+    args = parser.parse_args()
+
+    if not db_config.inicializar_pool():
+        return 1
+
+    formato = args.formato or detectar_formato(args.archivo)
+    with condominios.usar(args.condominio), \
+            open(args.archivo, encoding='utf-8-sig', newline='') as flujo:
+        resultado = ImportadorMasivo(args.lote).importar(args.tipo, leer_registros(flujo, formato))
+
+    print(f"Insertados: {resultado.insertados}")
+    print(f"Duplicados: {resultado.duplicados}")
+    print(f"Inválidos: {resultado.invalidos}")
+    print(f"Fallidos: {resultado.fallidos}")
+    for linea, mensaje in resultado.errores:
+        print(f"  línea {linea}: {mensaje}")
+    return 1 if resultado.fallidos else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
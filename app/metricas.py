@@ -0,0 +1,404 @@
+"""
+Módulo de métricas de la aplicación en formato de texto de Prometheus.
+Mide cada sentencia SQL (duración, errores y filas leídas) y cada conexión
+abierta, etiquetadas con la operación de gestor que las ejecutó (por
+ejemplo GestorUsuarios.obtener_pagina) y la ruta de Flask que atendía la
+solicitud, además de la duración de cada solicitud.
+
+La operación y la ruta activas viven en variables de contexto, por lo que
+cada hilo o solicitud etiqueta sus propias consultas.
+
+Variables de entorno:
+    PARQUEO_METRICAS: '0' para no medir las consultas (por defecto se miden)
+"""
+import bisect
+import functools
+import inspect
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+HABILITADAS = os.environ.get('PARQUEO_METRICAS', '1') != '0'
+SIN_ETIQUETA = 'ninguna'
+LIMITES_CONSULTA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+LIMITES_SOLICITUD = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_operacion_actual = ContextVar('operacion_metricas', default=None)
+_ruta_actual = ContextVar('ruta_metricas', default=None)
+_inicio_solicitud = ContextVar('inicio_solicitud_metricas', default=None)
+
+
+def _escapar(valor) -> str:
+    """Escapa un valor de etiqueta según el formato de texto de Prometheus."""
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatear_etiquetas(nombres: tuple, valores: tuple, extra: str = '') -> str:
+    """Devuelve el bloque {nombre="valor",...} de una serie."""
+    partes = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return '{' + ','.join(partes) + '}' if partes else ''
+
+
+class Metrica:
+    """
+    Base de las métricas con etiquetas.
+
+    Atributos:
+        nombre (str): Nombre de la métrica
+        ayuda (str): Descripción para la línea # HELP
+        etiquetas (tuple): Nombres de las etiquetas
+        _series (dict): Valor por tupla de valores de etiquetas
+    """
+    tipo = 'untyped'
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def exportar(self) -> list:
+        """Devuelve las líneas de la métrica en formato de texto."""
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for valores, valor in series:
+            lineas.extend(self._lineas_serie(valores, valor))
+        return lineas
+
+    def _lineas_serie(self, valores: tuple, valor) -> list:
+        return [f"{self.nombre}{_formatear_etiquetas(self.etiquetas, valores)} {valor}"]
+
+
+class Contador(Metrica):
+    """Valor que sólo aumenta, por ejemplo consultas ejecutadas."""
+    tipo = 'counter'
+
+    def incrementar(self, valores: tuple = (), cantidad: float = 1):
+        """Suma la cantidad a la serie de los valores de etiquetas dados."""
+        with self._lock:
+            self._series[valores] = self._series.get(valores, 0) + cantidad
+
+
+class Indicador(Metrica):
+    """Valor que sube y baja, por ejemplo conexiones en uso."""
+    tipo = 'gauge'
+
+    def fijar(self, valores: tuple, valor: float):
+        """Fija el valor actual de la serie."""
+        with self._lock:
+            self._series[valores] = valor
+
+
+class Histograma(Metrica):
+    """
+    Distribución de duraciones en cubetas acumuladas.
+
+    Atributos:
+        limites (tuple): Límites superiores de las cubetas en segundos
+    """
+    tipo = 'histogram'
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = (), limites: tuple = LIMITES_CONSULTA):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.limites = tuple(sorted(limites))
+
+    def observar(self, valores: tuple, segundos: float):
+        """Registra una observación en la serie de los valores de etiquetas dados."""
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                # Conteos por cubeta (más la de +Inf), suma y total
+                serie = self._series[valores] = [[0] * (len(self.limites) + 1), 0.0, 0]
+            serie[0][bisect.bisect_left(self.limites, segundos)] += 1
+            serie[1] += segundos
+            serie[2] += 1
+
+    def _lineas_serie(self, valores: tuple, serie) -> list:
+        lineas = []
+        acumulado = 0
+        for limite, conteo in zip(self.limites + ('+Inf',), serie[0]):
+            acumulado += conteo
+            etiquetas = _formatear_etiquetas(self.etiquetas, valores, f'le="{limite}"')
+            lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+        etiquetas = _formatear_etiquetas(self.etiquetas, valores)
+        lineas.append(f"{self.nombre}_sum{etiquetas} {serie[1]}")
+        lineas.append(f"{self.nombre}_count{etiquetas} {serie[2]}")
+        return lineas
+
+
+class RegistroMetricas:
+    """
+    Conjunto de métricas que se exportan juntas en /metrics.
+
+    Atributos:
+        _metricas (list): Métricas registradas en orden de creación
+    """
+
+    def __init__(self):
+        self._metricas = []
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: tuple = ()) -> Contador:
+        """Crea y registra un contador."""
+        return self._registrar(Contador(nombre, ayuda, etiquetas))
+
+    def indicador(self, nombre: str, ayuda: str, etiquetas: tuple = ()) -> Indicador:
+        """Crea y registra un indicador."""
+        return self._registrar(Indicador(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: tuple = (),
+                   limites: tuple = LIMITES_CONSULTA) -> Histograma:
+        """Crea y registra un histograma."""
+        return self._registrar(Histograma(nombre, ayuda, etiquetas, limites))
+
+    def exportar(self) -> str:
+        """
+        Devuelve todas las métricas en formato de texto de Prometheus.
+
+        Returns:
+            str: Texto listo para servirse con tipo text/plain; version=0.0.4
+        """
+        lineas = []
+        for metrica in self._metricas:
+            lineas.extend(metrica.exportar())
+        return '\n'.join(lineas) + '\n'
+
+    def _registrar(self, metrica: Metrica) -> Metrica:
+        self._metricas.append(metrica)
+        return metrica
+
+
+registro = RegistroMetricas()
+
+ETIQUETAS_CONSULTA = ('operacion', 'ruta')
+consultas = registro.contador(
+    'parqueo_consultas_total', 'Sentencias SQL ejecutadas', ETIQUETAS_CONSULTA)
+errores_consulta = registro.contador(
+    'parqueo_consultas_error_total', 'Sentencias SQL que lanzaron error', ETIQUETAS_CONSULTA)
+duracion_consulta = registro.histograma(
+    'parqueo_consulta_segundos', 'Duración de las sentencias SQL', ETIQUETAS_CONSULTA)
+filas_leidas = registro.contador(
+    'parqueo_filas_leidas_total', 'Filas leídas de los resultados de consultas', ETIQUETAS_CONSULTA)
+conexiones_solicitadas = registro.contador(
+    'parqueo_conexiones_solicitadas_total', 'Llamadas a get_conexion()', ETIQUETAS_CONSULTA)
+lecturas = registro.contador(
+    'parqueo_lecturas_total', 'Conexiones de lectura por destino (réplica o primaria)',
+    ETIQUETAS_CONSULTA + ('destino',))
+conexiones_abiertas = registro.contador(
+    'parqueo_conexiones_abiertas_total', 'Conexiones físicas abiertas a la base de datos')
+solicitudes = registro.histograma(
+    'parqueo_solicitud_segundos', 'Duración de las solicitudes HTTP',
+    ('ruta', 'metodo', 'estado'), LIMITES_SOLICITUD)
+pool = registro.indicador(
+    'parqueo_pool_conexiones', 'Estado y contadores del pool de conexiones',
+    ('condominio', 'destino', 'dato'))
+cache = registro.indicador(
+    'parqueo_cache_dashboard', 'Estado y contadores de la caché del dashboard',
+    ('condominio', 'dato'))
+fragmentos = registro.indicador(
+    'parqueo_cache_fragmentos', 'Estado y contadores de la caché de fragmentos del dashboard',
+    ('condominio', 'dato'))
+
+
+def etiquetas_actuales() -> tuple:
+    """Devuelve (operación, ruta) activas en el contexto actual."""
+    return (_operacion_actual.get() or SIN_ETIQUETA, _ruta_actual.get() or SIN_ETIQUETA)
+
+
+def medir_operacion(nombre: str, funcion):
+    """
+    Envuelve una función para que sus consultas se etiqueten con su nombre.
+    Si ya hay una operación activa (un gestor que llama a otro) se conserva
+    la exterior, que es la que explica la latencia de la ruta.
+
+    Args:
+        nombre: Nombre de la operación, por ejemplo 'GestorUsuarios.crear'
+        funcion: Función a envolver
+
+    Returns:
+        callable: Función envuelta
+    """
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        if _operacion_actual.get() is not None:
+            return funcion(*args, **kwargs)
+        token = _operacion_actual.set(nombre)
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            _operacion_actual.reset(token)
+    return envoltura
+
+
+def instrumentar_clase(clase):
+    """
+    Decorador de clase que etiqueta las consultas de cada método público
+    con 'Clase.metodo'. No toca propiedades ni métodos privados.
+
+    Args:
+        clase: Clase a instrumentar
+
+    Returns:
+        type: La misma clase
+    """
+    for nombre, valor in list(vars(clase).items()):
+        if not nombre.startswith('_') and inspect.isfunction(valor):
+            setattr(clase, nombre, medir_operacion(f"{clase.__name__}.{nombre}", valor))
+    return clase
+
+
+def iniciar_solicitud(ruta: str):
+    """Marca el inicio de una solicitud HTTP y la ruta que la atiende."""
+    _ruta_actual.set(ruta or SIN_ETIQUETA)
+    _inicio_solicitud.set(time.perf_counter())
+
+
+def finalizar_solicitud(metodo: str, estado: int):
+    """Registra la duración de la solicitud activa y limpia la ruta."""
+    inicio = _inicio_solicitud.get()
+    if inicio is not None:
+        solicitudes.observar((_ruta_actual.get(), metodo, str(estado)), time.perf_counter() - inicio)
+    _ruta_actual.set(None)
+    _inicio_solicitud.set(None)
+
+
+def registrar_conexion_solicitada():
+    """Cuenta una llamada a get_conexion() con las etiquetas activas."""
+    if HABILITADAS:
+        conexiones_solicitadas.incrementar(etiquetas_actuales())
+
+
+def registrar_lectura(destino: str):
+    """Cuenta una conexión de lectura con las etiquetas activas y su destino."""
+    if HABILITADAS:
+        lecturas.incrementar(etiquetas_actuales() + (destino,))
+
+
+def medir_fabrica(fabrica):
+    """
+    Envuelve la fábrica de conexiones del pool para contar las conexiones
+    físicas abiertas y medir todas las sentencias de sus cursores.
+
+    Args:
+        fabrica: Función sin argumentos que abre una conexión real
+
+    Returns:
+        callable: Fábrica que entrega conexiones medidas (o la original si
+            las métricas están deshabilitadas)
+    """
+    if not HABILITADAS:
+        return fabrica
+
+    @functools.wraps(fabrica)
+    def abrir():
+        conexion = fabrica()
+        conexiones_abiertas.incrementar()
+        return ConexionMedida(conexion)
+    return abrir
+
+
+def fijar_estadisticas(indicador: Indicador, estadisticas: dict, etiquetas: tuple = ()):
+    """Copia un diccionario de estadísticas numéricas a un indicador, tras las etiquetas dadas."""
+    for dato, valor in estadisticas.items():
+        if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            indicador.fijar(tuple(etiquetas) + (dato,), valor)
+
+
+class CursorMedido:
+    """
+    Envoltura de un cursor que mide cada sentencia y cuenta las filas leídas.
+
+    Atributos:
+        _cursor: Cursor real de la base de datos
+    """
+
+    def __init__(self, cursor):
+        object.__setattr__(self, '_cursor', cursor)
+
+    def execute(self, *args, **kwargs):
+        return self._medir(self._cursor.execute, *args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return self._medir(self._cursor.executemany, *args, **kwargs)
+
+    def _medir(self, metodo, *args, **kwargs):
+        """Ejecuta la sentencia registrando su duración y si falló."""
+        etiquetas = etiquetas_actuales()
+        inicio = time.perf_counter()
+        try:
+            resultado = metodo(*args, **kwargs)
+        except Exception:
+            errores_consulta.incrementar(etiquetas)
+            raise
+        finally:
+            duracion_consulta.observar(etiquetas, time.perf_counter() - inicio)
+            consultas.incrementar(etiquetas)
+        return self if resultado is self._cursor else resultado
+
+    def fetchone(self):
+        fila = self._cursor.fetchone()
+        if fila is not None:
+            filas_leidas.incrementar(etiquetas_actuales())
+        return fila
+
+    def fetchmany(self, *args, **kwargs):
+        filas = self._cursor.fetchmany(*args, **kwargs)
+        if filas:
+            filas_leidas.incrementar(etiquetas_actuales(), len(filas))
+        return filas
+
+    def fetchall(self):
+        filas = self._cursor.fetchall()
+        if filas:
+            filas_leidas.incrementar(etiquetas_actuales(), len(filas))
+        return filas
+
+    def __iter__(self):
+        etiquetas = etiquetas_actuales()
+        leidas = 0
+        try:
+            for fila in self._cursor:
+                leidas += 1
+                yield fila
+        finally:
+            if leidas:
+                filas_leidas.incrementar(etiquetas, leidas)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    def __setattr__(self, nombre, valor):
+        # Atributos como fast_executemany se configuran en el cursor real
+        setattr(self._cursor, nombre, valor)
+
+
+class ConexionMedida:
+    """
+    Envoltura de una conexión real cuyos cursores se miden.
+
+    Atributos:
+        _conexion: Conexión real de la base de datos
+    """
+
+    def __init__(self, conexion):
+        self._conexion = conexion
+
+    def cursor(self):
+        """Devuelve un cursor medido de la conexión real."""
+        return CursorMedido(self._conexion.cursor())
+
+    def commit(self):
+        self._conexion.commit()
+
+    def rollback(self):
+        self._conexion.rollback()
+
+    def close(self):
+        self._conexion.close()
+
+    def __getattr__(self, nombre):
+        return getattr(self._conexion, nombre)
@@ -0,0 +1,429 @@
+"""
+Módulo de migraciones versionadas del esquema.
+Cada migración tiene un número de versión y sus sentencias para SQLite y
+SQL Server; las aplicadas se registran en la tabla VersionesEsquema, de
+modo que preparar() de cada backend sólo aplica las pendientes, en orden.
+Las sentencias son idempotentes (IF NOT EXISTS / OBJECT_ID), así una base
+creada a mano o con el script original adopta el versionado sin cambios.
+
+Los índices de cobertura siguen las rutas de acceso del código: las pilas
+por fila y posición y por vehículo, la lista de espera pendiente por fecha,
+los movimientos temporales pendientes por fila y las claves únicas de placa
+y cédula. Al iniciar, indices_faltantes() compara los índices existentes
+con los requeridos (por columnas, sin importar el nombre) e informa los
+que falten, también en las réplicas.
+
+Uso desde la línea de comandos:
+    python -m app.migraciones estado
+    python -m app.migraciones migrar --condominio torre-norte
+    python -m app.migraciones indices
+"""
+import argparse
+import sys
+from datetime import datetime
+
+
+class Indice:
+    """
+    Índice requerido por una ruta de acceso.
+
+    Atributos:
+        nombre (str): Nombre con el que se crea
+        tabla (str): Tabla indexada
+        columnas (tuple): Columnas clave, en orden
+        incluidas (tuple): Columnas que sólo se incluyen para cubrir la consulta
+        unico (bool): Si el índice es único
+        filtro (str): Condición de índice filtrado/parcial (opcional)
+    """
+
+    def __init__(self, nombre: str, tabla: str, columnas: tuple, incluidas: tuple = (),
+                 unico: bool = False, filtro: str = None):
+        self.nombre = nombre
+        self.tabla = tabla
+        self.columnas = tuple(columnas)
+        self.incluidas = tuple(incluidas)
+        self.unico = unico
+        self.filtro = filtro
+
+    def cubierto_por(self, existente: tuple) -> bool:
+        """
+        Indica si un índice existente sirve para las mismas consultas.
+
+        Args:
+            existente: (nombre, unico, columnas clave, columnas incluidas)
+
+        Returns:
+            bool: True si empieza por las mismas columnas y cubre las incluidas
+        """
+        _, unico, columnas, incluidas = existente
+        columnas = tuple(columna.lower() for columna in columnas)
+        todas = set(columnas) | {columna.lower() for columna in incluidas}
+        requeridas = tuple(columna.lower() for columna in self.columnas)
+        if columnas[:len(requeridas)] != requeridas:
+            return False
+        if self.unico and not (unico and columnas == requeridas):
+            return False
+        return {columna.lower() for columna in self.incluidas} <= todas
+
+    def sql(self, dialecto: str) -> str:
+        """
+        Devuelve la sentencia CREATE INDEX del dialecto. SQLite no tiene
+        INCLUDE, así que agrega las columnas incluidas al final de la clave.
+        """
+        unico = 'UNIQUE ' if self.unico else ''
+        filtro = f" WHERE {self.filtro}" if self.filtro else ''
+        if dialecto == 'sqlite':
+            columnas = ', '.join(self.columnas + self.incluidas)
+            return f"CREATE {unico}INDEX IF NOT EXISTS {self.nombre} ON {self.tabla} ({columnas}){filtro}"
+        incluidas = f" INCLUDE ({', '.join(self.incluidas)})" if self.incluidas else ''
+        return (f"CREATE {unico}INDEX {self.nombre} ON {self.tabla} "
+                f"({', '.join(self.columnas)}){incluidas}{filtro}")
+
+    def __str__(self) -> str:
+        texto = f"{self.tabla} ({', '.join(self.columnas)})"
+        if self.incluidas:
+            texto += f" incluyendo ({', '.join(self.incluidas)})"
+        if self.filtro:
+            texto += f" donde {self.filtro}"
+        return ('único ' if self.unico else '') + texto
+
+
+INDICES_REQUERIDOS = (
+    # Pila de una fila ordenada por posición (dashboard, MAX(posicion) al re-apilar)
+    Indice('IX_PilaVehiculos_fila_posicion', 'PilaVehiculos',
+           ('id_espacio_fila', 'posicion'), ('id_vehiculo',)),
+    # ¿Dónde está el vehículo? (NOT EXISTS al retornar, sacar, extraer)
+    Indice('IX_PilaVehiculos_vehiculo', 'PilaVehiculos',
+           ('id_vehiculo',), ('id_espacio_fila', 'posicion')),
+    # Pendientes en orden FIFO (drenado, procesar_siguiente, dashboard)
+    Indice('IX_ListaEspera_estado_fecha', 'ListaEspera',
+           ('estado', 'fecha_solicitud', 'id_espera'), ('id_vehiculo',)),
+    # Páginas de la lista de espera filtradas por estado
+    Indice('IX_ListaEspera_estado', 'ListaEspera', ('estado', 'id_espera')),
+    # Movimientos temporales pendientes de cada fila
+    Indice('IX_MovimientosTemporales_pendientes', 'MovimientosTemporales',
+           ('id_espacio_fila',), ('id_vehiculo', 'posicion_origen', 'fecha_movimiento'),
+           filtro='fecha_retorno IS NULL'),
+    Indice('UX_Vehiculos_placa', 'Vehiculos', ('placa',), unico=True),
+    Indice('UX_Usuarios_cedula', 'Usuarios', ('cedula',), unico=True),
+)
+
+
+class Migracion:
+    """
+    Cambio versionado del esquema.
+
+    Atributos:
+        version (int): Número de versión, único y creciente
+        descripcion (str): Qué cambia
+        sentencias (dict): Sentencias por dialecto ('sqlite', 'sqlserver')
+        columnas (tuple): (tabla, columna, definición) a agregar si faltan
+        indices (tuple): Índices a crear si no hay uno equivalente
+    """
+
+    def __init__(self, version: int, descripcion: str, sqlite: tuple = (),
+                 sqlserver: tuple = (), columnas: tuple = (), indices: tuple = ()):
+        self.version = version
+        self.descripcion = descripcion
+        self.sentencias = {'sqlite': sqlite, 'sqlserver': sqlserver}
+        self.columnas = columnas
+        self.indices = indices
+
+    def aplicar(self, backend, cursor):
+        """
+        Ejecuta las sentencias del dialecto del backend, agrega las columnas
+        que falten y crea los índices que todavía no tengan un equivalente.
+
+        Args:
+            backend: Backend de almacenamiento
+            cursor: Cursor de una conexión propia
+        """
+        for sentencia in self.sentencias[backend.nombre]:
+            cursor.execute(sentencia)
+        for tabla, columna, definicion in self.columnas:
+            if columna.lower() not in backend.listar_columnas(cursor, tabla):
+                agregar = 'ADD COLUMN' if backend.nombre == 'sqlite' else 'ADD'
+                cursor.execute(f"ALTER TABLE {tabla} {agregar} {columna} {definicion}")
+        for indice in self.indices:
+            if not any(indice.cubierto_por(existente)
+                       for existente in backend.listar_indices(cursor, indice.tabla)):
+                cursor.execute(indice.sql(backend.nombre))
+
+
+MIGRACIONES = (
+    Migracion(1, "Esquema inicial",
+        sqlite=(
+            """CREATE TABLE IF NOT EXISTS Usuarios (
+                id_usuario INTEGER PRIMARY KEY AUTOINCREMENT,
+                cedula VARCHAR(20) NOT NULL UNIQUE,
+                nombre VARCHAR(100) NOT NULL,
+                telefono VARCHAR(20),
+                email VARCHAR(100)
+            )""",
+            """CREATE TABLE IF NOT EXISTS Vehiculos (
+                id_vehiculo INTEGER PRIMARY KEY AUTOINCREMENT,
+                placa VARCHAR(20) NOT NULL UNIQUE,
+                marca VARCHAR(50) NOT NULL,
+                modelo VARCHAR(50) NOT NULL,
+                id_usuario INTEGER REFERENCES Usuarios (id_usuario),
+                hora_entrada TIMESTAMP,
+                hora_salida TIMESTAMP
+            )""",
+            """CREATE TABLE IF NOT EXISTS EspaciosFila (
+                id_espacio_fila INTEGER PRIMARY KEY AUTOINCREMENT,
+                numero_espacio VARCHAR(10) NOT NULL,
+                capacidad INTEGER NOT NULL DEFAULT 3,
+                estado VARCHAR(20) DEFAULT 'disponible'
+            )""",
+            """CREATE TABLE IF NOT EXISTS PilaVehiculos (
+                id_pila INTEGER PRIMARY KEY AUTOINCREMENT,
+                id_espacio_fila INTEGER REFERENCES EspaciosFila (id_espacio_fila),
+                id_vehiculo INTEGER REFERENCES Vehiculos (id_vehiculo),
+                posicion INTEGER,
+                fecha_entrada TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+            )""",
+            """CREATE TABLE IF NOT EXISTS ListaEspera (
+                id_espera INTEGER PRIMARY KEY AUTOINCREMENT,
+                id_vehiculo INTEGER NOT NULL REFERENCES Vehiculos (id_vehiculo),
+                fecha_solicitud TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+                estado VARCHAR(20) DEFAULT 'pendiente'
+            )""",
+            "CREATE INDEX IF NOT EXISTS IX_ListaEspera_estado ON ListaEspera (estado, id_espera)",
+            """CREATE TABLE IF NOT EXISTS MovimientosTemporales (
+                id_movimiento INTEGER PRIMARY KEY AUTOINCREMENT,
+                id_vehiculo INTEGER REFERENCES Vehiculos (id_vehiculo),
+                id_espacio_fila INTEGER REFERENCES EspaciosFila (id_espacio_fila),
+                posicion_origen INTEGER,
+                fecha_movimiento TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+                fecha_retorno TIMESTAMP
+            )""",
+        ),
+        sqlserver=(
+            """IF OBJECT_ID('Usuarios', 'U') IS NULL
+            CREATE TABLE Usuarios (
+                id_usuario INT IDENTITY(1,1) NOT NULL PRIMARY KEY,
+                cedula VARCHAR(20) NOT NULL UNIQUE,
+                nombre VARCHAR(100) NOT NULL,
+                telefono VARCHAR(20) NULL,
+                email VARCHAR(100) NULL
+            )""",
+            """IF OBJECT_ID('Vehiculos', 'U') IS NULL
+            CREATE TABLE Vehiculos (
+                id_vehiculo INT IDENTITY(1,1) NOT NULL PRIMARY KEY,
+                placa VARCHAR(20) NOT NULL UNIQUE,
+                marca VARCHAR(50) NOT NULL,
+                modelo VARCHAR(50) NOT NULL,
+                id_usuario INT NULL REFERENCES Usuarios (id_usuario),
+                hora_entrada DATETIME NULL,
+                hora_salida DATETIME NULL
+            )""",
+            """IF OBJECT_ID('EspaciosFila', 'U') IS NULL
+            CREATE TABLE EspaciosFila (
+                id_espacio_fila INT IDENTITY(1,1) NOT NULL PRIMARY KEY,
+                numero_espacio VARCHAR(10) NOT NULL,
+                capacidad INT NOT NULL DEFAULT 3,
+                estado VARCHAR(20) NULL DEFAULT 'disponible'
+            )""",
+            """IF OBJECT_ID('PilaVehiculos', 'U') IS NULL
+            CREATE TABLE PilaVehiculos (
+                id_pila INT IDENTITY(1,1) NOT NULL PRIMARY KEY,
+                id_espacio_fila INT NULL REFERENCES EspaciosFila (id_espacio_fila),
+                id_vehiculo INT NULL REFERENCES Vehiculos (id_vehiculo),
+                posicion INT NULL,
+                fecha_entrada DATETIME NULL DEFAULT GETDATE()
+            )""",
+            """IF OBJECT_ID('ListaEspera', 'U') IS NULL
+            CREATE TABLE ListaEspera (
+                id_espera INT IDENTITY(1,1) NOT NULL PRIMARY KEY,
+                id_vehiculo INT NOT NULL REFERENCES Vehiculos (id_vehiculo),
+                fecha_solicitud DATETIME NULL DEFAULT GETDATE(),
+                estado VARCHAR(20) NULL DEFAULT 'pendiente'
+            )""",
+            """IF OBJECT_ID('MovimientosTemporales', 'U') IS NULL
+            CREATE TABLE MovimientosTemporales (
+                id_movimiento INT IDENTITY(1,1) NOT NULL PRIMARY KEY,
+                id_vehiculo INT NULL REFERENCES Vehiculos (id_vehiculo),
+                id_espacio_fila INT NULL REFERENCES EspaciosFila (id_espacio_fila),
+                posicion_origen INT NULL,
+                fecha_movimiento DATETIME NULL DEFAULT GETDATE(),
+                fecha_retorno DATETIME NULL
+            )""",
+        )),
+    Migracion(2, "Tablas de archivo del historial",
+        sqlite=(
+            """CREATE TABLE IF NOT EXISTS ListaEsperaHistorico (
+                id_espera INTEGER PRIMARY KEY,
+                id_vehiculo INTEGER NOT NULL,
+                fecha_solicitud TIMESTAMP,
+                estado VARCHAR(20) NOT NULL
+            )""",
+            """CREATE INDEX IF NOT EXISTS IX_ListaEsperaHistorico_fecha
+                ON ListaEsperaHistorico (fecha_solicitud)""",
+            """CREATE TABLE IF NOT EXISTS MovimientosTemporalesHistorico (
+                id_movimiento INTEGER PRIMARY KEY,
+                id_vehiculo INTEGER NOT NULL,
+                id_espacio_fila INTEGER,
+                posicion_origen INTEGER,
+                fecha_movimiento TIMESTAMP,
+                fecha_retorno TIMESTAMP
+            )""",
+            """CREATE INDEX IF NOT EXISTS IX_MovimientosTemporalesHistorico_fecha
+                ON MovimientosTemporalesHistorico (fecha_movimiento)""",
+        ),
+        sqlserver=(
+            """IF OBJECT_ID('ListaEsperaHistorico', 'U') IS NULL
+            BEGIN
+                CREATE TABLE ListaEsperaHistorico (
+                    id_espera INT NOT NULL PRIMARY KEY,
+                    id_vehiculo INT NOT NULL,
+                    fecha_solicitud DATETIME,
+                    estado VARCHAR(20) NOT NULL
+                );
+                CREATE INDEX IX_ListaEsperaHistorico_fecha ON ListaEsperaHistorico (fecha_solicitud);
+            END""",
+            """IF OBJECT_ID('MovimientosTemporalesHistorico', 'U') IS NULL
+            BEGIN
+                CREATE TABLE MovimientosTemporalesHistorico (
+                    id_movimiento INT NOT NULL PRIMARY KEY,
+                    id_vehiculo INT NOT NULL,
+                    id_espacio_fila INT,
+                    posicion_origen INT,
+                    fecha_movimiento DATETIME,
+                    fecha_retorno DATETIME
+                );
+                CREATE INDEX IX_MovimientosTemporalesHistorico_fecha
+                    ON MovimientosTemporalesHistorico (fecha_movimiento);
+            END""",
+        )),
+    Migracion(3, "Índices de cobertura de las consultas frecuentes",
+              indices=INDICES_REQUERIDOS),
+    # Bases creadas antes de que EspaciosFila tuviera capacidad: el motor de
+    # pilas la lee al cargar (las filas existentes quedan con 3)
+    Migracion(4, "Capacidad de EspaciosFila",
+              columnas=(('EspaciosFila', 'capacidad',
+                         'INT NOT NULL CONSTRAINT DF_EspaciosFila_capacidad DEFAULT 3'),)),
+)
+
+TABLA_VERSIONES = {
+    'sqlite': """CREATE TABLE IF NOT EXISTS VersionesEsquema (
+        version INTEGER PRIMARY KEY,
+        descripcion VARCHAR(200) NOT NULL,
+        fecha_aplicacion TIMESTAMP NOT NULL
+    )""",
+    'sqlserver': """IF OBJECT_ID('VersionesEsquema', 'U') IS NULL
+    CREATE TABLE VersionesEsquema (
+        version INT NOT NULL PRIMARY KEY,
+        descripcion VARCHAR(200) NOT NULL,
+        fecha_aplicacion DATETIME NOT NULL
+    )""",
+}
+
+
+def versiones_aplicadas(cursor) -> dict:
+    """Devuelve la fecha de aplicación de cada versión registrada."""
+    cursor.execute("SELECT version, fecha_aplicacion FROM VersionesEsquema")
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+def migrar(backend) -> list:
+    """
+    Aplica en orden las migraciones pendientes, cada una con su propio
+    commit, con una conexión propia del backend.
+
+    Args:
+        backend: Backend de almacenamiento (no de sólo lectura)
+
+    Returns:
+        list[int]: Versiones aplicadas en esta llamada
+
+    Raises:
+        Exception: El error del motor si una migración falla (se revierte)
+    """
+    conexion = backend.conectar()
+    aplicadas = []
+    try:
+        cursor = conexion.cursor()
+        cursor.execute(TABLA_VERSIONES[backend.nombre])
+        conexion.commit()
+        registradas = versiones_aplicadas(cursor)
+        for migracion in MIGRACIONES:
+            if migracion.version in registradas:
+                continue
+            migracion.aplicar(backend, cursor)
+            cursor.execute(
+                "INSERT INTO VersionesEsquema (version, descripcion, fecha_aplicacion) VALUES (?, ?, ?)",
+                (migracion.version, migracion.descripcion, datetime.now())
+            )
+            conexion.commit()
+            aplicadas.append(migracion.version)
+        return aplicadas
+    except Exception:
+        conexion.rollback()
+        raise
+    finally:
+        conexion.close()
+
+
+def indices_faltantes(backend) -> list:
+    """
+    Compara los índices existentes con los requeridos.
+
+    Args:
+        backend: Backend de almacenamiento (puede ser una réplica)
+
+    Returns:
+        list[Indice]: Índices requeridos sin un equivalente en la base
+    """
+    conexion = backend.conectar()
+    try:
+        cursor = conexion.cursor()
+        existentes = {}
+        faltantes = []
+        for indice in INDICES_REQUERIDOS:
+            if indice.tabla not in existentes:
+                existentes[indice.tabla] = backend.listar_indices(cursor, indice.tabla)
+            if not any(indice.cubierto_por(existente) for existente in existentes[indice.tabla]):
+                faltantes.append(indice)
+        return faltantes
+    finally:
+        conexion.close()
+
+
+def main():
+    from app import condominios, db_config
+
+    parser = argparse.ArgumentParser(description="Migraciones del esquema de la base de datos")
+    parser.add_argument('comando', choices=('estado', 'migrar', 'indices'))
+    parser.add_argument('--condominio', choices=list(condominios.configurados),
+                        help="Condominio (por defecto todos)")
+    args = parser.parse_args()
+
+    codigo = 0
+    for clave in [args.condominio] if args.condominio else list(condominios.configurados):
+        backend = db_config.recursos.obtener(clave).backend
+        if args.comando == 'migrar':
+            aplicadas = migrar(backend)
+            print(f"{clave}: aplicadas {aplicadas or 'ninguna'}")
+        elif args.comando == 'estado':
+            conexion = backend.conectar()
+            try:
+                cursor = conexion.cursor()
+                cursor.execute(TABLA_VERSIONES[backend.nombre])
+                registradas = versiones_aplicadas(cursor)
+            finally:
+                conexion.close()
+            for migracion in MIGRACIONES:
+                fecha = registradas.get(migracion.version)
+                print(f"{clave}: {migracion.version:3d} {'aplicada ' + str(fecha) if fecha else 'pendiente'}"
+                      f" - {migracion.descripcion}")
+        else:
+            faltantes = indices_faltantes(backend)
+            for indice in faltantes:
+                print(f"{clave}: falta {indice.nombre}: {indice}")
+            if not faltantes:
+                print(f"{clave}: todos los índices requeridos existen")
+            codigo = 1 if faltantes else codigo
+    return codigo
+
+if __name__ == '__main__':
+    sys.exit(main())
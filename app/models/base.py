@@ -3,6 +3,27 @@ Módulo base para modelos y gestores.
 Define las clases base abstractas que deben implementar los modelos concretos.
 """
 from abc import ABC, abstractmethod
+from app import db_config
+from app.metricas import instrumentar_clase
+
+TAMANO_PAGINA = 50
+TAMANO_PAGINA_MAXIMO = 500
+MAX_PARAMETROS_IN = 1000  # SQL Server admite hasta 2100 parámetros por sentencia
+
+def en_bloques(valores: list, tamano: int = MAX_PARAMETROS_IN):
+    """
+    Divide una lista en bloques para usarlos en cláusulas IN.
+    
+    Args:
+        valores: Lista de valores
+        tamano: Elementos máximos por bloque
+        
+    Yields:
+        tuple: (bloque, marcadores '?, ?, ...' para el bloque)
+    """
+    for inicio in range(0, len(valores), tamano):
+        bloque = valores[inicio:inicio + tamano]
+        yield bloque, ', '.join('?' * len(bloque))
 
 class ModeloBase:
     """
@@ -21,11 +42,79 @@ class ModeloBase:
         """Devuelve el ID del modelo."""
         return self._id
 
+class Pagina:
+    """
+    Página de resultados obtenida con paginación por clave (keyset).
+    
+    Atributos:
+        items (list): Elementos de la página
+        siguiente (int): Clave para pedir la página siguiente (despues_de) o None si es la última
+        limite (int): Tamaño de página usado
+    """
+    
+    def __init__(self, items: list, siguiente: int, limite: int):
+        self.items = items
+        self.siguiente = siguiente
+        self.limite = limite
+
+    def __iter__(self):
+        """Permite recorrer la página como una lista de elementos."""
+        return iter(self.items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
 class GestorBase(ABC):
     """
     Clase base abstracta para todos los gestores del sistema.
     Define la interfaz CRUD que deben implementar los gestores concretos.
+    Las consultas de sus métodos públicos se etiquetan en las métricas
+    como 'Gestor.metodo'.
+    
+    Atributos:
+        backend: Backend de almacenamiento del condominio activo (SQL Server o SQLite)
     """
+
+    def __init_subclass__(cls, **kwargs):
+        """Instrumenta los métodos públicos de cada gestor concreto."""
+        super().__init_subclass__(**kwargs)
+        instrumentar_clase(cls)
+    
+    @property
+    def backend(self):
+        """Devuelve el backend de almacenamiento configurado."""
+        return db_config.backend_actual()
+
+    def _limite_pagina(self, limite: int) -> int:
+        """Ajusta el tamaño de página solicitado al rango permitido."""
+        if not limite or limite < 1:
+            return TAMANO_PAGINA
+        return min(limite, TAMANO_PAGINA_MAXIMO)
+
+    def _patron_prefijo(self, texto: str) -> str:
+        """Devuelve un patrón LIKE que busca el texto al inicio (ESCAPE '!')."""
+        for especial in ('!', '%', '_', '['):
+            texto = texto.replace(especial, '!' + especial)
+        return texto + '%'
+
+    def _armar_pagina(self, filas: list, limite: int, convertir) -> Pagina:
+        """
+        Arma una página a partir de hasta limite + 1 filas ordenadas por su
+        primera columna (la clave); la fila extra sólo indica que existe
+        una página siguiente.
+        
+        Args:
+            filas: Filas leídas con limite + 1 como máximo
+            limite: Tamaño de página
+            convertir: Función que crea el elemento a partir de una fila
+            
+        Returns:
+            Pagina: Página con los elementos convertidos
+        """
+        hay_siguiente = len(filas) > limite
+        filas = filas[:limite]
+        siguiente = filas[-1][0] if hay_siguiente else None
+        return Pagina([convertir(fila) for fila in filas], siguiente, limite)
     
     @abstractmethod
     def crear(self, modelo) -> bool:
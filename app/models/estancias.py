@@ -0,0 +1,119 @@
+"""
+Módulo de estimación de estancias de vehículos.
+Aprende cuánto suele quedarse cada vehículo a partir de hora_entrada y
+hora_salida, para que el motor de pilas pueda elegir filas donde un
+vehículo no entierre a otros que saldrán antes.
+"""
+import statistics
+import threading
+from app.db_config import get_conexion
+from app.metricas import instrumentar_clase
+
+ESTANCIA_PREDETERMINADA = 4 * 3600  # Segundos, mientras no hay historial
+
+@instrumentar_clase
+class EstimadorEstancias:
+    """
+    Estimador de la duración de estancia por vehículo.
+    Usa un promedio móvil exponencial de las estancias observadas de cada
+    vehículo y, para vehículos sin historial, la mediana de todos.
+
+    Atributos:
+        peso (float): Peso de la última estancia en el promedio móvil (0 a 1)
+        peso_general (float): Peso de cada estancia en la estimación general
+        predeterminada (float): Segundos estimados cuando no hay ningún historial
+        _por_vehiculo (dict): Estancia estimada en segundos por id_vehiculo
+        _general (float): Estancia típica de cualquier vehículo, iniciada con
+            la mediana del historial
+    """
+
+    def __init__(self, peso: float = 0.3, peso_general: float = 0.05,
+                 predeterminada: float = ESTANCIA_PREDETERMINADA):
+        """
+        Inicializa el estimador sin historial.
+
+        Args:
+            peso: Peso de la última estancia observada (por defecto 0.3)
+            peso_general: Peso de cada estancia en la estimación general (por defecto 0.05)
+            predeterminada: Segundos estimados sin historial (por defecto 4 horas)
+        """
+        self.peso = peso
+        self.peso_general = peso_general
+        self.predeterminada = predeterminada
+        self._por_vehiculo = {}
+        self._general = None
+        self._lock = threading.Lock()
+
+    def cargar(self) -> bool:
+        """
+        Toma como historial la última estancia registrada de cada vehículo.
+
+        Returns:
+            bool: True si se cargó correctamente, False si falló
+        """
+        conn = None
+        try:
+            conn = get_conexion()
+            if not conn:
+                return False
+
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT id_vehiculo, hora_entrada, hora_salida
+                   FROM Vehiculos
+                   WHERE hora_entrada IS NOT NULL
+                   AND hora_salida IS NOT NULL"""
+            )
+            por_vehiculo = {}
+            for row in cursor.fetchall():
+                segundos = (row[2] - row[1]).total_seconds()
+                if segundos > 0:
+                    por_vehiculo[row[0]] = segundos
+
+            with self._lock:
+                self._por_vehiculo = por_vehiculo
+                self._general = statistics.median(por_vehiculo.values()) if por_vehiculo else None
+            return True
+
+        except Exception as error:
+            print(f"Error al cargar estancias: {str(error)}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+
+    def registrar(self, id_vehiculo: int, segundos: float):
+        """
+        Incorpora una estancia observada al promedio del vehículo.
+
+        Args:
+            id_vehiculo: Vehículo que salió
+            segundos: Duración de la estancia
+        """
+        if segundos <= 0:
+            return
+        with self._lock:
+            anterior = self._por_vehiculo.get(id_vehiculo)
+            if anterior is None:
+                self._por_vehiculo[id_vehiculo] = segundos
+            else:
+                self._por_vehiculo[id_vehiculo] = anterior + self.peso * (segundos - anterior)
+            if self._general is None:
+                self._general = segundos
+            else:
+                self._general += self.peso_general * (segundos - self._general)
+
+    def estimar(self, id_vehiculo: int) -> float:
+        """
+        Devuelve la estancia esperada de un vehículo en segundos.
+
+        Args:
+            id_vehiculo: Vehículo a estimar
+
+        Returns:
+            float: Segundos estimados de estancia
+        """
+        estimada = self._por_vehiculo.get(id_vehiculo)
+        if estimada is not None:
+            return estimada
+        return self._general if self._general is not None else self.predeterminada
@@ -3,7 +3,8 @@ Módulo para gestión de lista de espera cuando el parqueo está lleno.
 Implementa una cola FIFO (First In, First Out).
 """
 from datetime import datetime
-from .base import ModeloBase, GestorBase
+from .base import ModeloBase, GestorBase, Pagina, TAMANO_PAGINA
+from app import bitacora
 from app.db_config import get_conexion
 
 class ListaEspera(ModeloBase): # Hereda de Clase padre ModeloBase
@@ -16,7 +17,7 @@ class ListaEspera(ModeloBase): # Hereda de Clase padre ModeloBase
         _estado (str): Estado (pendiente/atendido/cancelado)
     """
     
-    ESTADOS_VALIDOS = ['pendiente', 'cancelado']
+    ESTADOS_VALIDOS = ['pendiente', 'atendido', 'cancelado']
     
     def __init__(self, id_vehiculo: int):
         """
@@ -113,6 +114,9 @@ class GestorListaEspera(GestorBase):
                  lista_espera.fecha_solicitud,
                  lista_espera.estado)
             )
+            if bitacora.habilitada():
+                bitacora.registrar(bitacora.ENCOLAR, lista_espera.id_vehiculo,
+                                   dato=self.backend.ultimo_id(cursor))
             conn.commit()
             return True
             
@@ -165,7 +169,7 @@ class GestorListaEspera(GestorBase):
             list[ListaEspera]: Lista completa de espera
         """
         try:
-            conn = get_conexion()
+            conn = get_conexion(lectura=True)
             if not conn:
                 return []
                 
@@ -193,9 +197,71 @@ class GestorListaEspera(GestorBase):
             if conn:
                 conn.close()
 
+    def obtener_pagina(self, limite: int = TAMANO_PAGINA, despues_de: int = None,
+                       estado: str = None) -> Pagina:
+        """
+        Obtiene una página de la lista de espera en orden de llegada usando
+        paginación por clave (id_espera), por lo que su costo no depende
+        de cuántos registros atendidos o cancelados se acumulen.
+        
+        Args:
+            limite: Registros por página (máximo TAMANO_PAGINA_MAXIMO)
+            despues_de: ID del último registro de la página anterior (opcional)
+            estado: Filtra por estado (opcional)
+            
+        Returns:
+            Pagina: Registros de la página y clave de la página siguiente
+            
+        Raises:
+            ValueError: Si el estado no es válido
+        """
+        if estado and estado not in ListaEspera.ESTADOS_VALIDOS:
+            raise ValueError(f"Estado debe ser uno de: {ListaEspera.ESTADOS_VALIDOS}")
+
+        limite = self._limite_pagina(limite)
+        try:
+            conn = get_conexion(lectura=True)
+            if not conn:
+                return Pagina([], None, limite)
+
+            condiciones, parametros = [], []
+            if despues_de is not None:
+                condiciones.append("le.id_espera > ?")
+                parametros.append(despues_de)
+            if estado:
+                condiciones.append("le.estado = ?")
+                parametros.append(estado)
+            donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+            cursor = conn.cursor()
+            cursor.execute(
+                self.backend.limitar(
+                    f"""SELECT le.id_espera, le.id_vehiculo, le.fecha_solicitud, le.estado,
+                   v.placa
+                FROM ListaEspera le
+                JOIN Vehiculos v ON le.id_vehiculo = v.id_vehiculo
+                {donde}
+                ORDER BY le.id_espera""", limite + 1),
+                parametros
+            )
+            return self._armar_pagina(cursor.fetchall(), limite, self._item_desde_fila)
+            
+        except Exception as error:
+            print(f"Error al obtener página de lista de espera: {str(error)}")
+            return Pagina([], None, limite)
+        finally:
+            if conn:
+                conn.close()
+
+    def _item_desde_fila(self, row) -> ListaEspera:
+        """Crea un ListaEspera con la placa del vehículo a partir de una fila."""
+        item = ListaEspera.from_db_row(row)
+        item._placa = row[4]
+        return item
+
     def obtener_pendientes(self) -> list:
         try:
-            conn = get_conexion()
+            conn = get_conexion(lectura=True)
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -212,6 +278,7 @@ class GestorListaEspera(GestorBase):
             for row in cursor.fetchall():
                 item = {
                     'id': row[0],
+                    'id_vehiculo': row[1],
                     'placa': row[4],
                     'marca': row[5],
                     'propietario': row[6],
@@ -271,6 +338,9 @@ class GestorListaEspera(GestorBase):
                 WHERE id_espera = ?""",
                 (lista_espera.estado, lista_espera.id)
             )
+            if cursor.rowcount > 0:
+                bitacora.registrar(bitacora.ENCOLAR if lista_espera.estado == 'pendiente' else bitacora.DESENCOLAR,
+                                   lista_espera.id_vehiculo, dato=lista_espera.id)
             conn.commit()
             return cursor.rowcount > 0
             
@@ -303,6 +373,8 @@ class GestorListaEspera(GestorBase):
                 WHERE id_espera = ?""",
                 (id_espera,)
             )
+            if cursor.rowcount > 0:
+                bitacora.registrar(bitacora.DESENCOLAR, dato=id_espera)
             conn.commit()
             return cursor.rowcount > 0
             
@@ -328,11 +400,11 @@ class GestorListaEspera(GestorBase):
             cursor = conn.cursor()
             
             # Obtener el más antiguo pendiente
-            cursor.execute(
-                """SELECT TOP 1 id_espera, id_vehiculo 
+            cursor.execute(self.backend.limitar(
+                """SELECT id_espera, id_vehiculo 
                 FROM ListaEspera
                 WHERE estado = 'pendiente'
-                ORDER BY fecha_solicitud"""
+                ORDER BY fecha_solicitud""", 1)
             )
             resultado = cursor.fetchone()
             
@@ -346,6 +418,7 @@ class GestorListaEspera(GestorBase):
                 WHERE id_espera = ?""",
                 (resultado[0],)
             )
+            bitacora.registrar(bitacora.DESENCOLAR, resultado[1], dato=resultado[0])
             conn.commit()
             return True
             
@@ -356,6 +429,71 @@ class GestorListaEspera(GestorBase):
             if conn:
                 conn.close()
 
+    def obtener_siguiente(self) -> ListaEspera:
+        """
+        Obtiene el elemento pendiente más antiguo de la lista de espera (FIFO).
+        
+        Returns:
+            ListaEspera: Siguiente elemento en espera o None si no hay pendientes
+        """
+        try:
+            conn = get_conexion()
+            if not conn:
+                return None
+                
+            cursor = conn.cursor()
+            cursor.execute(self.backend.limitar(
+                """SELECT id_espera, id_vehiculo, fecha_solicitud, estado
+                FROM ListaEspera
+                WHERE estado = 'pendiente'
+                ORDER BY fecha_solicitud""", 1)
+            )
+            row = cursor.fetchone()
+            
+            if row:
+                return ListaEspera.from_db_row(row)
+            return None
+            
+        except Exception as error:
+            print(f"Error al obtener siguiente en lista de espera: {str(error)}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    def obtener_siguientes(self, limite: int) -> list[ListaEspera]:
+        """
+        Obtiene los elementos pendientes más antiguos de la lista de espera (FIFO).
+        
+        Args:
+            limite: Cantidad máxima de elementos (por ejemplo, los espacios libres)
+            
+        Returns:
+            list[ListaEspera]: Pendientes en orden de llegada
+        """
+        if limite <= 0:
+            return []
+        try:
+            conn = get_conexion()
+            if not conn:
+                return []
+                
+            cursor = conn.cursor()
+            cursor.execute(self.backend.limitar(
+                """SELECT id_espera, id_vehiculo, fecha_solicitud, estado
+                FROM ListaEspera
+                WHERE estado = 'pendiente'
+                ORDER BY fecha_solicitud, id_espera""", limite)
+            )
+            return [ListaEspera.from_db_row(row) for row in cursor.fetchall()]
+            
+        except Exception as error:
+            print(f"Error al obtener siguientes en lista de espera: {str(error)}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
     def contar_pendientes(self) -> int:
         """
         Cuenta los vehículos pendientes en la lista de espera.
@@ -364,7 +502,7 @@ class GestorListaEspera(GestorBase):
             int: Número de vehículos pendientes
         """
         try:
-            conn = get_conexion()
+            conn = get_conexion(lectura=True)
             if not conn:
                 return 0
                 
@@ -380,3 +518,109 @@ class GestorListaEspera(GestorBase):
         finally:
             if conn:
                 conn.close()
+
+    def archivar_finalizados(self, antes_de: datetime, limite: int) -> int:
+        """
+        Mueve a ListaEsperaHistorico los elementos atendidos o cancelados
+        solicitados antes de una fecha, los más antiguos primero, para que
+        ListaEspera sólo conserve lo reciente.
+        
+        Args:
+            antes_de: Fecha de solicitud límite (exclusiva)
+            limite: Elementos máximos a mover en esta llamada
+            
+        Returns:
+            int: Cantidad de elementos archivados
+        """
+        try:
+            conn = get_conexion()
+            if not conn:
+                return 0
+                
+            cursor = conn.cursor()
+            cursor.execute(self.backend.limitar(
+                """SELECT id_espera FROM ListaEspera
+                WHERE estado IN ('atendido', 'cancelado') AND fecha_solicitud < ?
+                ORDER BY id_espera""", limite),
+                (antes_de,)
+            )
+            ids = cursor.fetchall()
+            if not ids:
+                return 0
+
+            # El lote queda delimitado por su último ID: copia y borrado usan el mismo filtro
+            filtro = """WHERE estado IN ('atendido', 'cancelado') AND fecha_solicitud < ?
+                        AND id_espera <= ?"""
+            parametros = (antes_de, ids[-1][0])
+            cursor.execute(
+                f"""INSERT INTO ListaEsperaHistorico (id_espera, id_vehiculo, fecha_solicitud, estado)
+                SELECT id_espera, id_vehiculo, fecha_solicitud, estado
+                FROM ListaEspera {filtro}""",
+                parametros
+            )
+            cursor.execute(f"DELETE FROM ListaEspera {filtro}", parametros)
+            archivados = cursor.rowcount
+            conn.commit()
+            return archivados
+            
+        except Exception as error:
+            print(f"Error al archivar lista de espera: {str(error)}")
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+    def obtener_historial(self, id_vehiculo: int = None, desde: datetime = None,
+                          hasta: datetime = None, limite: int = TAMANO_PAGINA) -> list[ListaEspera]:
+        """
+        Obtiene las solicitudes atendidas o canceladas, estén todavía en
+        ListaEspera o ya archivadas, de la más reciente a la más antigua.
+        
+        Args:
+            id_vehiculo: Filtra por vehículo (opcional)
+            desde: Fecha de solicitud mínima (opcional)
+            hasta: Fecha de solicitud máxima, exclusiva (opcional)
+            limite: Registros máximos (máximo TAMANO_PAGINA_MAXIMO)
+            
+        Returns:
+            list[ListaEspera]: Solicitudes con la placa del vehículo
+        """
+        try:
+            conn = get_conexion(lectura=True)
+            if not conn:
+                return []
+
+            condiciones, parametros = [], []
+            if id_vehiculo is not None:
+                condiciones.append("h.id_vehiculo = ?")
+                parametros.append(id_vehiculo)
+            if desde is not None:
+                condiciones.append("h.fecha_solicitud >= ?")
+                parametros.append(desde)
+            if hasta is not None:
+                condiciones.append("h.fecha_solicitud < ?")
+                parametros.append(hasta)
+            donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+            cursor = conn.cursor()
+            cursor.execute(
+                self.backend.limitar(
+                    f"""SELECT h.id_espera, h.id_vehiculo, h.fecha_solicitud, h.estado, v.placa
+                FROM (SELECT id_espera, id_vehiculo, fecha_solicitud, estado
+                      FROM ListaEspera WHERE estado <> 'pendiente'
+                      UNION ALL
+                      SELECT id_espera, id_vehiculo, fecha_solicitud, estado
+                      FROM ListaEsperaHistorico) h
+                LEFT JOIN Vehiculos v ON h.id_vehiculo = v.id_vehiculo
+                {donde}
+                ORDER BY h.fecha_solicitud DESC, h.id_espera DESC""", self._limite_pagina(limite)),
+                parametros
+            )
+            return [self._item_desde_fila(row) for row in cursor.fetchall()]
+            
+        except Exception as error:
+            print(f"Error al obtener historial de lista de espera: {str(error)}")
+            return []
+        finally:
+            if conn:
+                conn.close()
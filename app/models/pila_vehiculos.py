@@ -0,0 +1,1207 @@
+"""
+Módulo con el motor en memoria de los estacionamientos en fila.
+Cada EspaciosFila se representa como una pila LIFO (máximo 3 vehículos)
+cargada una sola vez desde PilaVehiculos y sincronizada con la base de
+datos mediante escritura directa (write-through). Dentro de una unidad de
+trabajo la confirmación se pospone al final de la solicitud; si la unidad se
+revierte, el motor se recarga desde la base de datos. Un motor creado con
+MotorPilas.en_memoria() aplica la misma lógica sin base de datos, para
+simulaciones.
+
+Para asignar filas el motor conoce la salida esperada de cada vehículo
+(declarada al entrar o estimada con su historial de estancias) y prefiere
+filas donde el vehículo nuevo no quede encima de otros que saldrán antes.
+
+Si la bitácora de eventos está habilitada (ver app/bitacora.py), cada cambio
+se registra en ella y la primera carga reconstruye las pilas desde la
+bitácora cuando coinciden con la base de datos.
+
+Con varios procesos, el motor puede compartir un mapa de ocupación (ver
+app/ocupacion_compartida.py): cada cambio se publica en memoria compartida
+bajo un bloqueo entre procesos y los demás motores lo aplican antes de
+responder, sin consultar la base de datos.
+"""
+import bisect
+import heapq
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from app import bitacora
+from app.db_config import get_conexion
+from app.metricas import instrumentar_clase
+from app.models.base import en_bloques
+from app.models.estancias import EstimadorEstancias
+from app.unidad_trabajo import ejecutar_al_revertir, ejecutar_al_terminar
+
+CAPACIDAD_FILA = 3
+FILAS_REVISADAS = 128  # Filas que elegir_fila compara cuando todas bloquean a alguien
+
+class PilaFila:
+    """
+    Pila compacta de vehículos de un espacio en fila.
+
+    Atributos:
+        id_espacio_fila (int): ID del espacio de fila
+        numero_espacio (str): Número visible del espacio
+        capacidad (int): Vehículos máximos en la fila
+        vehiculos (list[int]): IDs de vehículos del fondo (posición 1) al tope
+    """
+    __slots__ = ('id_espacio_fila', 'numero_espacio', 'capacidad', 'vehiculos')
+
+    def __init__(self, id_espacio_fila: int, numero_espacio: str, capacidad: int = CAPACIDAD_FILA):
+        self.id_espacio_fila = id_espacio_fila
+        self.numero_espacio = numero_espacio
+        self.capacidad = capacidad
+        self.vehiculos = []
+
+    @property
+    def total(self) -> int:
+        """Devuelve la cantidad de vehículos estacionados."""
+        return len(self.vehiculos)
+
+    @property
+    def libres(self) -> int:
+        """Devuelve los espacios libres de la fila."""
+        return self.capacidad - len(self.vehiculos)
+
+    @property
+    def llena(self) -> bool:
+        """Indica si la fila alcanzó su capacidad."""
+        return len(self.vehiculos) >= self.capacidad
+
+    @property
+    def tope(self) -> int:
+        """Devuelve el vehículo en el tope de la pila o None."""
+        return self.vehiculos[-1] if self.vehiculos else None
+
+    def posicion(self, id_vehiculo: int) -> int:
+        """Devuelve la posición (1 = fondo) del vehículo o 0 si no está."""
+        try:
+            return self.vehiculos.index(id_vehiculo) + 1
+        except ValueError:
+            return 0
+
+class PasoExtraccion:
+    """
+    Movimiento de un vehículo dentro de un plan de extracción.
+
+    Atributos:
+        accion (str): 'apartar' (sale para liberar el paso), 'salida'
+            (el vehículo objetivo se va) o 'retorno' (vuelve a su fila)
+        id_vehiculo (int): Vehículo que se mueve
+        origen (int): id_espacio_fila de donde sale (None = desde fuera del parqueo)
+        destino (int): id_espacio_fila a donde va (None = fuera del parqueo)
+    """
+    __slots__ = ('accion', 'id_vehiculo', 'origen', 'destino')
+
+    def __init__(self, accion: str, id_vehiculo: int, origen: int, destino: int):
+        self.accion = accion
+        self.id_vehiculo = id_vehiculo
+        self.origen = origen
+        self.destino = destino
+
+    def to_dict(self) -> dict:
+        """Devuelve el paso como diccionario serializable a JSON."""
+        return {
+            'accion': self.accion,
+            'id_vehiculo': self.id_vehiculo,
+            'origen': self.origen,
+            'destino': self.destino,
+        }
+
+class PlanExtraccion:
+    """
+    Secuencia completa de movimientos para sacar un vehículo de su fila.
+
+    Atributos:
+        id_vehiculo (int): Vehículo a extraer
+        id_espacio_fila (int): Fila donde está el vehículo
+        posicion (int): Posición del vehículo en la fila (1 = fondo)
+        bloqueadores (list[int]): Vehículos encima del objetivo, del tope hacia abajo
+        pasos (list[PasoExtraccion]): Movimientos en el orden en que se hacen
+        reubicados (dict): id_vehiculo -> fila donde queda un bloqueador que no regresa
+    """
+
+    def __init__(self, id_vehiculo: int, id_espacio_fila: int, posicion: int, bloqueadores: list):
+        self.id_vehiculo = id_vehiculo
+        self.id_espacio_fila = id_espacio_fila
+        self.posicion = posicion
+        self.bloqueadores = bloqueadores
+        self.pasos = []
+        self.reubicados = {}
+
+    @property
+    def movimientos(self) -> int:
+        """Total de movimientos de vehículos del plan."""
+        return len(self.pasos)
+
+    @property
+    def retornados(self) -> list:
+        """Bloqueadores que regresan a la fila, en el orden en que regresan."""
+        return [paso.id_vehiculo for paso in self.pasos if paso.accion == 'retorno']
+
+    def to_dict(self) -> dict:
+        """Devuelve el plan como diccionario serializable a JSON."""
+        return {
+            'id_vehiculo': self.id_vehiculo,
+            'id_espacio_fila': self.id_espacio_fila,
+            'posicion': self.posicion,
+            'bloqueadores': self.bloqueadores,
+            'movimientos': self.movimientos,
+            'pasos': [paso.to_dict() for paso in self.pasos],
+        }
+
+@instrumentar_clase
+class MotorPilas:
+    """
+    Motor autoritativo en memoria de las pilas de vehículos por fila.
+    Las decisiones de estacionar, sacar y consultar el tope se resuelven
+    en memoria; cada cambio se persiste en PilaVehiculos antes de aplicarse.
+
+    Atributos:
+        _filas (dict): PilaFila por id_espacio_fila
+        _ubicacion (dict): id_espacio_fila por id_vehiculo estacionado
+        _libres (list): Montículo (numero_espacio, id_espacio_fila) de filas
+            con espacio libre; las entradas de filas llenas se descartan
+            al consultarlo
+        _en_libres (set): IDs de fila presentes en el montículo
+        _entradas (dict): Hora de entrada (segundos epoch) por id_vehiculo
+        _salidas (dict): Hora de salida esperada (segundos epoch) por id_vehiculo
+        _por_salida (list): Lista ordenada (salida más próxima, numero_espacio,
+            id_espacio_fila) de las filas con espacio libre; las vacías van al final
+        _clave_salida (dict): Entrada de cada fila en _por_salida
+        _cargado (bool): Indica si el estado se cargó desde la base de datos
+        _persistir (bool): Si los cambios se escriben en la base de datos
+        _al_liberar (list): Funciones a llamar cuando se libera espacio
+        _versiones (dict): Versión del mapa compartido aplicada por id_espacio_fila
+        _generacion_vista (int): Generación del mapa compartido ya aplicada
+        estimador (EstimadorEstancias): Estima la estancia de cada vehículo
+        ocupacion (OcupacionCompartida): Mapa compartido entre procesos o None
+    """
+
+    def __init__(self, estimador: EstimadorEstancias = None, reloj=time.time, ocupacion=None):
+        """
+        Inicializa el motor vacío; el estado se carga con cargar().
+
+        Args:
+            estimador: Estimador de estancias (por defecto uno sin historial)
+            reloj: Función que devuelve la hora actual en segundos epoch
+            ocupacion: Mapa de ocupación compartido entre procesos (opcional)
+        """
+        self.estimador = estimador or EstimadorEstancias()
+        self.ocupacion = ocupacion
+        self._reloj = reloj
+        self._filas = {}
+        self._ubicacion = {}
+        self._libres = []
+        self._en_libres = set()
+        self._entradas = {}
+        self._salidas = {}
+        self._por_salida = []
+        self._clave_salida = {}
+        self._cargado = False
+        self._persistir = True
+        self._al_liberar = []
+        self._versiones = {}
+        self._generacion_vista = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def en_memoria(cls, cantidad_filas: int, capacidad: int = CAPACIDAD_FILA,
+                   estimador: EstimadorEstancias = None, reloj=time.time) -> 'MotorPilas':
+        """
+        Crea un motor que no usa la base de datos, con filas vacías de
+        IDs 1..cantidad_filas. Aplica las mismas reglas de asignación y
+        extracción que el motor persistente.
+
+        Args:
+            cantidad_filas: Número de filas
+            capacidad: Vehículos por fila (por defecto 3)
+            estimador: Estimador de estancias (por defecto uno sin historial)
+            reloj: Función que devuelve la hora actual en segundos epoch
+
+        Returns:
+            MotorPilas: Motor cargado y vacío
+        """
+        motor = cls(estimador, reloj)
+        motor._persistir = False
+        for id_espacio_fila in range(1, cantidad_filas + 1):
+            fila = PilaFila(id_espacio_fila, f"F{id_espacio_fila:05d}", capacidad)
+            motor._filas[id_espacio_fila] = fila
+            motor._indexar(fila)
+        motor._cargado = True
+        return motor
+
+    @property
+    def cargado(self) -> bool:
+        """Indica si el motor ya tiene el estado de la base de datos."""
+        return self._cargado
+
+    def cargar(self) -> bool:
+        """
+        Carga todas las filas y sus pilas desde la base de datos. La primera
+        carga usa la bitácora de eventos si está habilitada y coincide
+        exactamente con la base de datos; las demás (y si no coincide) cargan
+        PilaVehiculos con sus fechas de entrada.
+
+        Returns:
+            bool: True si se cargó correctamente, False si falló
+        """
+        if not self._persistir:
+            return True
+        if not self._cargado and self._restaurar_desde_bitacora():
+            return True
+
+        conn = None
+        try:
+            conn = get_conexion()
+            if not conn:
+                return False
+
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT id_espacio_fila, numero_espacio, capacidad
+                   FROM EspaciosFila"""
+            )
+            filas = {}
+            for row in cursor.fetchall():
+                filas[row[0]] = PilaFila(row[0], row[1], row[2] or CAPACIDAD_FILA)
+
+            cursor.execute(
+                """SELECT id_espacio_fila, id_vehiculo, fecha_entrada
+                   FROM PilaVehiculos
+                   ORDER BY id_espacio_fila, posicion"""
+            )
+            entradas = {}
+            for row in cursor.fetchall():
+                fila = filas.get(row[0])
+                if fila is not None:
+                    fila.vehiculos.append(row[1])
+                    entradas[row[1]] = row[2].timestamp() if isinstance(row[2], datetime) else None
+
+            self._instalar(filas, entradas)
+            if bitacora.habilitada():
+                bitacora.fijar_base(self._estado_bitacora(cursor))
+            # Dentro de una unidad de trabajo pudo leer cambios sin confirmar
+            ejecutar_al_revertir(self.cargar)
+            self._avisar_liberacion()
+            return True
+
+        except Exception as error:
+            print(f"Error al cargar pilas de vehículos: {str(error)}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+
+    def recargar_filas(self, ids_espacio_fila: list) -> bool:
+        """
+        Vuelve a leer de PilaVehiculos las pilas de algunas filas, tras
+        cambios hechos con sentencias por conjuntos fuera del motor. Los
+        vehículos que el motor no conocía (por ejemplo, los que vuelven de
+        una salida temporal tras una recarga) conservan su hora de entrada
+        de Vehiculos.
+        
+        Args:
+            ids_espacio_fila: IDs de las filas a recargar
+            
+        Returns:
+            bool: True si se recargaron correctamente, False si falló
+        """
+        self._asegurar_cargado()
+        ids_espacio_fila = [id_fila for id_fila in ids_espacio_fila if id_fila in self._filas]
+        if not ids_espacio_fila or not self._persistir:
+            return True
+
+        conn = None
+        try:
+            conn = get_conexion()
+            if not conn:
+                return False
+
+            cursor = conn.cursor()
+            pilas = {id_fila: [] for id_fila in ids_espacio_fila}
+            entradas = {}
+            for bloque, marcadores in en_bloques(ids_espacio_fila):
+                cursor.execute(
+                    f"""SELECT pv.id_espacio_fila, pv.id_vehiculo, v.hora_entrada
+                       FROM PilaVehiculos pv
+                       LEFT JOIN Vehiculos v ON pv.id_vehiculo = v.id_vehiculo
+                       WHERE pv.id_espacio_fila IN ({marcadores})
+                       ORDER BY pv.id_espacio_fila, pv.posicion""",
+                    bloque
+                )
+                for row in cursor.fetchall():
+                    pilas[row[0]].append(row[1])
+                    entradas[row[1]] = row[2].timestamp() if isinstance(row[2], datetime) else None
+
+        except Exception as error:
+            print(f"Error al recargar filas: {str(error)}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+
+        with self._exclusivo():
+            eventos = []
+            for id_espacio_fila, vehiculos in pilas.items():
+                fila = self._filas[id_espacio_fila]
+                eventos.extend((bitacora.SALIR, id_vehiculo, id_espacio_fila, posicion)
+                               for posicion, id_vehiculo in enumerate(fila.vehiculos, 1)
+                               if id_vehiculo not in vehiculos)
+                eventos.extend((bitacora.RETORNO, id_vehiculo, id_espacio_fila, posicion)
+                               for posicion, id_vehiculo in enumerate(vehiculos, 1)
+                               if id_vehiculo not in fila.vehiculos)
+                for id_vehiculo in fila.vehiculos:
+                    if self._ubicacion.get(id_vehiculo) == id_espacio_fila:
+                        del self._ubicacion[id_vehiculo]
+                fila.vehiculos = vehiculos
+                for id_vehiculo in vehiculos:
+                    self._ubicacion[id_vehiculo] = id_espacio_fila
+                    if id_vehiculo not in self._salidas:
+                        self._registrar_entrada(id_vehiculo, entrada=entradas.get(id_vehiculo))
+                self._indexar(fila)
+            self._anotar(*eventos)
+            self._publicar(*(self._filas[id_espacio_fila] for id_espacio_fila in pilas))
+        ejecutar_al_revertir(self.cargar)
+        return True
+
+    def obtener_fila(self, id_espacio_fila: int) -> PilaFila:
+        """Devuelve la pila de una fila o None si no existe."""
+        self._asegurar_cargado()
+        return self._filas.get(id_espacio_fila)
+
+    def ubicacion(self, id_vehiculo: int) -> int:
+        """Devuelve el id_espacio_fila donde está el vehículo o None."""
+        self._asegurar_cargado()
+        return self._ubicacion.get(id_vehiculo)
+
+    def esta_estacionado(self, id_vehiculo: int) -> bool:
+        """Indica si el vehículo ocupa alguna fila."""
+        return self.ubicacion(id_vehiculo) is not None
+
+    def tiene_espacio(self, id_espacio_fila: int) -> bool:
+        """Indica si la fila existe y tiene al menos un espacio libre."""
+        fila = self.obtener_fila(id_espacio_fila)
+        return fila is not None and not fila.llena
+
+    def tope(self, id_espacio_fila: int) -> int:
+        """Devuelve el vehículo en el tope de la fila o None."""
+        fila = self.obtener_fila(id_espacio_fila)
+        return fila.tope if fila else None
+
+    def buscar_fila_disponible(self) -> int:
+        """
+        Busca la primera fila (por número de espacio) con espacio libre.
+        Usa el índice de filas libres, por lo que no recorre todas las filas.
+
+        Returns:
+            int: ID del espacio de fila o None si todas están llenas
+        """
+        self._asegurar_cargado()
+        with self._lock:
+            while self._libres:
+                id_espacio_fila = self._libres[0][1]
+                fila = self._filas.get(id_espacio_fila)
+                if fila is not None and not fila.llena:
+                    return id_espacio_fila
+                heapq.heappop(self._libres)
+                self._en_libres.discard(id_espacio_fila)
+        return None
+
+    def espacios_libres(self) -> int:
+        """Devuelve el total de espacios libres sumando todas las filas."""
+        self._asegurar_cargado()
+        with self._lock:
+            return sum(self._filas[id_espacio_fila].libres for _, _, id_espacio_fila in self._por_salida)
+
+    def suscribir_liberacion(self, funcion):
+        """
+        Registra una función sin argumentos que se llama cuando un vehículo
+        sale o el estado se recarga, después de confirmar la transacción.
+
+        Args:
+            funcion: Función a llamar; debe ser rápida (por ejemplo, activar un evento)
+        """
+        self._al_liberar.append(funcion)
+
+    def salida_esperada(self, id_vehiculo: int) -> float:
+        """Devuelve la salida esperada (segundos epoch) de un vehículo estacionado o None."""
+        self._asegurar_cargado()
+        return self._salidas.get(id_vehiculo)
+
+    def elegir_fila(self, id_vehiculo: int, salida_estimada: float = None) -> int:
+        """
+        Elige la fila donde el vehículo tiene menos probabilidad de bloquear
+        a otros. Prefiere la fila cuyo próximo vehículo en salir lo hace justo
+        después del nuevo (quedará encima sin tapar a nadie que salga antes),
+        luego una fila vacía y, si no queda otra, la fila con menos vehículos
+        que saldrán antes que él entre las FILAS_REVISADAS de salida más tardía.
+
+        Args:
+            id_vehiculo: Vehículo a estacionar
+            salida_estimada: Hora de salida declarada en segundos epoch
+                (opcional; si se omite se estima con su historial)
+
+        Returns:
+            int: ID del espacio de fila o None si todas están llenas
+        """
+        self._asegurar_cargado()
+        with self._lock:
+            if salida_estimada is None:
+                salida_estimada = self._reloj() + self.estimador.estimar(id_vehiculo)
+
+            # Primera fila cuyo vehículo más próximo a salir sale después del nuevo
+            indice = bisect.bisect_left(self._por_salida, (salida_estimada,))
+            if indice < len(self._por_salida):
+                return self._por_salida[indice][2]
+
+            mejor, menos_bloqueados = None, math.inf
+            salidas = self._salidas
+            for _, _, id_espacio_fila in itertools.islice(reversed(self._por_salida), FILAS_REVISADAS):
+                bloqueados = 0
+                for id_estacionado in self._filas[id_espacio_fila].vehiculos:
+                    if salidas.get(id_estacionado, math.inf) < salida_estimada:
+                        bloqueados += 1
+                if bloqueados < menos_bloqueados:
+                    mejor, menos_bloqueados = id_espacio_fila, bloqueados
+                    if bloqueados <= 1:
+                        break
+            return mejor
+
+    def estacionar(self, id_espacio_fila: int, id_vehiculo: int, id_espera: int = None,
+                   salida_estimada: float = None) -> bool:
+        """
+        Apila un vehículo en la fila, lo persiste en PilaVehiculos y
+        registra su hora de entrada en Vehiculos.
+
+        Args:
+            id_espacio_fila: ID del espacio de fila
+            id_vehiculo: ID del vehículo a estacionar
+            id_espera: ID en ListaEspera a marcar como atendido en la misma transacción
+            salida_estimada: Hora de salida declarada en segundos epoch (opcional)
+
+        Returns:
+            bool: True si se estacionó, False si la fila está llena,
+                el vehículo ya está estacionado o falló la base de datos
+        """
+        self._asegurar_cargado()
+        with self._exclusivo():
+            fila = self._filas.get(id_espacio_fila)
+            if fila is None or fila.llena or id_vehiculo in self._ubicacion:
+                return False
+
+            if not self._guardar_estacionamiento(fila, id_vehiculo, id_espera):
+                return False
+
+            fila.vehiculos.append(id_vehiculo)
+            self._ubicacion[id_vehiculo] = id_espacio_fila
+            self._registrar_entrada(id_vehiculo, salida_estimada)
+            self._indexar(fila)
+            self._anotar((bitacora.ESTACIONAR, id_vehiculo, id_espacio_fila, fila.total))
+            if id_espera is not None:
+                self._anotar((bitacora.DESENCOLAR, id_vehiculo, id_espacio_fila, id_espera))
+            self._publicar(fila)
+            ejecutar_al_revertir(self.cargar)
+            return True
+
+    def estacionar_lote(self, pendientes: list) -> list:
+        """
+        Estaciona en orden los vehículos de la lista de espera mientras haya
+        espacio, cada uno en la fila que elige elegir_fila. Las escrituras
+        van en un executemany por tabla dentro de una sola transacción.
+        Los pendientes cuyo vehículo ya está estacionado sólo se marcan
+        como atendidos.
+
+        Args:
+            pendientes: Elementos ListaEspera en orden FIFO
+
+        Returns:
+            list[tuple]: (id_vehiculo, id_espacio_fila) de cada vehículo estacionado;
+                vacía si no había espacio o falló la base de datos
+        """
+        self._asegurar_cargado()
+        with self._exclusivo():
+            asignaciones, atendidos, eventos = self._planificar_lote(pendientes)
+            if not atendidos:
+                return []
+            if not self._guardar_lote([(id_espacio_fila, id_vehiculo, posicion)
+                                       for id_espacio_fila, id_vehiculo, posicion, _ in asignaciones],
+                                      atendidos):
+                return []
+
+            for id_espacio_fila, id_vehiculo, _, salida in asignaciones:
+                fila = self._filas[id_espacio_fila]
+                fila.vehiculos.append(id_vehiculo)
+                self._ubicacion[id_vehiculo] = id_espacio_fila
+                self._registrar_entrada(id_vehiculo, salida)
+                self._indexar(fila)
+            self._anotar(*eventos)
+            self._publicar(*{self._filas[id_espacio_fila] for id_espacio_fila, _, _, _ in asignaciones})
+            ejecutar_al_revertir(self.cargar)
+            return [(id_vehiculo, id_espacio_fila) for id_espacio_fila, id_vehiculo, _, _ in asignaciones]
+
+    def _planificar_lote(self, pendientes: list) -> tuple:
+        """
+        Decide la fila de cada pendiente de estacionar_lote sin dejar cambios
+        en el motor: cada asignación se aplica de forma provisional para que
+        elegir_fila vea las anteriores y al final se deshacen todas
+        (dentro de _exclusivo).
+
+        Args:
+            pendientes: Elementos ListaEspera en orden FIFO
+
+        Returns:
+            tuple: (asignaciones (id_espacio_fila, id_vehiculo, posicion, salida),
+                IDs de espera atendidos, eventos de bitácora)
+        """
+        asignaciones, atendidos, eventos, anteriores = [], [], [], []
+        try:
+            for espera in pendientes:
+                if espera.id_vehiculo not in self._ubicacion:
+                    id_espacio_fila = self.elegir_fila(espera.id_vehiculo)
+                    if id_espacio_fila is None:
+                        break
+                    fila = self._filas[id_espacio_fila]
+                    anteriores.append((espera.id_vehiculo, self._entradas.get(espera.id_vehiculo),
+                                       self._salidas.get(espera.id_vehiculo)))
+                    fila.vehiculos.append(espera.id_vehiculo)
+                    self._ubicacion[espera.id_vehiculo] = id_espacio_fila
+                    self._registrar_entrada(espera.id_vehiculo)
+                    self._indexar(fila)
+                    asignaciones.append((id_espacio_fila, espera.id_vehiculo, fila.total,
+                                         self._salidas[espera.id_vehiculo]))
+                    eventos.append((bitacora.ESTACIONAR, espera.id_vehiculo, id_espacio_fila, fila.total))
+                atendidos.append(espera.id)
+                eventos.append((bitacora.DESENCOLAR, espera.id_vehiculo,
+                                self._ubicacion[espera.id_vehiculo], espera.id))
+        finally:
+            for (id_espacio_fila, _, _, _), (id_vehiculo, entrada, salida) in zip(
+                    reversed(asignaciones), reversed(anteriores)):
+                fila = self._filas[id_espacio_fila]
+                fila.vehiculos.pop()
+                del self._ubicacion[id_vehiculo]
+                for registro, valor in ((self._entradas, entrada), (self._salidas, salida)):
+                    if valor is None:
+                        registro.pop(id_vehiculo, None)
+                    else:
+                        registro[id_vehiculo] = valor
+                self._indexar(fila)
+        return asignaciones, atendidos, eventos
+
+    def sacar(self, id_espacio_fila: int, id_vehiculo: int) -> bool:
+        """
+        Retira un vehículo de la fila. Los vehículos que estaban encima
+        bajan una posición para que la pila se mantenga compacta. La
+        estancia se registra en Vehiculos y en el estimador.
+
+        Args:
+            id_espacio_fila: ID del espacio de fila
+            id_vehiculo: ID del vehículo a retirar
+
+        Returns:
+            bool: True si se retiró, False si no estaba en la fila o falló
+        """
+        self._asegurar_cargado()
+        with self._exclusivo():
+            fila = self._filas.get(id_espacio_fila)
+            posicion = fila.posicion(id_vehiculo) if fila else 0
+            if not posicion:
+                return False
+
+            if not self._guardar_salida(fila, id_vehiculo, posicion):
+                return False
+
+            del fila.vehiculos[posicion - 1]
+            del self._ubicacion[id_vehiculo]
+            self._registrar_salida(id_vehiculo)
+            self._indexar(fila)
+            self._anotar((bitacora.SALIR, id_vehiculo, id_espacio_fila, posicion))
+            self._publicar(fila)
+            ejecutar_al_revertir(self.cargar)
+            self._avisar_liberacion()
+            return True
+
+    def planificar_extraccion(self, id_vehiculo: int, retornar: bool = True) -> PlanExtraccion:
+        """
+        Calcula el plan para sacar un vehículo que puede estar enterrado.
+        Los bloqueadores salen del tope hacia abajo y se apartan en otras
+        filas con espacio (o fuera del parqueo si no hay); luego sale el
+        objetivo. Con retornar=True los bloqueadores vuelven a su fila en
+        orden inverso, lo que conserva su orden original (2 movimientos
+        cada uno); con retornar=False se quedan en la fila donde se
+        apartaron y sólo regresan los que tuvieron que esperar fuera.
+
+        Args:
+            id_vehiculo: Vehículo a extraer
+            retornar: Si los bloqueadores apartados en otras filas regresan
+
+        Returns:
+            PlanExtraccion: Plan calculado o None si el vehículo no está estacionado
+        """
+        self._asegurar_cargado()
+        with self._lock:
+            id_espacio_fila = self._ubicacion.get(id_vehiculo)
+            if id_espacio_fila is None:
+                return None
+
+            fila = self._filas[id_espacio_fila]
+            posicion = fila.posicion(id_vehiculo)
+            bloqueadores = list(reversed(fila.vehiculos[posicion:]))
+            plan = PlanExtraccion(id_vehiculo, id_espacio_fila, posicion, bloqueadores)
+
+            destinos = self._espacios_temporales(len(bloqueadores), id_espacio_fila) if bloqueadores else []
+            apartados = []
+            for id_bloqueador, destino in zip(bloqueadores, destinos):
+                plan.pasos.append(PasoExtraccion('apartar', id_bloqueador, id_espacio_fila, destino))
+                apartados.append((id_bloqueador, destino))
+
+            plan.pasos.append(PasoExtraccion('salida', id_vehiculo, id_espacio_fila, None))
+
+            # El último apartado está en el tope de su destino: regresan en orden LIFO
+            # y los que se quedan conservan en su destino el orden en que se apartaron
+            for id_bloqueador, destino in reversed(apartados):
+                if retornar or destino is None:
+                    plan.pasos.append(PasoExtraccion('retorno', id_bloqueador, destino, id_espacio_fila))
+            if not retornar:
+                plan.reubicados = {id_bloqueador: destino for id_bloqueador, destino in apartados
+                                   if destino is not None}
+            return plan
+
+    def extraer(self, id_vehiculo: int, retornar: bool = True) -> PlanExtraccion:
+        """
+        Calcula y ejecuta el plan de extracción en una sola transacción,
+        con un número fijo de sentencias sin importar cuántos bloqueadores
+        haya. Los bloqueadores que regresan quedan registrados en
+        MovimientosTemporales como movimientos ya retornados.
+
+        Args:
+            id_vehiculo: Vehículo a extraer
+            retornar: Si los bloqueadores apartados en otras filas regresan
+
+        Returns:
+            PlanExtraccion: Plan ejecutado o None si el vehículo no está
+                estacionado o falló la base de datos
+        """
+        with self._exclusivo():
+            plan = self.planificar_extraccion(id_vehiculo, retornar)
+            if plan is None:
+                return None
+
+            fila = self._filas[plan.id_espacio_fila]
+            if not self._guardar_extraccion(plan, fila):
+                return None
+
+            eventos = [(bitacora.SALIDA_TEMPORAL, id_bloqueador, fila.id_espacio_fila, fila.posicion(id_bloqueador))
+                       for id_bloqueador in plan.bloqueadores]
+            eventos.append((bitacora.SALIR, plan.id_vehiculo, fila.id_espacio_fila, plan.posicion))
+            eventos.extend((bitacora.RETORNO, id_bloqueador, fila.id_espacio_fila, plan.posicion + indice)
+                           for indice, id_bloqueador in enumerate(plan.retornados))
+
+            fila.vehiculos = fila.vehiculos[:plan.posicion - 1] + plan.retornados
+            del self._ubicacion[plan.id_vehiculo]
+            self._registrar_salida(plan.id_vehiculo)
+            for id_bloqueador, destino in plan.reubicados.items():
+                self._filas[destino].vehiculos.append(id_bloqueador)
+                self._ubicacion[id_bloqueador] = destino
+            for destino in set(plan.reubicados.values()):
+                self._indexar(self._filas[destino])
+            self._indexar(fila)
+            eventos.extend((bitacora.ESTACIONAR, id_bloqueador, destino, self._filas[destino].posicion(id_bloqueador))
+                           for id_bloqueador, destino in plan.reubicados.items())
+            self._anotar(*eventos)
+            self._publicar(fila, *(self._filas[destino] for destino in set(plan.reubicados.values())))
+            ejecutar_al_revertir(self.cargar)
+            self._avisar_liberacion()
+            return plan
+
+    def retornar(self, gestor_salidas, ids_espacio_fila: list = None) -> int:
+        """
+        Retorna a sus filas los vehículos con salida temporal pendiente.
+        Las sentencias por conjuntos del gestor y la recarga de las filas
+        ocurren dentro de la sección crítica, para que ningún estacionamiento
+        concurrente decida con el total anterior de la fila.
+
+        Args:
+            gestor_salidas: Gestor de las salidas temporales
+            ids_espacio_fila: Filas a retornar (None = todas las filas)
+
+        Returns:
+            int: Cantidad de vehículos retornados
+        """
+        if not self._persistir:
+            return 0
+        self._asegurar_cargado()
+        with self._exclusivo():
+            retornados = gestor_salidas.retornar_pendientes(ids_espacio_fila)
+            if retornados:
+                if ids_espacio_fila is None:
+                    self.cargar()
+                else:
+                    self.recargar_filas(ids_espacio_fila)
+            return retornados
+
+    def _guardar_estacionamiento(self, fila: PilaFila, id_vehiculo: int, id_espera: int = None) -> bool:
+        """Persiste un vehículo nuevo en el tope de la fila."""
+        if not self._persistir:
+            return True
+
+        conn = None
+        try:
+            conn = get_conexion()
+            if not conn:
+                return False
+
+            cursor = conn.cursor()
+            cursor.execute(
+                """INSERT INTO PilaVehiculos
+                   (id_espacio_fila, id_vehiculo, posicion, fecha_entrada)
+                   VALUES (?, ?, ?, GETDATE())""",
+                (fila.id_espacio_fila, id_vehiculo, fila.total + 1)
+            )
+            cursor.execute(
+                """UPDATE Vehiculos
+                   SET hora_entrada = GETDATE(), hora_salida = NULL
+                   WHERE id_vehiculo = ?""",
+                (id_vehiculo,)
+            )
+            if id_espera is not None:
+                cursor.execute(
+                    """UPDATE ListaEspera
+                       SET estado = 'atendido'
+                       WHERE id_espera = ?""",
+                    (id_espera,)
+                )
+            conn.commit()
+            return True
+
+        except Exception as error:
+            print(f"Error al estacionar vehículo en fila: {str(error)}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+
+    def _guardar_lote(self, asignaciones: list, atendidos: list) -> bool:
+        """Persiste los vehículos estacionados desde la lista de espera."""
+        if not self._persistir:
+            return True
+
+        conn = None
+        try:
+            conn = get_conexion()
+            if not conn:
+                return False
+
+            cursor = conn.cursor()
+            if asignaciones:
+                cursor.executemany(
+                    """INSERT INTO PilaVehiculos
+                       (id_espacio_fila, id_vehiculo, posicion, fecha_entrada)
+                       VALUES (?, ?, ?, GETDATE())""",
+                    asignaciones
+                )
+                cursor.executemany(
+                    """UPDATE Vehiculos
+                       SET hora_entrada = GETDATE(), hora_salida = NULL
+                       WHERE id_vehiculo = ?""",
+                    [(id_vehiculo,) for _, id_vehiculo, _ in asignaciones]
+                )
+            cursor.executemany(
+                """UPDATE ListaEspera
+                   SET estado = 'atendido'
+                   WHERE id_espera = ?""",
+                [(id_espera,) for id_espera in atendidos]
+            )
+            conn.commit()
+            return True
+
+        except Exception as error:
+            print(f"Error al estacionar lista de espera: {str(error)}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+
+    def _guardar_salida(self, fila: PilaFila, id_vehiculo: int, posicion: int) -> bool:
+        """Persiste la salida de un vehículo y compacta la fila."""
+        if not self._persistir:
+            return True
+
+        conn = None
+        try:
+            conn = get_conexion()
+            if not conn:
+                return False
+
+            cursor = conn.cursor()
+            cursor.execute(
+                """DELETE FROM PilaVehiculos
+                   WHERE id_espacio_fila = ? AND id_vehiculo = ?""",
+                (fila.id_espacio_fila, id_vehiculo)
+            )
+            if posicion < fila.total:
+                cursor.execute(
+                    """UPDATE PilaVehiculos
+                       SET posicion = posicion - 1
+                       WHERE id_espacio_fila = ? AND posicion > ?""",
+                    (fila.id_espacio_fila, posicion)
+                )
+            cursor.execute(
+                "UPDATE Vehiculos SET hora_salida = GETDATE() WHERE id_vehiculo = ?",
+                (id_vehiculo,)
+            )
+            conn.commit()
+            return True
+
+        except Exception as error:
+            print(f"Error al sacar vehículo de fila: {str(error)}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+
+    def _guardar_extraccion(self, plan: PlanExtraccion, fila: PilaFila) -> bool:
+        """Persiste un plan de extracción con un número fijo de sentencias."""
+        if not self._persistir:
+            return True
+
+        retirados = [plan.id_vehiculo] + list(plan.reubicados)
+        totales = {}
+        nuevas_posiciones = []
+        for id_bloqueador, destino in plan.reubicados.items():
+            totales[destino] = totales.get(destino, self._filas[destino].total) + 1
+            nuevas_posiciones.append((destino, id_bloqueador, totales[destino]))
+
+        conn = None
+        try:
+            conn = get_conexion()
+            if not conn:
+                return False
+
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""DELETE FROM PilaVehiculos
+                   WHERE id_espacio_fila = ?
+                   AND id_vehiculo IN ({', '.join('?' * len(retirados))})""",
+                [plan.id_espacio_fila] + retirados
+            )
+            if plan.retornados:
+                cursor.execute(
+                    """UPDATE PilaVehiculos
+                       SET posicion = posicion - 1
+                       WHERE id_espacio_fila = ? AND posicion > ?""",
+                    (plan.id_espacio_fila, plan.posicion)
+                )
+                cursor.executemany(
+                    """INSERT INTO MovimientosTemporales
+                       (id_vehiculo, id_espacio_fila, posicion_origen, fecha_movimiento, fecha_retorno)
+                       VALUES (?, ?, ?, GETDATE(), GETDATE())""",
+                    [(id_bloqueador, plan.id_espacio_fila, fila.posicion(id_bloqueador))
+                     for id_bloqueador in plan.retornados]
+                )
+            if plan.reubicados:
+                cursor.executemany(
+                    """INSERT INTO PilaVehiculos
+                       (id_espacio_fila, id_vehiculo, posicion, fecha_entrada)
+                       SELECT ?, id_vehiculo, ?, COALESCE(hora_entrada, GETDATE())
+                       FROM Vehiculos
+                       WHERE id_vehiculo = ?""",
+                    [(id_espacio_fila, posicion, id_vehiculo)
+                     for id_espacio_fila, id_vehiculo, posicion in nuevas_posiciones]
+                )
+            cursor.execute(
+                "UPDATE Vehiculos SET hora_salida = GETDATE() WHERE id_vehiculo = ?",
+                (plan.id_vehiculo,)
+            )
+            conn.commit()
+            return True
+
+        except Exception as error:
+            print(f"Error al extraer vehículo: {str(error)}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+
+    def _espacios_temporales(self, cantidad: int, excluir: int) -> list:
+        """
+        Elige dónde apartar bloqueadores: espacios libres de otras filas
+        en orden de número de espacio, usando el índice de filas libres.
+
+        Args:
+            cantidad: Espacios necesarios
+            excluir: Fila que no puede usarse (la del vehículo a extraer)
+
+        Returns:
+            list: id_espacio_fila por espacio (None = fuera del parqueo), de largo cantidad
+        """
+        destinos = []
+        revisadas = []
+        while len(destinos) < cantidad and self._libres:
+            entrada = heapq.heappop(self._libres)
+            fila = self._filas.get(entrada[1])
+            if fila is None or fila.llena:
+                self._en_libres.discard(entrada[1])
+                continue
+            revisadas.append(entrada)
+            if entrada[1] != excluir:
+                destinos.extend([entrada[1]] * min(fila.libres, cantidad - len(destinos)))
+        for entrada in revisadas:
+            heapq.heappush(self._libres, entrada)
+        return destinos + [None] * (cantidad - len(destinos))
+
+    def _registrar_entrada(self, id_vehiculo: int, salida_estimada: float = None,
+                           entrada: float = None):
+        """Anota la entrada del vehículo (ahora, o la original si se da) y su salida declarada o estimada."""
+        if entrada is None:
+            entrada = self._reloj()
+        self._entradas[id_vehiculo] = entrada
+        if salida_estimada is None:
+            salida_estimada = entrada + self.estimador.estimar(id_vehiculo)
+        self._salidas[id_vehiculo] = salida_estimada
+
+    def _registrar_salida(self, id_vehiculo: int):
+        """Olvida la salida esperada del vehículo y enseña su estancia al estimador."""
+        self._salidas.pop(id_vehiculo, None)
+        entrada = self._entradas.pop(id_vehiculo, None)
+        if entrada is not None:
+            self.estimador.registrar(id_vehiculo, self._reloj() - entrada)
+
+    def _indexar(self, fila: PilaFila):
+        """
+        Actualiza la posición de la fila en los índices de filas libres
+        y de filas por salida más próxima.
+        """
+        anterior = self._clave_salida.pop(fila.id_espacio_fila, None)
+        if anterior is not None:
+            del self._por_salida[bisect.bisect_left(self._por_salida, anterior)]
+        if not fila.llena:
+            salida_minima = min((self._salidas.get(id_vehiculo, math.inf)
+                                 for id_vehiculo in fila.vehiculos), default=math.inf)
+            clave = (salida_minima, fila.numero_espacio, fila.id_espacio_fila)
+            bisect.insort(self._por_salida, clave)
+            self._clave_salida[fila.id_espacio_fila] = clave
+        self._marcar_libre(fila)
+
+    def _marcar_libre(self, fila: PilaFila):
+        """Agrega la fila al índice de filas libres si aún no está."""
+        if not fila.llena and fila.id_espacio_fila not in self._en_libres:
+            heapq.heappush(self._libres, (fila.numero_espacio, fila.id_espacio_fila))
+            self._en_libres.add(fila.id_espacio_fila)
+
+    def _instalar(self, filas: dict, entradas: dict):
+        """
+        Reemplaza el estado del motor por las filas dadas.
+
+        Args:
+            filas: PilaFila por id_espacio_fila, con sus vehículos
+            entradas: Hora de entrada (segundos epoch o None) por id_vehiculo
+        """
+        libres = [(fila.numero_espacio, fila.id_espacio_fila)
+                  for fila in filas.values() if not fila.llena]
+        heapq.heapify(libres)
+        if self.ocupacion is not None and not self.ocupacion.admite(
+                (fila.id_espacio_fila, fila.capacidad) for fila in filas.values()):
+            print(f"Error al habilitar el mapa de ocupación compartido: las filas no caben en "
+                  f"{self.ocupacion.filas_maximas} ranuras de {self.ocupacion.vehiculos_por_fila} "
+                  f"vehículos (ver PARQUEO_OCUPACION_FILAS y PARQUEO_OCUPACION_VEHICULOS)")
+            with self._lock:
+                self.ocupacion.cerrar()
+                self.ocupacion = None
+
+        with self._exclusivo():
+            # Las salidas declaradas sólo viven en memoria: se conservan
+            nuevas_entradas, salidas = {}, {}
+            ahora = self._reloj()
+            for id_vehiculo, entrada in entradas.items():
+                if id_vehiculo in self._salidas:
+                    nuevas_entradas[id_vehiculo] = self._entradas[id_vehiculo]
+                    salidas[id_vehiculo] = self._salidas[id_vehiculo]
+                else:
+                    entrada = ahora if entrada is None else entrada
+                    nuevas_entradas[id_vehiculo] = entrada
+                    salidas[id_vehiculo] = entrada + self.estimador.estimar(id_vehiculo)
+
+            self._filas = filas
+            self._ubicacion = {id_vehiculo: fila.id_espacio_fila
+                               for fila in filas.values() for id_vehiculo in fila.vehiculos}
+            self._libres = libres
+            self._en_libres = {id_fila for _, id_fila in libres}
+            self._entradas = nuevas_entradas
+            self._salidas = salidas
+            self._por_salida = []
+            self._clave_salida = {}
+            for fila in filas.values():
+                self._indexar(fila)
+            self._cargado = True
+            self._publicar(*filas.values())
+
+    def _restaurar_desde_bitacora(self) -> bool:
+        """
+        Reconstruye las pilas con el estado de la bitácora si coincide
+        exactamente con la base de datos: filas (número y capacidad), orden
+        de cada pila, lista de espera y salidas temporales pendientes.
+        Evita convertir las fechas de entrada de PilaVehiculos.
+
+        Returns:
+            bool: True si se restauró, False si no hay bitácora o no coincide
+        """
+        activa = bitacora.activa()
+        if activa is None or not activa.tiene_base:
+            return False
+        estado = activa.estado
+
+        conn = None
+        try:
+            conn = get_conexion()
+            if not conn:
+                return False
+
+            cursor = conn.cursor()
+            if not estado.coincide(self._estado_base_datos(cursor)):
+                print("La bitácora no coincide con la base de datos; se cargan las pilas completas")
+                return False
+
+        except Exception as error:
+            print(f"Error al restaurar pilas desde la bitácora: {str(error)}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+
+        filas = {}
+        for id_espacio_fila, (numero_espacio, capacidad) in estado.filas.items():
+            fila = filas[id_espacio_fila] = PilaFila(id_espacio_fila, numero_espacio, capacidad)
+            fila.vehiculos = list(estado.pilas.get(id_espacio_fila, []))
+        self._instalar(filas, {id_vehiculo: estado.entradas.get(id_vehiculo)
+                               for fila in filas.values() for id_vehiculo in fila.vehiculos})
+        self._avisar_liberacion()
+        return True
+
+    def _estado_bitacora(self, cursor) -> bitacora.EstadoParqueo:
+        """Arma el estado base de la bitácora con las pilas y la espera de la base de datos."""
+        estado = bitacora.EstadoParqueo()
+        with self._lock:
+            for fila in self._filas.values():
+                estado.filas[fila.id_espacio_fila] = (fila.numero_espacio, fila.capacidad)
+                estado.pilas[fila.id_espacio_fila] = list(fila.vehiculos)
+            estado.entradas = dict(self._entradas)
+        self._leer_pendientes(cursor, estado)
+        return estado
+
+    def _estado_base_datos(self, cursor) -> bitacora.EstadoParqueo:
+        """Lee de la base de datos las filas y pilas en orden, sin horas de entrada, y los pendientes."""
+        estado = bitacora.EstadoParqueo()
+        cursor.execute(
+            """SELECT id_espacio_fila, numero_espacio, capacidad
+               FROM EspaciosFila"""
+        )
+        for row in cursor.fetchall():
+            estado.filas[row[0]] = (row[1], row[2] or CAPACIDAD_FILA)
+        cursor.execute(
+            """SELECT id_espacio_fila, id_vehiculo
+               FROM PilaVehiculos
+               ORDER BY id_espacio_fila, posicion"""
+        )
+        for row in cursor.fetchall():
+            estado.pilas.setdefault(row[0], []).append(row[1])
+        self._leer_pendientes(cursor, estado)
+        return estado
+
+    def _leer_pendientes(self, cursor, estado: bitacora.EstadoParqueo):
+        """Completa el estado con la lista de espera y las salidas temporales pendientes."""
+        cursor.execute(
+            """SELECT id_espera, id_vehiculo
+               FROM ListaEspera
+               WHERE estado = 'pendiente'
+               ORDER BY fecha_solicitud, id_espera"""
+        )
+        estado.espera = {row[0]: row[1] for row in cursor.fetchall()}
+        cursor.execute(
+            """SELECT id_vehiculo, id_espacio_fila, posicion_origen
+               FROM MovimientosTemporales
+               WHERE fecha_retorno IS NULL"""
+        )
+        estado.temporales = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+    @contextmanager
+    def _exclusivo(self):
+        """
+        Sección crítica para modificar el motor. Con mapa compartido toma
+        además el bloqueo entre procesos y aplica los cambios de otros
+        procesos antes de decidir.
+        """
+        with self._lock:
+            if self.ocupacion is None:
+                yield
+                return
+            with self.ocupacion.bloqueo():
+                self._sincronizar()
+                yield
+
+    def _sincronizar(self):
+        """Aplica al motor las filas que otros procesos publicaron en el mapa compartido."""
+        if self.ocupacion is None or not self._cargado:
+            return
+        if self.ocupacion.generacion == self._generacion_vista:
+            return
+
+        with self._lock:
+            generacion, cambios = self.ocupacion.leer_cambios(self._versiones)
+            modificadas, quitados, agregados = [], set(), set()
+            for id_espacio_fila, (version, capacidad, vehiculos) in cambios.items():
+                self._versiones[id_espacio_fila] = version
+                fila = self._filas.get(id_espacio_fila)
+                if fila is None or (fila.vehiculos == vehiculos and fila.capacidad == capacidad):
+                    continue
+                quitados.update(id_vehiculo for id_vehiculo in fila.vehiculos if id_vehiculo not in vehiculos)
+                agregados.update(id_vehiculo for id_vehiculo in vehiculos if id_vehiculo not in fila.vehiculos)
+                fila.vehiculos = vehiculos
+                fila.capacidad = capacidad
+                modificadas.append(fila)
+
+            for id_vehiculo in quitados - agregados:
+                self._ubicacion.pop(id_vehiculo, None)
+                self._registrar_salida(id_vehiculo)
+            for fila in modificadas:
+                for id_vehiculo in fila.vehiculos:
+                    self._ubicacion[id_vehiculo] = fila.id_espacio_fila
+            for id_vehiculo in agregados - quitados:
+                if id_vehiculo not in self._salidas:
+                    self._registrar_entrada(id_vehiculo)
+            for fila in modificadas:
+                self._indexar(fila)
+            self._generacion_vista = generacion
+        if quitados - agregados:
+            self._avisar_liberacion()
+
+    def _publicar(self, *filas):
+        """Publica las pilas de las filas en el mapa compartido (dentro de _exclusivo)."""
+        if self.ocupacion is None or not self._persistir:
+            return
+        generacion = self.ocupacion.publicar(
+            (fila.id_espacio_fila, fila.capacidad, fila.vehiculos) for fila in filas)
+        for fila in filas:
+            self._versiones[fila.id_espacio_fila] = generacion
+        self._generacion_vista = generacion
+
+    def _anotar(self, *eventos):
+        """Registra eventos (tipo, id_vehiculo, id_espacio_fila, dato) en la bitácora."""
+        if self._persistir:
+            bitacora.registrar_eventos(eventos)
+
+    def _avisar_liberacion(self):
+        """Llama a los suscriptores de liberación al terminar la unidad de trabajo."""
+        for funcion in self._al_liberar:
+            ejecutar_al_terminar(funcion)
+
+    def _asegurar_cargado(self):
+        """Carga el estado desde la base de datos si aún no se hizo y aplica los cambios de otros procesos."""
+        if not self._cargado:
+            self.cargar()
+        elif self.ocupacion is not None:
+            self._sincronizar()
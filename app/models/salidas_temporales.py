@@ -3,7 +3,7 @@ Módulo para gestión de vehículos en estacionamientos en fila.
 Implementa pila LIFO para mover vehículos temporalmente.
 """
 from datetime import datetime
-from .base import ModeloBase, GestorBase
+from .base import ModeloBase, GestorBase, en_bloques, TAMANO_PAGINA
 from app.db_config import get_conexion
 
 class SalidaTemporal(ModeloBase): # Hereda de Clase padre ModeloBase
@@ -31,6 +31,14 @@ class SalidaTemporal(ModeloBase): # Hereda de Clase padre ModeloBase
     def posicion_origen(self) -> int:
         return self._posicion_origen
 
+    @property
+    def fecha_movimiento(self) -> datetime:
+        return self._fecha_movimiento
+
+    @property
+    def fecha_retorno(self) -> datetime:
+        return self._fecha_retorno
+
     @property
     def placa(self) -> str:
         return self._placa
@@ -199,7 +207,7 @@ class GestorSalidasTemporales(GestorBase):
         Obtiene los vehículos que están temporalmente fuera de su posición.
         """
         try:
-            conn = get_conexion()
+            conn = get_conexion(lectura=True)
             if not conn:
                 return []
 
@@ -221,3 +229,189 @@ class GestorSalidasTemporales(GestorBase):
         finally:
             if conn:
                 conn.close()
+
+    def retornar_pendientes(self, ids_espacio_fila: list = None) -> int:
+        """
+        Retorna a sus filas todos los vehículos con salida temporal pendiente
+        usando sentencias por conjuntos en una sola transacción: un INSERT
+        que re-apila los vehículos (primero la posición de origen más baja,
+        con su hora de entrada original) y un UPDATE que registra el retorno.
+        
+        Un vehículo no se retorna si ya está estacionado en otra fila o si
+        su fila no tiene espacio; su movimiento queda pendiente.
+        
+        Args:
+            ids_espacio_fila: Filas a retornar (None = todas las filas)
+            
+        Returns:
+            int: Cantidad de vehículos retornados
+        """
+        if ids_espacio_fila is not None and not ids_espacio_fila:
+            return 0
+
+        try:
+            conn = get_conexion()
+            if not conn:
+                return 0
+
+            cursor = conn.cursor()
+            retornados = 0
+            bloques = en_bloques(list(ids_espacio_fila)) if ids_espacio_fila else [([], None)]
+            for bloque, marcadores in bloques:
+                filtro = f"AND mt.id_espacio_fila IN ({marcadores})" if marcadores else ""
+                cursor.execute(
+                    f"""WITH candidatos AS (
+                           SELECT mt.id_espacio_fila, mt.id_vehiculo, ef.capacidad, v.hora_entrada,
+                                  COALESCE((SELECT MAX(pv.posicion) FROM PilaVehiculos pv
+                                            WHERE pv.id_espacio_fila = mt.id_espacio_fila), 0)
+                                  + ROW_NUMBER() OVER (PARTITION BY mt.id_espacio_fila
+                                                       ORDER BY mt.posicion_origen, mt.id_movimiento) AS posicion
+                           FROM MovimientosTemporales mt
+                           JOIN EspaciosFila ef ON mt.id_espacio_fila = ef.id_espacio_fila
+                           LEFT JOIN Vehiculos v ON mt.id_vehiculo = v.id_vehiculo
+                           WHERE mt.fecha_retorno IS NULL {filtro}
+                           AND NOT EXISTS (SELECT 1 FROM PilaVehiculos pv
+                                           WHERE pv.id_vehiculo = mt.id_vehiculo)
+                       )
+                       INSERT INTO PilaVehiculos (id_espacio_fila, id_vehiculo, posicion, fecha_entrada)
+                       SELECT id_espacio_fila, id_vehiculo, posicion, COALESCE(hora_entrada, GETDATE())
+                       FROM candidatos
+                       WHERE posicion <= capacidad""",
+                    bloque
+                )
+                cursor.execute(
+                    f"""UPDATE MovimientosTemporales
+                       SET fecha_retorno = GETDATE()
+                       WHERE fecha_retorno IS NULL {filtro.replace('mt.', '')}
+                       AND EXISTS (SELECT 1 FROM PilaVehiculos pv
+                                   WHERE pv.id_vehiculo = MovimientosTemporales.id_vehiculo
+                                   AND pv.id_espacio_fila = MovimientosTemporales.id_espacio_fila)""",
+                    bloque
+                )
+                retornados += cursor.rowcount
+            conn.commit()
+            return retornados
+        except Exception as error:
+            print(f"Error al retornar vehículos: {str(error)}")
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+    def archivar_retornados(self, antes_de: datetime, limite: int) -> int:
+        """
+        Mueve a MovimientosTemporalesHistorico los movimientos retornados
+        antes de una fecha, los más antiguos primero, para que
+        MovimientosTemporales sólo conserve los pendientes y los recientes.
+        
+        Args:
+            antes_de: Fecha de retorno límite (exclusiva)
+            limite: Movimientos máximos a mover en esta llamada
+            
+        Returns:
+            int: Cantidad de movimientos archivados
+        """
+        try:
+            conn = get_conexion()
+            if not conn:
+                return 0
+
+            cursor = conn.cursor()
+            cursor.execute(self.backend.limitar(
+                """SELECT id_movimiento FROM MovimientosTemporales
+                   WHERE fecha_retorno IS NOT NULL AND fecha_retorno < ?
+                   ORDER BY id_movimiento""", limite),
+                (antes_de,)
+            )
+            ids = cursor.fetchall()
+            if not ids:
+                return 0
+
+            # El lote queda delimitado por su último ID: copia y borrado usan el mismo filtro
+            filtro = """WHERE fecha_retorno IS NOT NULL AND fecha_retorno < ?
+                        AND id_movimiento <= ?"""
+            parametros = (antes_de, ids[-1][0])
+            cursor.execute(
+                f"""INSERT INTO MovimientosTemporalesHistorico
+                       (id_movimiento, id_vehiculo, id_espacio_fila, posicion_origen,
+                        fecha_movimiento, fecha_retorno)
+                   SELECT id_movimiento, id_vehiculo, id_espacio_fila, posicion_origen,
+                          fecha_movimiento, fecha_retorno
+                   FROM MovimientosTemporales {filtro}""",
+                parametros
+            )
+            cursor.execute(f"DELETE FROM MovimientosTemporales {filtro}", parametros)
+            archivados = cursor.rowcount
+            conn.commit()
+            return archivados
+        except Exception as error:
+            print(f"Error al archivar movimientos temporales: {str(error)}")
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+    def obtener_historial(self, id_vehiculo: int = None, desde: datetime = None,
+                          hasta: datetime = None, limite: int = TAMANO_PAGINA) -> list[SalidaTemporal]:
+        """
+        Obtiene los movimientos retornados, estén todavía en
+        MovimientosTemporales o ya archivados, del más reciente al más antiguo.
+        
+        Args:
+            id_vehiculo: Filtra por vehículo (opcional)
+            desde: Fecha de movimiento mínima (opcional)
+            hasta: Fecha de movimiento máxima, exclusiva (opcional)
+            limite: Registros máximos (máximo TAMANO_PAGINA_MAXIMO)
+            
+        Returns:
+            list[SalidaTemporal]: Movimientos con la placa del vehículo
+        """
+        try:
+            conn = get_conexion(lectura=True)
+            if not conn:
+                return []
+
+            condiciones, parametros = [], []
+            if id_vehiculo is not None:
+                condiciones.append("h.id_vehiculo = ?")
+                parametros.append(id_vehiculo)
+            if desde is not None:
+                condiciones.append("h.fecha_movimiento >= ?")
+                parametros.append(desde)
+            if hasta is not None:
+                condiciones.append("h.fecha_movimiento < ?")
+                parametros.append(hasta)
+            donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+            cursor = conn.cursor()
+            cursor.execute(
+                self.backend.limitar(
+                    f"""SELECT h.id_movimiento, h.id_vehiculo, h.id_espacio_fila, h.posicion_origen,
+                          h.fecha_movimiento, h.fecha_retorno, v.placa
+                   FROM (SELECT id_movimiento, id_vehiculo, id_espacio_fila, posicion_origen,
+                                fecha_movimiento, fecha_retorno
+                         FROM MovimientosTemporales WHERE fecha_retorno IS NOT NULL
+                         UNION ALL
+                         SELECT id_movimiento, id_vehiculo, id_espacio_fila, posicion_origen,
+                                fecha_movimiento, fecha_retorno
+                         FROM MovimientosTemporalesHistorico) h
+                   LEFT JOIN Vehiculos v ON h.id_vehiculo = v.id_vehiculo
+                   {donde}
+                   ORDER BY h.fecha_movimiento DESC, h.id_movimiento DESC""", self._limite_pagina(limite)),
+                parametros
+            )
+            movimientos = []
+            for row in cursor.fetchall():
+                movimiento = SalidaTemporal(row[1], row[2], row[3])
+                movimiento._id = row[0]
+                movimiento._fecha_movimiento = row[4]
+                movimiento._fecha_retorno = row[5]
+                movimiento._placa = row[6]
+                movimientos.append(movimiento)
+            return movimientos
+        except Exception as error:
+            print(f"Error al obtener historial de movimientos temporales: {str(error)}")
+            return []
+        finally:
+            if conn:
+                conn.close()
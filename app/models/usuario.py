@@ -2,7 +2,7 @@
 Módulo para la gestión de usuarios.
 Contiene la clase Usuario y su gestor para operaciones con la base de datos.
 """
-from .base import ModeloBase, GestorBase
+from .base import ModeloBase, GestorBase, Pagina, TAMANO_PAGINA
 from app.db_config import get_conexion
 
 class Usuario(ModeloBase): # Hereda de Clase padre ModeloBase
@@ -151,7 +151,7 @@ class GestorUsuarios(GestorBase):
             list[Usuario]: Lista de objetos Usuario
         """
         try:
-            conn = get_conexion()
+            conn = get_conexion(lectura=True)
             if not conn:
                 return []
                 
@@ -180,6 +180,63 @@ class GestorUsuarios(GestorBase):
             if conn:
                 conn.close()
 
+    def obtener_pagina(self, limite: int = TAMANO_PAGINA, despues_de: int = None,
+                       buscar: str = None) -> Pagina:
+        """
+        Obtiene una página de usuarios ordenados por ID usando paginación
+        por clave, por lo que su costo no depende del tamaño de la tabla.
+        
+        Args:
+            limite: Usuarios por página (máximo TAMANO_PAGINA_MAXIMO)
+            despues_de: ID del último usuario de la página anterior (opcional)
+            buscar: Cédula exacta o inicio del nombre (opcional)
+            
+        Returns:
+            Pagina: Usuarios de la página y clave de la página siguiente
+        """
+        limite = self._limite_pagina(limite)
+        try:
+            conn = get_conexion(lectura=True)
+            if not conn:
+                return Pagina([], None, limite)
+
+            condiciones, parametros = [], []
+            if despues_de is not None:
+                condiciones.append("id_usuario > ?")
+                parametros.append(despues_de)
+            if buscar:
+                condiciones.append("(cedula = ? OR nombre LIKE ? ESCAPE '!')")
+                parametros.extend([buscar, self._patron_prefijo(buscar)])
+            donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+            cursor = conn.cursor()
+            cursor.execute(
+                self.backend.limitar(
+                    f"""SELECT id_usuario, cedula, nombre, telefono, email
+                   FROM Usuarios {donde}
+                   ORDER BY id_usuario""", limite + 1),
+                parametros
+            )
+            return self._armar_pagina(cursor.fetchall(), limite, self._usuario_desde_fila)
+            
+        except Exception as error:
+            print(f"Error al obtener página de usuarios: {str(error)}")
+            return Pagina([], None, limite)
+        finally:
+            if conn:
+                conn.close()
+
+    def _usuario_desde_fila(self, fila) -> Usuario:
+        """Crea un Usuario a partir de una fila (id_usuario, cedula, nombre, telefono, email)."""
+        usuario = Usuario(
+            cedula=fila[1],
+            nombre=fila[2],
+            telefono=fila[3],
+            email=fila[4]
+        )
+        usuario._id = fila[0]
+        return usuario
+
     def actualizar(self, usuario: Usuario) -> bool:
         """
         Actualiza los datos de un usuario existente.
@@ -252,7 +309,7 @@ class GestorUsuarios(GestorBase):
             int: Número total de usuarios
         """
         try:
-            conn = get_conexion()
+            conn = get_conexion(lectura=True)
             if not conn:
                 return 0
                 
@@ -3,7 +3,7 @@ Módulo para la gestión de vehículos.
 Contiene la clase Vehículo y su gestor para operaciones con la base de datos.
 """
 from datetime import datetime
-from .base import ModeloBase, GestorBase
+from .base import ModeloBase, GestorBase, Pagina, TAMANO_PAGINA
 from app.db_config import get_conexion
 
 class Vehiculo(ModeloBase): # Hereda de Clase padre ModeloBase
@@ -161,7 +161,7 @@ class GestorVehiculos(GestorBase):
             list[Vehiculo]: Lista de vehículos
         """
         try:
-            conn = get_conexion()
+            conn = get_conexion(lectura=True)
             if not conn:
                 return []
                 
@@ -191,6 +191,68 @@ class GestorVehiculos(GestorBase):
             if conn:
                 conn.close()
 
+    def obtener_pagina(self, limite: int = TAMANO_PAGINA, despues_de: int = None,
+                       id_usuario: int = None, placa: str = None) -> Pagina:
+        """
+        Obtiene una página de vehículos ordenados por ID usando paginación
+        por clave, por lo que su costo no depende del tamaño de la tabla.
+        
+        Args:
+            limite: Vehículos por página (máximo TAMANO_PAGINA_MAXIMO)
+            despues_de: ID del último vehículo de la página anterior (opcional)
+            id_usuario: Filtra por propietario (opcional)
+            placa: Filtra por inicio de la placa (opcional)
+            
+        Returns:
+            Pagina: Vehículos de la página y clave de la página siguiente
+        """
+        limite = self._limite_pagina(limite)
+        try:
+            conn = get_conexion(lectura=True)
+            if not conn:
+                return Pagina([], None, limite)
+
+            condiciones, parametros = [], []
+            if despues_de is not None:
+                condiciones.append("v.id_vehiculo > ?")
+                parametros.append(despues_de)
+            if id_usuario is not None:
+                condiciones.append("v.id_usuario = ?")
+                parametros.append(id_usuario)
+            if placa:
+                condiciones.append("v.placa LIKE ? ESCAPE '!'")
+                parametros.append(self._patron_prefijo(placa))
+            donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+            cursor = conn.cursor()
+            cursor.execute(
+                self.backend.limitar(
+                    f"""SELECT v.id_vehiculo, v.placa, v.marca, v.modelo, 
+               v.id_usuario, v.hora_entrada, v.hora_salida, u.nombre 
+               FROM Vehiculos v 
+               JOIN Usuarios u ON v.id_usuario = u.id_usuario
+               {donde}
+               ORDER BY v.id_vehiculo""", limite + 1),
+                parametros
+            )
+            return self._armar_pagina(cursor.fetchall(), limite, self._vehiculo_desde_fila)
+            
+        except Exception as error:
+            print(f"Error al obtener página de vehículos: {str(error)}")
+            return Pagina([], None, limite)
+        finally:
+            if conn:
+                conn.close()
+
+    def _vehiculo_desde_fila(self, row) -> Vehiculo:
+        """Crea un Vehiculo con el nombre del propietario a partir de una fila."""
+        vehiculo = Vehiculo(row[1], row[2], row[3], row[4])
+        vehiculo._id = row[0]
+        vehiculo._hora_entrada = row[5]
+        vehiculo._hora_salida = row[6]
+        vehiculo.propietario = row[7]  # Nombre del propietario
+        return vehiculo
+
     def actualizar(self, vehiculo: Vehiculo) -> bool:
         """
         Actualiza los datos de un vehículo existente.
@@ -264,7 +326,7 @@ class GestorVehiculos(GestorBase):
             int: Número total de vehículos
         """
         try:
-            conn = get_conexion()
+            conn = get_conexion(lectura=True)
             if not conn:
                 return 0
                 
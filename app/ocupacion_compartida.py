@@ -0,0 +1,335 @@
+"""
+Módulo del mapa de ocupación compartido entre procesos.
+Cuando la aplicación corre con varios procesos (por ejemplo, workers de
+gunicorn), cada uno tiene su propio motor de pilas. Este módulo publica las
+pilas de cada EspaciosFila en un bloque de memoria compartida con formato
+fijo, de modo que el proceso que estaciona o saca un vehículo lo publica y
+los demás actualizan su motor desde memoria, sin consultar la base de datos.
+
+Las escrituras se serializan con un bloqueo de archivo entre procesos. Las
+lecturas no toman el bloqueo: usan la generación de la cabecera como
+seqlock (impar mientras se escribe) y se repiten, con esperas crecientes,
+si cambió durante la lectura; si nunca logran una lectura estable toman el
+bloqueo y leen con los escritores detenidos.
+
+Cada ranura tiene lugar para un número fijo de vehículos, elegido por el
+proceso que crea el bloque. El motor de pilas no habilita el mapa si alguna
+fila tiene más capacidad que eso o si hay más filas que ranuras.
+
+Formato del bloque:
+    Cabecera de 24 bytes: magia, versión, vehículos por fila, filas usadas,
+    filas máximas y generación. Luego una ranura por fila: id_espacio_fila,
+    versión (generación de su última escritura), capacidad, total y los
+    IDs de sus vehículos del fondo al tope.
+
+Cada condominio usa su propio bloque: el nombre configurado seguido de
+'-<clave>' (el predeterminado usa el nombre tal cual).
+
+Variables de entorno:
+    PARQUEO_OCUPACION_COMPARTIDA: Nombre del bloque (sin definir = deshabilitado)
+    PARQUEO_OCUPACION_FILAS: Filas máximas del bloque (por defecto 4096)
+    PARQUEO_OCUPACION_VEHICULOS: Vehículos por ranura, al menos la mayor
+        capacidad de EspaciosFila (por defecto 8)
+"""
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from app import condominios
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+VERSION = 1
+MAGIA = b'PQOC'
+FILAS_MAXIMAS = 4096
+VEHICULOS_POR_FILA = 8
+INTENTOS_LECTURA = 10
+ESPERA_LECTURA = 0.0001  # Segundos antes del segundo intento; se duplica en cada uno
+
+CABECERA = struct.Struct('<4sHHIIQ')  # magia, versión, vehículos por fila, filas usadas, máximas, generación
+GENERACION = struct.Struct('<Q')
+POSICION_GENERACION = 16
+USADAS = struct.Struct('<I')
+POSICION_USADAS = 8
+RANURA = struct.Struct('<IIHH')  # id_espacio_fila, versión, capacidad, total
+
+
+class BloqueoProcesos:
+    """
+    Bloqueo exclusivo entre procesos sobre un archivo, reentrante dentro
+    del proceso (fcntl.flock en POSIX, msvcrt.locking en Windows).
+
+    Atributos:
+        ruta (str): Archivo de bloqueo
+        _lock (threading.RLock): Serializa los hilos del proceso
+        _profundidad (int): Adquisiciones anidadas del hilo dueño
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._archivo = open(ruta, 'a+b')
+        self._lock = threading.RLock()
+        self._profundidad = 0
+
+    def adquirir(self):
+        """Toma el bloqueo, esperando a que otro proceso lo libere."""
+        self._lock.acquire()
+        if self._profundidad == 0:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self._archivo.fileno(), fcntl.LOCK_EX)
+                else:
+                    self._archivo.seek(0)
+                    msvcrt.locking(self._archivo.fileno(), msvcrt.LK_LOCK, 1)
+            except OSError:
+                self._lock.release()
+                raise
+        self._profundidad += 1
+
+    def liberar(self):
+        """Suelta el bloqueo tomado con adquirir()."""
+        self._profundidad -= 1
+        if self._profundidad == 0:
+            if fcntl is not None:
+                fcntl.flock(self._archivo.fileno(), fcntl.LOCK_UN)
+            else:
+                self._archivo.seek(0)
+                msvcrt.locking(self._archivo.fileno(), msvcrt.LK_UNLCK, 1)
+        self._lock.release()
+
+    def __enter__(self):
+        self.adquirir()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.liberar()
+
+
+class OcupacionCompartida:
+    """
+    Pilas de todas las filas en memoria compartida entre procesos.
+
+    Atributos:
+        nombre (str): Nombre del bloque de memoria compartida
+        filas_maximas (int): Ranuras disponibles
+        vehiculos_por_fila (int): Vehículos que caben en cada ranura
+        _memoria (SharedMemory): Bloque compartido
+        _bloqueo (BloqueoProcesos): Bloqueo de escritura entre procesos
+        _ranuras (dict): Índice de ranura por id_espacio_fila (caché local)
+    """
+
+    def __init__(self, nombre: str, filas_maximas: int = FILAS_MAXIMAS,
+                 vehiculos_por_fila: int = VEHICULOS_POR_FILA):
+        """
+        Abre el bloque compartido o lo crea si ningún proceso lo creó aún.
+
+        Args:
+            nombre: Nombre del bloque de memoria compartida
+            filas_maximas: Filas máximas si hay que crearlo (por defecto 4096)
+            vehiculos_por_fila: Vehículos por ranura si hay que crearlo (por defecto 8)
+
+        Raises:
+            ValueError: Si el bloque existente tiene otro formato
+        """
+        self.nombre = nombre
+        self._bloqueo = BloqueoProcesos(os.path.join(tempfile.gettempdir(), f"{nombre}.lock"))
+        self._ranuras = {}
+        with self._bloqueo:
+            tamano = CABECERA.size + filas_maximas * (RANURA.size + 4 * vehiculos_por_fila)
+            try:
+                self._memoria = self._abrir_memoria(nombre, True, tamano)
+                CABECERA.pack_into(self._memoria.buf, 0, MAGIA, VERSION, vehiculos_por_fila,
+                                   0, filas_maximas, 0)
+            except FileExistsError:
+                self._memoria = self._abrir_memoria(nombre, False, 0)
+            magia, version, vehiculos_por_fila, _, filas_maximas, _ = CABECERA.unpack_from(self._memoria.buf)
+            if magia != MAGIA or version != VERSION:
+                self._memoria.close()
+                raise ValueError(f"El bloque compartido {nombre} no es un mapa de ocupación")
+        self.filas_maximas = filas_maximas
+        self.vehiculos_por_fila = vehiculos_por_fila
+        self._ranura = struct.Struct(f'<IIHH{vehiculos_por_fila}I')
+
+    @classmethod
+    def desde_entorno(cls, clave_condominio: str = None):
+        """
+        Abre el mapa compartido según las variables de entorno.
+
+        Args:
+            clave_condominio: Condominio dueño (por defecto el predeterminado)
+
+        Returns:
+            OcupacionCompartida: Mapa abierto o None si está deshabilitado o no se pudo abrir
+        """
+        nombre = os.environ.get('PARQUEO_OCUPACION_COMPARTIDA')
+        if not nombre:
+            return None
+        if clave_condominio and clave_condominio != condominios.predeterminado:
+            nombre = f"{nombre}-{clave_condominio}"
+        try:
+            return cls(nombre, int(os.environ.get('PARQUEO_OCUPACION_FILAS', FILAS_MAXIMAS)),
+                       int(os.environ.get('PARQUEO_OCUPACION_VEHICULOS', VEHICULOS_POR_FILA)))
+        except (OSError, ValueError) as error:
+            print(f"Error al abrir el mapa de ocupación compartido: {str(error)}")
+            return None
+
+    @property
+    def generacion(self) -> int:
+        """Devuelve la generación actual; cambia con cada escritura de cualquier proceso."""
+        return GENERACION.unpack_from(self._memoria.buf, POSICION_GENERACION)[0]
+
+    @contextmanager
+    def bloqueo(self):
+        """Bloqueo exclusivo entre procesos para leer, decidir y publicar sin carreras."""
+        with self._bloqueo:
+            yield self
+
+    def admite(self, filas) -> bool:
+        """
+        Indica si las filas caben en el bloque: cada capacidad en una
+        ranura y todas las filas en las ranuras disponibles.
+
+        Args:
+            filas: Iterable de (id_espacio_fila, capacidad)
+
+        Returns:
+            bool: True si se pueden publicar todas
+        """
+        filas = list(filas)
+        return (len(filas) <= self.filas_maximas
+                and all(capacidad <= self.vehiculos_por_fila for _, capacidad in filas))
+
+    def publicar(self, filas) -> int:
+        """
+        Escribe las pilas de algunas filas. Las filas nuevas ocupan la
+        siguiente ranura libre.
+
+        Args:
+            filas: Iterable de (id_espacio_fila, capacidad, vehiculos)
+
+        Returns:
+            int: Generación resultante de la escritura
+
+        Raises:
+            ValueError: Si una pila no cabe en su ranura o no quedan ranuras
+                (antes de escribir nada)
+        """
+        filas = list(filas)
+        buf = self._memoria.buf
+        with self._bloqueo:
+            for id_espacio_fila, _, vehiculos in filas:
+                if len(vehiculos) > self.vehiculos_por_fila:
+                    raise ValueError(f"La fila {id_espacio_fila} tiene {len(vehiculos)} vehículos "
+                                     f"y la ranura admite {self.vehiculos_por_fila}")
+            indices = [self._ranura_de(id_espacio_fila, crear=True) for id_espacio_fila, _, _ in filas]
+            if None in indices:
+                raise ValueError(f"No quedan ranuras libres en el mapa de ocupación ({self.filas_maximas})")
+
+            generacion = self.generacion + 1
+            GENERACION.pack_into(buf, POSICION_GENERACION, generacion)  # impar: escribiendo
+            version = generacion + 1
+            for indice, (id_espacio_fila, capacidad, vehiculos) in zip(indices, filas):
+                relleno = list(vehiculos) + [0] * (self.vehiculos_por_fila - len(vehiculos))
+                self._ranura.pack_into(buf, self._posicion(indice), id_espacio_fila, version,
+                                       capacidad, len(vehiculos), *relleno)
+            GENERACION.pack_into(buf, POSICION_GENERACION, version)
+            return version
+
+    def leer_cambios(self, versiones: dict) -> tuple:
+        """
+        Lee las filas cuya versión difiere de la conocida por el proceso.
+        Sin bloqueo mientras la lectura resulte estable; si los escritores la
+        interrumpen en todos los intentos, lee con el bloqueo tomado.
+
+        Args:
+            versiones: Versión conocida por id_espacio_fila
+
+        Returns:
+            tuple: (generación leída, dict id_espacio_fila -> (versión, capacidad, vehiculos))
+        """
+        espera = ESPERA_LECTURA
+        for intento in range(INTENTOS_LECTURA):
+            if intento:
+                time.sleep(espera)
+                espera *= 2
+            generacion = self.generacion
+            if generacion % 2:
+                continue
+            cambios = self._leer(versiones)
+            if self.generacion == generacion:
+                return generacion, cambios
+        with self._bloqueo:
+            return self.generacion, self._leer(versiones)
+
+    def espacios_libres(self) -> int:
+        """Devuelve el total de espacios libres de todas las filas publicadas."""
+        _, filas = self.leer_cambios({})
+        return sum(capacidad - len(vehiculos) for _, capacidad, vehiculos in filas.values())
+
+    def cerrar(self):
+        """Desconecta el proceso del bloque compartido sin destruirlo."""
+        self._memoria.close()
+
+    def destruir(self):
+        """Elimina el bloque compartido (cuando ningún proceso lo usa)."""
+        self._memoria.close()
+        if getattr(self._memoria, '_desregistrada', False):
+            # unlink() lo quita del resource_tracker: se vuelve a registrar antes
+            from multiprocessing import resource_tracker
+            resource_tracker.register(self._memoria._name, 'shared_memory')
+        self._memoria.unlink()
+
+    def _leer(self, versiones: dict) -> dict:
+        """Lee las ranuras cuya versión difiere de la conocida (sin verificar la generación)."""
+        buf = self._memoria.buf
+        usadas = USADAS.unpack_from(buf, POSICION_USADAS)[0]
+        cambios = {}
+        for indice in range(usadas):
+            posicion = self._posicion(indice)
+            id_espacio_fila, version = RANURA.unpack_from(buf, posicion)[:2]
+            if versiones.get(id_espacio_fila) != version:
+                valores = self._ranura.unpack_from(buf, posicion)
+                cambios[id_espacio_fila] = (version, valores[2], list(valores[4:4 + valores[3]]))
+        return cambios
+
+    def _ranura_de(self, id_espacio_fila: int, crear: bool = False) -> int:
+        """Devuelve la ranura de una fila, asignándole una nueva si crear=True."""
+        indice = self._ranuras.get(id_espacio_fila)
+        buf = self._memoria.buf
+        if indice is not None and RANURA.unpack_from(buf, self._posicion(indice))[0] == id_espacio_fila:
+            return indice
+
+        usadas = USADAS.unpack_from(buf, POSICION_USADAS)[0]
+        self._ranuras = {RANURA.unpack_from(buf, self._posicion(i))[0]: i for i in range(usadas)}
+        indice = self._ranuras.get(id_espacio_fila)
+        if indice is None and crear and usadas < self.filas_maximas:
+            indice = self._ranuras[id_espacio_fila] = usadas
+            USADAS.pack_into(buf, POSICION_USADAS, usadas + 1)
+        return indice
+
+    def _posicion(self, indice: int) -> int:
+        """Devuelve el desplazamiento en bytes de una ranura."""
+        return CABECERA.size + indice * self._ranura.size
+
+    @staticmethod
+    def _abrir_memoria(nombre: str, crear: bool, tamano: int) -> shared_memory.SharedMemory:
+        """
+        Abre el bloque sin que el resource_tracker lo elimine cuando el
+        proceso termina: el bloque debe sobrevivir a cada worker.
+        """
+        try:
+            return shared_memory.SharedMemory(nombre, create=crear, size=tamano, track=False)
+        except TypeError:  # Python < 3.13
+            memoria = shared_memory.SharedMemory(nombre, create=crear, size=tamano)
+            if os.name == 'posix':
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(memoria._name, 'shared_memory')
+                memoria._desregistrada = True
+            return memoria
@@ -0,0 +1,280 @@
+"""
+Módulo de perfilado de solicitudes bajo demanda.
+Cuando está habilitado, ejecuta algunas solicitudes bajo cProfile (las que
+traen la cabecera de perfilado o las elegidas por muestreo) y guarda por
+ruta un archivo .prof (pstats) y un .folded con pilas colapsadas, el
+formato que aceptan flamegraph.pl y speedscope. Se perfila una solicitud a
+la vez por proceso; las simultáneas se atienden sin perfil, y una falla del
+perfilado nunca hace fallar la solicitud. Deshabilitado no registra ningún
+hook en Flask, por lo que no agrega costo a las solicitudes.
+
+Variables de entorno:
+    PARQUEO_PERFILADO: '1' para habilitarlo (por defecto deshabilitado)
+    PARQUEO_PERFILADO_CLAVE: Valor que debe traer la cabecera (obligatorio:
+        sin él el perfilado no se habilita)
+    PARQUEO_PERFILADO_MUESTREO: Fracción de solicitudes a perfilar (por defecto 0)
+    PARQUEO_PERFILADO_CABECERA: Cabecera que pide perfilar (por defecto X-Perfilar)
+    PARQUEO_PERFILADO_DIRECTORIO: Carpeta de salida (por defecto <tmp>/parqueo_perfiles)
+
+Uso:
+    curl -H 'X-Perfilar: <clave>' http://localhost:5000/
+    python -m app.perfilado <tmp>/parqueo_perfiles/mostrar_dashboard --top 30
+"""
+import argparse
+import cProfile
+import hmac
+import os
+import pstats
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+MAX_PERFILES_POR_RUTA = 50
+INTERVALO_MUESTREO_PILAS = 0.001  # Segundos entre muestras de la pila del hilo
+
+_perfil_actual = ContextVar('perfil_solicitud', default=None)
+# Desde Python 3.12 cProfile admite un solo perfilador activo por proceso
+_perfil_en_curso = threading.Lock()
+
+
+class MuestreadorPilas(threading.Thread):
+    """
+    Hilo que toma muestras periódicas de la pila de otro hilo para armar
+    un flamegraph, algo que cProfile no registra.
+
+    Atributos:
+        id_hilo (int): Identificador del hilo muestreado
+        intervalo (float): Segundos entre muestras
+        pilas (Counter): Muestras por pila colapsada 'f1;f2;...'
+    """
+
+    def __init__(self, id_hilo: int, intervalo: float = INTERVALO_MUESTREO_PILAS):
+        super().__init__(name='muestreador-pilas', daemon=True)
+        self.id_hilo = id_hilo
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self._detener = threading.Event()
+
+    def run(self):
+        while not self._detener.wait(self.intervalo):
+            marco = sys._current_frames().get(self.id_hilo)
+            marcos = []
+            while marco is not None:
+                codigo = marco.f_code
+                marcos.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+                marco = marco.f_back
+            if marcos:
+                self.pilas[';'.join(reversed(marcos))] += 1
+
+    def detener(self):
+        """Detiene el muestreo y espera a que el hilo termine."""
+        self._detener.set()
+        self.join()
+
+
+class PerfilSolicitud:
+    """
+    Perfil en curso de una solicitud. Sólo uno a la vez por proceso: las
+    solicitudes que lleguen mientras tanto no se perfilan.
+
+    Atributos:
+        ruta (str): Endpoint de Flask perfilado
+        base (str): Ruta de los archivos de salida sin extensión
+        perfil (cProfile.Profile): Perfilador determinista
+        muestreador (MuestreadorPilas): Muestreador de pilas para el flamegraph
+    """
+
+    def __init__(self, ruta: str, base: str):
+        self.ruta = ruta
+        self.base = base
+        self.perfil = cProfile.Profile()
+        self.muestreador = MuestreadorPilas(threading.get_ident())
+
+    def iniciar(self) -> bool:
+        """
+        Arranca el perfilador y el muestreo si no hay otro perfil en curso.
+
+        Returns:
+            bool: True si quedó en curso (entonces debe llamarse terminar())
+        """
+        if not _perfil_en_curso.acquire(blocking=False):
+            return False
+        activo = False
+        try:
+            self.perfil.enable()
+            activo = True
+            self.muestreador.start()
+            return True
+        except Exception as error:
+            print(f"Error al iniciar perfil de solicitud: {str(error)}")
+            if activo:
+                self.perfil.disable()
+            _perfil_en_curso.release()
+            return False
+
+    def terminar(self):
+        """Detiene ambos perfiladores y escribe los archivos .prof y .folded."""
+        try:
+            self.perfil.disable()
+            self.muestreador.detener()
+        finally:
+            _perfil_en_curso.release()
+        self.perfil.dump_stats(self.base + '.prof')
+        with open(self.base + '.folded', 'w', encoding='utf-8') as archivo:
+            for pila, muestras in self.muestreador.pilas.items():
+                archivo.write(f"{pila} {muestras}\n")
+
+
+class PerfiladorSolicitudes:
+    """
+    Perfilador de solicitudes de Flask activado por cabecera o muestreo.
+
+    Atributos:
+        directorio (str): Carpeta donde se guardan los perfiles, una subcarpeta por ruta
+        muestreo (float): Fracción de solicitudes perfiladas sin cabecera (0 a 1)
+        cabecera (str): Cabecera HTTP que pide perfilar la solicitud
+        clave (str): Valor requerido en la cabecera (None = la cabecera se ignora)
+        maximo_por_ruta (int): Perfiles que se conservan por ruta
+    """
+
+    def __init__(self, directorio: str, muestreo: float = 0.0, cabecera: str = 'X-Perfilar',
+                 clave: str = None, maximo_por_ruta: int = MAX_PERFILES_POR_RUTA):
+        """
+        Inicializa el perfilador.
+
+        Args:
+            directorio: Carpeta de salida
+            muestreo: Fracción de solicitudes a perfilar (por defecto 0)
+            cabecera: Cabecera que pide perfilar (por defecto X-Perfilar)
+            clave: Valor que debe traer la cabecera (sin clave sólo se perfila por muestreo)
+            maximo_por_ruta: Perfiles que se conservan por ruta (por defecto 50)
+        """
+        self.directorio = directorio
+        self.muestreo = muestreo
+        self.cabecera = cabecera
+        self.clave = clave
+        self.maximo_por_ruta = maximo_por_ruta
+        self._lock = threading.Lock()
+
+    @classmethod
+    def desde_entorno(cls):
+        """
+        Crea el perfilador según las variables de entorno.
+
+        Returns:
+            PerfiladorSolicitudes: Perfilador configurado o None si está
+                deshabilitado o no tiene clave
+        """
+        if os.environ.get('PARQUEO_PERFILADO', '0') != '1':
+            return None
+        if not os.environ.get('PARQUEO_PERFILADO_CLAVE'):
+            print("Error al habilitar el perfilado: falta PARQUEO_PERFILADO_CLAVE "
+                  "(sin ella cualquier cliente podría pedir perfiles)")
+            return None
+        return cls(
+            os.environ.get('PARQUEO_PERFILADO_DIRECTORIO',
+                           os.path.join(tempfile.gettempdir(), 'parqueo_perfiles')),
+            float(os.environ.get('PARQUEO_PERFILADO_MUESTREO', 0)),
+            os.environ.get('PARQUEO_PERFILADO_CABECERA', 'X-Perfilar'),
+            os.environ['PARQUEO_PERFILADO_CLAVE']
+        )
+
+    def registrar(self, app):
+        """
+        Registra los hooks en la aplicación. Debe llamarse antes de registrar
+        los demás hooks para que el perfil incluya la unidad de trabajo.
+
+        Args:
+            app: Aplicación Flask
+        """
+        from flask import request
+
+        @app.before_request
+        def iniciar_perfil_solicitud():
+            if not self.debe_perfilar(request.headers.get(self.cabecera)) or _perfil_en_curso.locked():
+                return
+            try:
+                perfil = PerfilSolicitud(request.endpoint or 'ninguna',
+                                         self._base_archivo(request.endpoint or 'ninguna'))
+            except OSError as falla:
+                print(f"Error al preparar perfil de solicitud: {str(falla)}")
+                return
+            if perfil.iniciar():
+                _perfil_actual.set(perfil)
+
+        @app.after_request
+        def informar_perfil_solicitud(respuesta):
+            perfil = _perfil_actual.get()
+            if perfil is not None:
+                respuesta.headers['X-Perfil'] = os.path.relpath(perfil.base, self.directorio)
+            return respuesta
+
+        @app.teardown_request
+        def terminar_perfil_solicitud(error):
+            perfil = _perfil_actual.get()
+            if perfil is None:
+                return
+            _perfil_actual.set(None)
+            try:
+                perfil.terminar()
+                self._podar(os.path.dirname(perfil.base))
+            except Exception as falla:
+                print(f"Error al guardar perfil de solicitud: {str(falla)}")
+
+    def debe_perfilar(self, valor_cabecera: str) -> bool:
+        """
+        Decide si se perfila una solicitud.
+
+        Args:
+            valor_cabecera: Valor de la cabecera de perfilado o None
+
+        Returns:
+            bool: True si la cabecera trae la clave o sale sorteada
+        """
+        if valor_cabecera and self.clave is not None:
+            return hmac.compare_digest(valor_cabecera.encode(), self.clave.encode())
+        return self.muestreo > 0 and random.random() < self.muestreo
+
+    def _base_archivo(self, ruta: str) -> str:
+        """Crea la carpeta de la ruta y devuelve la ruta de archivo sin extensión."""
+        carpeta = os.path.join(self.directorio, re.sub(r'[^\w.-]', '_', ruta))
+        os.makedirs(carpeta, exist_ok=True)
+        marca = time.strftime('%Y%m%d-%H%M%S')
+        return os.path.join(carpeta, f"{marca}-{time.time_ns() % 10**9:09d}")
+
+    def _podar(self, carpeta: str):
+        """Borra los perfiles más antiguos de la carpeta por encima del máximo."""
+        with self._lock:
+            perfiles = sorted(nombre[:-5] for nombre in os.listdir(carpeta) if nombre.endswith('.prof'))
+            for base in perfiles[:-self.maximo_por_ruta]:
+                for extension in ('.prof', '.folded'):
+                    try:
+                        os.remove(os.path.join(carpeta, base + extension))
+                    except FileNotFoundError:
+                        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumen de los perfiles guardados de una ruta")
+    parser.add_argument('carpeta', help="Carpeta de perfiles de una ruta")
+    parser.add_argument('--top', type=int, default=25, help="Funciones a mostrar")
+    parser.add_argument('--orden', default='cumulative', help="Criterio de pstats (cumulative, tottime, calls)")
+    args = parser.parse_args()
+
+    archivos = sorted(os.path.join(args.carpeta, nombre)
+                      for nombre in os.listdir(args.carpeta) if nombre.endswith('.prof'))
+    if not archivos:
+        print(f"No hay perfiles en {args.carpeta}")
+        return 1
+
+    print(f"Perfiles combinados: {len(archivos)}")
+    pstats.Stats(*archivos).sort_stats(args.orden).print_stats(args.top)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
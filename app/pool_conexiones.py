@@ -0,0 +1,305 @@
+"""
+Módulo para el manejo de un pool de conexiones a la base de datos.
+Reutiliza conexiones abiertas entre peticiones para evitar un handshake
+ODBC completo en cada llamada a get_conexion().
+"""
+import threading
+import time
+from collections import deque
+
+
+class PoolAgotadoError(Exception):
+    """Se lanza cuando no hay conexiones libres dentro del tiempo de espera."""
+    pass
+
+
+class ConexionPool:
+    """
+    Envoltura de una conexión real que pertenece a un pool.
+    Expone la misma interfaz que la conexión original, pero close()
+    la devuelve al pool en lugar de cerrarla.
+
+    Atributos:
+        _pool (PoolConexiones): Pool al que pertenece la conexión
+        _conexion: Conexión real de la base de datos
+        _devuelta (bool): Indica si ya fue devuelta al pool
+    """
+
+    def __init__(self, pool, conexion):
+        """
+        Inicializa la envoltura de la conexión.
+
+        Args:
+            pool: Pool dueño de la conexión
+            conexion: Conexión real de la base de datos
+        """
+        self._pool = pool
+        self._conexion = conexion
+        self._devuelta = False
+
+    def cursor(self):
+        """Devuelve un cursor de la conexión real."""
+        return self._conexion.cursor()
+
+    def commit(self):
+        """Confirma la transacción actual."""
+        self._conexion.commit()
+
+    def rollback(self):
+        """Revierte la transacción actual."""
+        self._conexion.rollback()
+
+    def close(self):
+        """Devuelve la conexión al pool (no la cierra físicamente)."""
+        if not self._devuelta:
+            self._devuelta = True
+            self._pool.devolver(self._conexion)
+
+    def __getattr__(self, nombre):
+        """Delega cualquier otro atributo a la conexión real."""
+        return getattr(self._conexion, nombre)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.close()
+
+    def __del__(self):
+        """Red de seguridad: recupera conexiones que nunca se cerraron."""
+        if not getattr(self, '_devuelta', True):
+            self._devuelta = True
+            self._pool.devolver(self._conexion, recuperada=True)
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones seguro para múltiples hilos.
+
+    Mantiene un mínimo de conexiones abiertas (pre-calentadas al inicio),
+    crea nuevas bajo demanda hasta un máximo, verifica que las conexiones
+    sigan vivas antes de entregarlas y cierra las que pasan demasiado
+    tiempo inactivas por encima del mínimo.
+
+    Atributos:
+        _fabrica (callable): Función que crea una conexión nueva
+        minimo (int): Conexiones que se mantienen abiertas
+        maximo (int): Límite de conexiones simultáneas
+        tiempo_espera (float): Segundos a esperar por una conexión libre
+        tiempo_inactividad (float): Segundos antes de cerrar una conexión ociosa
+        verificar_tras (float): Segundos de inactividad tras los cuales se
+            verifica la conexión antes de entregarla (0 = siempre)
+    """
+
+    def __init__(self, fabrica, minimo: int = 1, maximo: int = 10,
+                 tiempo_espera: float = 30.0, tiempo_inactividad: float = 300.0,
+                 verificar_tras: float = 30.0, consulta_verificacion: str = 'SELECT 1'):
+        """
+        Inicializa el pool sin abrir conexiones.
+
+        Args:
+            fabrica: Función sin argumentos que devuelve una conexión nueva
+            minimo: Conexiones mínimas a mantener abiertas
+            maximo: Conexiones máximas permitidas
+            tiempo_espera: Segundos de espera cuando el pool está lleno
+            tiempo_inactividad: Segundos antes de expirar una conexión ociosa
+            verificar_tras: Inactividad mínima para verificar la conexión
+            consulta_verificacion: Consulta usada para verificar la conexión
+
+        Raises:
+            ValueError: Si los tamaños del pool no son válidos
+        """
+        if minimo < 0 or maximo < 1 or minimo > maximo:
+            raise ValueError("El pool requiere 0 <= minimo <= maximo y maximo >= 1")
+
+        self._fabrica = fabrica
+        self.minimo = minimo
+        self.maximo = maximo
+        self.tiempo_espera = tiempo_espera
+        self.tiempo_inactividad = tiempo_inactividad
+        self.verificar_tras = verificar_tras
+        self.consulta_verificacion = consulta_verificacion
+
+        self._condicion = threading.Condition(threading.RLock())
+        self._libres = deque()  # (conexion, ultimo_uso)
+        self._total = 0
+        self._en_uso = 0
+        self._contadores = {
+            'creadas': 0,
+            'reutilizadas': 0,
+            'descartadas': 0,
+            'expiradas': 0,
+            'recuperadas': 0,
+            'esperas': 0,
+            'agotamientos': 0,
+        }
+
+    def precalentar(self) -> int:
+        """
+        Abre conexiones hasta alcanzar el mínimo configurado.
+
+        Returns:
+            int: Número de conexiones abiertas durante el pre-calentamiento
+        """
+        abiertas = 0
+        while True:
+            with self._condicion:
+                if self._total >= self.minimo:
+                    return abiertas
+                self._total += 1
+            try:
+                conexion = self._fabrica()
+            except Exception:
+                with self._condicion:
+                    self._total -= 1
+                raise
+            with self._condicion:
+                self._contadores['creadas'] += 1
+                self._libres.append((conexion, time.monotonic()))
+                self._condicion.notify()
+            abiertas += 1
+
+    def obtener(self) -> ConexionPool:
+        """
+        Entrega una conexión del pool, creando una nueva si hace falta.
+
+        Returns:
+            ConexionPool: Conexión lista para usarse
+
+        Raises:
+            PoolAgotadoError: Si no se libera ninguna conexión a tiempo
+        """
+        limite = time.monotonic() + self.tiempo_espera
+        while True:
+            conexion = None
+            ultimo_uso = None
+            crear = False
+
+            with self._condicion:
+                self._expirar_inactivas()
+                while not self._libres and self._total >= self.maximo:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._contadores['agotamientos'] += 1
+                        raise PoolAgotadoError(
+                            f"No hay conexiones libres (máximo {self.maximo})"
+                        )
+                    self._contadores['esperas'] += 1
+                    self._condicion.wait(restante)
+
+                if self._libres:
+                    conexion, ultimo_uso = self._libres.pop()
+                else:
+                    crear = True
+                    self._total += 1
+                self._en_uso += 1
+
+            if crear:
+                try:
+                    conexion = self._fabrica()
+                except Exception:
+                    with self._condicion:
+                        self._total -= 1
+                        self._en_uso -= 1
+                        self._condicion.notify()
+                    raise
+                with self._condicion:
+                    self._contadores['creadas'] += 1
+                return ConexionPool(self, conexion)
+
+            if time.monotonic() - ultimo_uso < self.verificar_tras or self._esta_viva(conexion):
+                with self._condicion:
+                    self._contadores['reutilizadas'] += 1
+                return ConexionPool(self, conexion)
+
+            with self._condicion:
+                self._contadores['descartadas'] += 1
+                self._total -= 1
+                self._en_uso -= 1
+            self._cerrar_silencioso(conexion)
+
+    def devolver(self, conexion, recuperada: bool = False):
+        """
+        Recibe una conexión de vuelta y la deja disponible para reutilizarse.
+        Cualquier transacción pendiente se revierte antes de guardarla.
+
+        Args:
+            conexion: Conexión real que se devuelve
+            recuperada: True si se recuperó sin que se llamara a close()
+        """
+        try:
+            conexion.rollback()
+            valida = True
+        except Exception:
+            valida = False
+
+        with self._condicion:
+            self._en_uso -= 1
+            if recuperada:
+                self._contadores['recuperadas'] += 1
+            if valida:
+                self._libres.append((conexion, time.monotonic()))
+            else:
+                self._contadores['descartadas'] += 1
+                self._total -= 1
+            self._condicion.notify()
+
+        if not valida:
+            self._cerrar_silencioso(conexion)
+
+    def estadisticas(self) -> dict:
+        """
+        Devuelve un resumen del estado y la actividad del pool.
+
+        Returns:
+            dict: Tamaños configurados, conexiones actuales y contadores
+        """
+        with self._condicion:
+            datos = {
+                'minimo': self.minimo,
+                'maximo': self.maximo,
+                'total': self._total,
+                'en_uso': self._en_uso,
+                'libres': len(self._libres),
+            }
+            datos.update(self._contadores)
+            return datos
+
+    def cerrar(self):
+        """Cierra todas las conexiones libres del pool."""
+        with self._condicion:
+            libres = [conexion for conexion, _ in self._libres]
+            self._libres.clear()
+            self._total -= len(libres)
+        for conexion in libres:
+            self._cerrar_silencioso(conexion)
+
+    def _expirar_inactivas(self):
+        """Cierra las conexiones ociosas que sobran por encima del mínimo."""
+        ahora = time.monotonic()
+        # Las más antiguas quedan al inicio porque se reutiliza por el final
+        while (self._libres and self._total > self.minimo
+               and ahora - self._libres[0][1] > self.tiempo_inactividad):
+            conexion, _ = self._libres.popleft()
+            self._total -= 1
+            self._contadores['expiradas'] += 1
+            self._cerrar_silencioso(conexion)
+
+    def _esta_viva(self, conexion) -> bool:
+        """Ejecuta la consulta de verificación sobre la conexión."""
+        try:
+            cursor = conexion.cursor()
+            cursor.execute(self.consulta_verificacion)
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _cerrar_silencioso(conexion):
+        """Cierra una conexión ignorando cualquier error."""
+        try:
+            conexion.close()
+        except Exception:
+            pass
@@ -0,0 +1,380 @@
+"""
+Módulo de simulación de eventos discretos del parqueo en fila.
+Reproduce o genera flujos de llegadas y salidas y los aplica sobre un
+MotorPilas en memoria con las mismas reglas que las rutas de la aplicación:
+estacionar con asignación automática (estacionar_vehiculo_fila), sacar
+un vehículo aunque esté enterrado (extraer_vehiculo_fila / mover_vehiculo_fila)
+y atender la lista de espera en orden FIFO (procesar_lista_espera). No usa
+la base de datos, por lo que meses de tráfico sobre miles de filas se
+simulan en segundos.
+
+Uso:
+    python -m app.simulacion
+    python -m app.simulacion --filas 2000 --dias 90 --politica salida
+    python -m app.simulacion --filas 300 --eventos llegadas.csv --json resultado.json
+
+Para comparar la asignación por salida esperada con la primera fila libre
+(una semana, 40 filas, 30 % de residentes) y ver el caso en que todas las
+llegadas declaran su estancia:
+    python -m app.simulacion --filas 40 --dias 7
+    python -m app.simulacion --filas 40 --dias 7 --politica salida --declaran 1
+
+El archivo de eventos (.csv, .ndjson o .jsonl) tiene una llegada por
+registro, ordenadas por hora: hora (horas desde el inicio), id_vehiculo,
+estancia_horas y, opcionalmente, horas_declaradas.
+"""
+import argparse
+import heapq
+import json
+import math
+import random
+import sys
+import time
+from collections import deque
+from app.importacion import FORMATOS, detectar_formato, leer_registros
+from app.models.estancias import EstimadorEstancias
+from app.models.pila_vehiculos import MotorPilas, CAPACIDAD_FILA
+
+POLITICAS = ('salida', 'primera_libre')
+OCUPACION_OBJETIVO = 0.95  # Para calcular las llegadas por hora si no se indican
+
+class Llegada:
+    """
+    Llegada de un vehículo al parqueo.
+
+    Atributos:
+        hora (float): Segundos desde el inicio de la simulación
+        id_vehiculo (int): Vehículo que llega
+        estancia (float): Segundos que se quedará una vez estacionado
+        declarada (float): Segundos que dice que se quedará (None si no declara)
+    """
+    __slots__ = ('hora', 'id_vehiculo', 'estancia', 'declarada')
+
+    def __init__(self, hora: float, id_vehiculo: int, estancia: float, declarada: float = None):
+        self.hora = hora
+        self.id_vehiculo = id_vehiculo
+        self.estancia = estancia
+        self.declarada = declarada
+
+def generar_llegadas(dias: float, llegadas_hora: float, vehiculos: int,
+                     proporcion_residentes: float = 0.3, estancia_residente: float = 10.0,
+                     estancia_invitado: float = 2.0, proporcion_declarada: float = 0.0,
+                     semilla: int = None):
+    """
+    Genera llegadas de Poisson de una población de residentes (estancias
+    largas) e invitados (estancias cortas), con estancias log-normales.
+    Cada vehículo conserva su tipo, así el estimador puede aprenderlo.
+
+    Args:
+        dias: Días a simular
+        llegadas_hora: Llegadas promedio por hora
+        vehiculos: Tamaño de la población de vehículos
+        proporcion_residentes: Fracción de vehículos residentes (0 a 1)
+        estancia_residente: Estancia promedio de un residente en horas
+        estancia_invitado: Estancia promedio de un invitado en horas
+        proporcion_declarada: Fracción de llegadas que declaran su estancia
+            (redondeada a media hora)
+        semilla: Semilla del generador aleatorio (opcional)
+
+    Yields:
+        Llegada: Llegadas en orden de hora
+    """
+    azar = random.Random(semilla)
+    residentes = int(vehiculos * proporcion_residentes)
+    sigma = 0.5
+    mu_residente = math.log(estancia_residente * 3600) - sigma ** 2 / 2
+    mu_invitado = math.log(estancia_invitado * 3600) - sigma ** 2 / 2
+    fin = dias * 86400
+    media_entre_llegadas = 3600 / llegadas_hora
+
+    hora = azar.expovariate(1 / media_entre_llegadas)
+    while hora < fin:
+        id_vehiculo = azar.randint(1, vehiculos)
+        mu = mu_residente if id_vehiculo <= residentes else mu_invitado
+        estancia = azar.lognormvariate(mu, sigma)
+        declarada = None
+        if proporcion_declarada and azar.random() < proporcion_declarada:
+            declarada = max(0.5, round(estancia / 1800) / 2) * 3600
+        yield Llegada(hora, id_vehiculo, estancia, declarada)
+        hora += azar.expovariate(1 / media_entre_llegadas)
+
+def leer_llegadas(flujo, formato: str):
+    """
+    Lee llegadas registradas de un archivo CSV o NDJSON.
+
+    Args:
+        flujo: Archivo de texto abierto (con newline='' para CSV)
+        formato: 'csv' o 'ndjson'
+
+    Yields:
+        Llegada: Llegadas en el orden del archivo
+
+    Raises:
+        ValueError: Si un registro es inválido o las horas no están ordenadas
+    """
+    anterior = 0.0
+    for linea, registro in leer_registros(flujo, formato):
+        try:
+            if registro is None:
+                raise ValueError("registro no es un objeto JSON")
+            hora = float(registro['hora']) * 3600
+            declaradas = registro.get('horas_declaradas')
+            llegada = Llegada(
+                hora,
+                int(registro['id_vehiculo']),
+                float(registro['estancia_horas']) * 3600,
+                float(declaradas) * 3600 if declaradas not in (None, '') else None
+            )
+        except (KeyError, TypeError, ValueError) as error:
+            raise ValueError(f"Línea {linea}: registro inválido ({error})")
+        if hora < anterior:
+            raise ValueError(f"Línea {linea}: las llegadas deben estar ordenadas por hora")
+        anterior = hora
+        yield llegada
+
+class ResultadoSimulacion:
+    """
+    Métricas de una simulación.
+
+    Atributos:
+        politica (str): Política de asignación usada
+        filas (int): Filas simuladas
+        capacidad (int): Vehículos por fila
+        duracion (float): Segundos simulados
+        llegadas (int): Llegadas procesadas
+        ignoradas (int): Llegadas de vehículos que ya estaban dentro o en espera
+        atendidos (int): Vehículos estacionados
+        salidas (int): Vehículos que salieron
+        movimientos (int): Movimientos temporales de bloqueadores
+        en_espera_final (int): Vehículos en la lista de espera al terminar
+        espera_maxima (int): Mayor largo de la lista de espera
+        area_espera (float): Integral del largo de la lista en el tiempo
+        area_ocupacion (float): Integral de los espacios ocupados en el tiempo
+        esperas (list): Segundos esperados por los vehículos que hicieron fila
+        tiempo_real (float): Segundos reales que tomó la simulación
+    """
+
+    def __init__(self, politica: str, filas: int, capacidad: int):
+        self.politica = politica
+        self.filas = filas
+        self.capacidad = capacidad
+        self.duracion = 0.0
+        self.llegadas = 0
+        self.ignoradas = 0
+        self.atendidos = 0
+        self.salidas = 0
+        self.movimientos = 0
+        self.en_espera_final = 0
+        self.espera_maxima = 0
+        self.area_espera = 0.0
+        self.area_ocupacion = 0.0
+        self.esperas = []
+        self.tiempo_real = 0.0
+
+    def percentil_espera(self, percentil: float) -> float:
+        """
+        Devuelve el percentil del tiempo de espera en minutos entre todos
+        los atendidos; los que no hicieron fila cuentan como espera cero.
+        """
+        if not self.atendidos:
+            return 0.0
+        indice = math.ceil(percentil / 100 * self.atendidos) - 1
+        sin_espera = self.atendidos - len(self.esperas)
+        if indice < sin_espera:
+            return 0.0
+        return sorted(self.esperas)[indice - sin_espera] / 60
+
+    def to_dict(self) -> dict:
+        """Devuelve las métricas como diccionario serializable a JSON."""
+        dias = self.duracion / 86400 if self.duracion else 0
+        return {
+            'politica': self.politica,
+            'filas': self.filas,
+            'capacidad': self.capacidad,
+            'dias': round(dias, 2),
+            'llegadas': self.llegadas,
+            'ignoradas': self.ignoradas,
+            'atendidos': self.atendidos,
+            'salidas': self.salidas,
+            'salidas_por_dia': round(self.salidas / dias, 1) if dias else 0,
+            'movimientos': self.movimientos,
+            'movimientos_por_salida': round(self.movimientos / self.salidas, 3) if self.salidas else 0,
+            'ocupacion_promedio': round(self.area_ocupacion / (self.duracion * self.filas * self.capacidad), 3)
+                if self.duracion else 0,
+            'espera_largo_promedio': round(self.area_espera / self.duracion, 2) if self.duracion else 0,
+            'espera_largo_maximo': self.espera_maxima,
+            'en_espera_final': self.en_espera_final,
+            'hicieron_fila': len(self.esperas),
+            'espera_minutos_promedio': round(sum(self.esperas) / 60 / self.atendidos, 2) if self.atendidos else 0,
+            'espera_minutos_p95': round(self.percentil_espera(95), 2),
+            'espera_minutos_maximo': round(max(self.esperas, default=0) / 60, 2),
+            'tiempo_real_segundos': round(self.tiempo_real, 2),
+        }
+
+class Simulador:
+    """
+    Simulador de eventos discretos sobre un MotorPilas en memoria.
+    Las salidas se procesan en orden de hora intercaladas con las llegadas,
+    que se consumen como flujo, por lo que la memoria depende de los
+    vehículos dentro del parqueo y no de la duración simulada.
+
+    Atributos:
+        filas (int): Filas del parqueo
+        capacidad (int): Vehículos por fila
+        politica (str): 'salida' (elegir_fila según la salida esperada) o
+            'primera_libre' (primera fila con espacio por número)
+    """
+
+    def __init__(self, filas: int, capacidad: int = CAPACIDAD_FILA, politica: str = 'salida'):
+        """
+        Inicializa el simulador.
+
+        Args:
+            filas: Filas del parqueo
+            capacidad: Vehículos por fila (por defecto 3)
+            politica: Política de asignación (por defecto 'salida')
+
+        Raises:
+            ValueError: Si la política no es válida
+        """
+        if politica not in POLITICAS:
+            raise ValueError(f"Política debe ser una de: {POLITICAS}")
+        self.filas = filas
+        self.capacidad = capacidad
+        self.politica = politica
+
+    def ejecutar(self, llegadas) -> ResultadoSimulacion:
+        """
+        Simula un flujo de llegadas y luego deja salir a todos los
+        vehículos estacionados, atendiendo a los que quedaron en espera.
+
+        Args:
+            llegadas: Iterable de Llegada ordenado por hora
+
+        Returns:
+            ResultadoSimulacion: Métricas de la simulación
+        """
+        inicio = time.perf_counter()
+        resultado = ResultadoSimulacion(self.politica, self.filas, self.capacidad)
+        ahora = [0.0]
+        motor = MotorPilas.en_memoria(self.filas, self.capacidad, EstimadorEstancias(),
+                                      reloj=lambda: ahora[0])
+        salidas = []     # Montículo (hora, secuencia, id_vehiculo)
+        espera = deque() # Lista de espera FIFO: (Llegada, hora de solicitud)
+        esperando = set()
+        ocupados = 0
+        ultimo = 0.0
+        secuencia = 0
+
+        def avanzar(hora):
+            nonlocal ultimo
+            resultado.area_espera += len(espera) * (hora - ultimo)
+            resultado.area_ocupacion += ocupados * (hora - ultimo)
+            ultimo = hora
+            ahora[0] = hora
+
+        def estacionar(llegada, hora) -> bool:
+            nonlocal ocupados, secuencia
+            salida_estimada = hora + llegada.declarada if llegada.declarada is not None else None
+            if self.politica == 'salida':
+                id_espacio_fila = motor.elegir_fila(llegada.id_vehiculo, salida_estimada)
+            else:
+                id_espacio_fila = motor.buscar_fila_disponible()
+            if id_espacio_fila is None:
+                return False
+            motor.estacionar(id_espacio_fila, llegada.id_vehiculo, salida_estimada=salida_estimada)
+            ocupados += 1
+            secuencia += 1
+            heapq.heappush(salidas, (hora + llegada.estancia, secuencia, llegada.id_vehiculo))
+            resultado.atendidos += 1
+            return True
+
+        def procesar_salidas(hasta):
+            nonlocal ocupados
+            while salidas and salidas[0][0] <= hasta:
+                hora, _, id_vehiculo = heapq.heappop(salidas)
+                avanzar(hora)
+                plan = motor.extraer(id_vehiculo)
+                ocupados -= 1
+                resultado.salidas += 1
+                resultado.movimientos += plan.movimientos - 1
+                # El espacio liberado es para el primero de la lista de espera
+                if espera and estacionar(espera[0][0], hora):
+                    llegada, solicitud = espera.popleft()
+                    esperando.discard(llegada.id_vehiculo)
+                    resultado.esperas.append(hora - solicitud)
+
+        for llegada in llegadas:
+            procesar_salidas(llegada.hora)
+            avanzar(llegada.hora)
+            resultado.llegadas += 1
+            if llegada.id_vehiculo in esperando or motor.esta_estacionado(llegada.id_vehiculo):
+                resultado.ignoradas += 1
+                continue
+            if not estacionar(llegada, llegada.hora):
+                espera.append((llegada, llegada.hora))
+                esperando.add(llegada.id_vehiculo)
+                resultado.espera_maxima = max(resultado.espera_maxima, len(espera))
+
+        procesar_salidas(math.inf)
+        resultado.duracion = ultimo
+        resultado.en_espera_final = len(espera)
+        resultado.tiempo_real = time.perf_counter() - inicio
+        return resultado
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulación de eventos discretos del parqueo en fila")
+    parser.add_argument('--filas', type=int, default=1000, help="Filas del parqueo")
+    parser.add_argument('--capacidad', type=int, default=CAPACIDAD_FILA, help="Vehículos por fila")
+    parser.add_argument('--politica', nargs='+', choices=POLITICAS, default=list(POLITICAS),
+                        help="Políticas de asignación a comparar")
+    parser.add_argument('--eventos', help="Archivo de llegadas a reproducir (.csv, .ndjson o .jsonl)")
+    parser.add_argument('--formato', choices=FORMATOS, help="Formato del archivo de llegadas")
+    parser.add_argument('--dias', type=float, default=30, help="Días a generar")
+    parser.add_argument('--llegadas-hora', type=float,
+                        help=f"Llegadas por hora (por defecto las de una ocupación de {OCUPACION_OBJETIVO:.0%})")
+    parser.add_argument('--vehiculos', type=int, help="Población de vehículos (por defecto 10 por espacio)")
+    parser.add_argument('--residentes', type=float, default=0.3, help="Fracción de vehículos residentes")
+    parser.add_argument('--estancia-residente', type=float, default=10.0, help="Horas promedio de un residente")
+    parser.add_argument('--estancia-invitado', type=float, default=2.0, help="Horas promedio de un invitado")
+    parser.add_argument('--declaran', type=float, default=0.0, help="Fracción de llegadas que declaran su estancia")
+    parser.add_argument('--semilla', type=int, default=1, help="Semilla del generador aleatorio")
+    parser.add_argument('--json', help="Archivo donde guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    espacios = args.filas * args.capacidad
+    estancia_media = args.residentes * args.estancia_residente + (1 - args.residentes) * args.estancia_invitado
+    llegadas_hora = args.llegadas_hora or OCUPACION_OBJETIVO * espacios / estancia_media
+
+    resultados = []
+    for politica in args.politica:
+        if args.eventos:
+            formato = args.formato or detectar_formato(args.eventos)
+            with open(args.eventos, encoding='utf-8-sig', newline='') as flujo:
+                resultado = Simulador(args.filas, args.capacidad, politica).ejecutar(leer_llegadas(flujo, formato))
+        else:
+            llegadas = generar_llegadas(args.dias, llegadas_hora, args.vehiculos or 10 * espacios,
+                                        args.residentes, args.estancia_residente,
+                                        args.estancia_invitado, args.declaran, args.semilla)
+            resultado = Simulador(args.filas, args.capacidad, politica).ejecutar(llegadas)
+        resultados.append(resultado.to_dict())
+
+    for datos in resultados:
+        print(f"Política: {datos['politica']}  ({datos['filas']} filas, {datos['dias']} días, "
+              f"{datos['tiempo_real_segundos']} s)")
+        print(f"  Llegadas: {datos['llegadas']}  atendidos: {datos['atendidos']}  "
+              f"salidas: {datos['salidas']} ({datos['salidas_por_dia']}/día)")
+        print(f"  Ocupación promedio: {datos['ocupacion_promedio']:.1%}")
+        print(f"  Movimientos por salida: {datos['movimientos_por_salida']}  (total {datos['movimientos']})")
+        print(f"  Lista de espera: promedio {datos['espera_largo_promedio']}  "
+              f"máximo {datos['espera_largo_maximo']}  al final {datos['en_espera_final']}")
+        print(f"  Espera (min): promedio {datos['espera_minutos_promedio']}  "
+              f"p95 {datos['espera_minutos_p95']}  máximo {datos['espera_minutos_maximo']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as archivo:
+            json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""
+Módulo de unidad de trabajo por solicitud.
+Mientras hay una unidad activa, todas las llamadas a get_conexion() del
+mismo contexto (hilo o solicitud) comparten una sola conexión: los commit()
+de los gestores se posponen y la unidad confirma una sola vez al terminar,
+o revierte todo si alguna sentencia falló, de modo que las operaciones de
+varios pasos son atómicas.
+"""
+from contextvars import ContextVar
+
+_unidad_actual = ContextVar('unidad_trabajo', default=None)
+
+
+def _es_consulta(sentencia) -> bool:
+    """Indica si la sentencia sólo lee (SELECT); cualquier otra cuenta como escritura."""
+    return isinstance(sentencia, str) and sentencia.lstrip().upper().startswith('SELECT')
+
+
+class CursorUnidad:
+    """
+    Envoltura de un cursor de la unidad de trabajo.
+    Si una sentencia falla marca la unidad para revertirse, aunque el
+    gestor que la ejecutó capture la excepción.
+
+    Atributos:
+        _unidad (UnidadTrabajo): Unidad a la que pertenece el cursor
+        _cursor: Cursor real de la base de datos
+    """
+
+    def __init__(self, unidad, cursor):
+        object.__setattr__(self, '_unidad', unidad)
+        object.__setattr__(self, '_cursor', cursor)
+
+    def execute(self, *args, **kwargs):
+        return self._ejecutar(self._cursor.execute, *args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return self._ejecutar(self._cursor.executemany, *args, **kwargs)
+
+    def _ejecutar(self, metodo, *args, **kwargs):
+        """
+        Ejecuta una sentencia, anota si la unidad escribe y la marca como
+        fallida si lanza error.
+        """
+        if args and not _es_consulta(args[0]):
+            self._unidad.marcar_escritura()
+        try:
+            resultado = metodo(*args, **kwargs)
+        except Exception:
+            self._unidad.marcar_fallida()
+            raise
+        return self if resultado is self._cursor else resultado
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    def __setattr__(self, nombre, valor):
+        # Atributos como fast_executemany se configuran en el cursor real
+        setattr(self._cursor, nombre, valor)
+
+
+class ConexionUnidad:
+    """
+    Conexión compartida que reciben los gestores dentro de una unidad.
+    commit() y close() no hacen nada: la unidad confirma y devuelve la
+    conexión al terminar. rollback() marca toda la unidad para revertirse.
+
+    Atributos:
+        _unidad (UnidadTrabajo): Unidad dueña de la conexión
+    """
+
+    def __init__(self, unidad):
+        self._unidad = unidad
+
+    def cursor(self):
+        """Devuelve un cursor de la conexión compartida."""
+        return CursorUnidad(self._unidad, self._unidad._conexion.cursor())
+
+    def commit(self):
+        """Se pospone hasta el final de la unidad."""
+        pass
+
+    def rollback(self):
+        """Revierte lo hecho hasta ahora y marca la unidad como fallida."""
+        self._unidad.marcar_fallida()
+        self._unidad._conexion.rollback()
+
+    def close(self):
+        """La conexión se devuelve al pool cuando termina la unidad."""
+        pass
+
+    def __getattr__(self, nombre):
+        return getattr(self._unidad._conexion, nombre)
+
+
+class UnidadTrabajo:
+    """
+    Transacción que abarca todas las operaciones de una solicitud.
+    La conexión se toma del pool en el primer uso, por lo que una
+    solicitud que no consulta la base de datos no ocupa conexiones.
+
+    Atributos:
+        _obtener (callable): Función que entrega una conexión del pool o None
+        _conexion: Conexión del pool en uso (None hasta el primer uso)
+        _fallida (bool): Indica si alguna sentencia falló
+        _escribio (bool): Indica si se ejecutó alguna sentencia que no es SELECT
+        escritura_cliente (float): Hora (epoch) de la última escritura del
+            cliente según la solicitud, para leer lo propio escrito
+        _al_revertir (list): Acciones a ejecutar si la unidad se revierte
+        _al_confirmar (list): Acciones a ejecutar si la unidad se confirma
+        _al_terminar (list): Acciones a ejecutar al terminar la unidad
+    """
+
+    def __init__(self, obtener):
+        """
+        Inicializa la unidad sin conexión.
+
+        Args:
+            obtener: Función sin argumentos que devuelve una conexión del pool o None
+        """
+        self._obtener = obtener
+        self._conexion = None
+        self._fallida = False
+        self._escribio = False
+        self.escritura_cliente = 0.0
+        self._al_revertir = []
+        self._al_confirmar = []
+        self._al_terminar = []
+
+    @property
+    def fallida(self) -> bool:
+        """Indica si la unidad se revertirá al terminar."""
+        return self._fallida
+
+    @property
+    def escribio(self) -> bool:
+        """Indica si la unidad ejecutó alguna escritura."""
+        return self._escribio
+
+    @property
+    def tiene_conexion(self) -> bool:
+        """Indica si la unidad ya tomó su conexión (y pudo haber escrito)."""
+        return self._conexion is not None
+
+    def conexion(self):
+        """
+        Devuelve la conexión compartida, tomándola del pool si hace falta.
+
+        Returns:
+            ConexionUnidad: Conexión de la unidad o None si no hay conexión
+        """
+        if self._conexion is None:
+            self._conexion = self._obtener()
+            if self._conexion is None:
+                return None
+        return ConexionUnidad(self)
+
+    def marcar_fallida(self):
+        """Marca la unidad para revertirse al terminar."""
+        self._fallida = True
+
+    def marcar_escritura(self):
+        """Anota que la unidad escribió en la base de datos."""
+        self._escribio = True
+
+    def al_revertir(self, accion):
+        """Registra una acción sin argumentos a ejecutar si la unidad se revierte."""
+        self._al_revertir.append(accion)
+
+    def al_confirmar(self, accion):
+        """Registra una acción sin argumentos a ejecutar si la unidad se confirma."""
+        self._al_confirmar.append(accion)
+
+    def al_terminar(self, accion):
+        """Registra una acción sin argumentos a ejecutar al terminar la unidad."""
+        self._al_terminar.append(accion)
+
+    def finalizar(self, error: BaseException = None) -> bool:
+        """
+        Confirma la unidad, o la revierte si falló o si hubo un error,
+        y devuelve la conexión al pool.
+
+        Args:
+            error: Excepción que interrumpió la solicitud (opcional)
+
+        Returns:
+            bool: True si los cambios se confirmaron, False si se revirtieron
+        """
+        confirmada = False
+        if self._conexion is not None:
+            try:
+                if error is None and not self._fallida:
+                    self._conexion.commit()
+                    confirmada = True
+                else:
+                    self._conexion.rollback()
+            except Exception as falla:
+                print(f"Error al finalizar la unidad de trabajo: {str(falla)}")
+            finally:
+                self._conexion.close()
+                self._conexion = None
+        else:
+            confirmada = error is None and not self._fallida
+
+        acciones = (self._al_confirmar if confirmada else self._al_revertir) + self._al_terminar
+        for accion in acciones:
+            try:
+                accion()
+            except Exception as falla:
+                print(f"Error en acción de fin de unidad de trabajo: {str(falla)}")
+        return confirmada
+
+
+def unidad_actual() -> UnidadTrabajo:
+    """Devuelve la unidad de trabajo activa en este contexto o None."""
+    return _unidad_actual.get()
+
+
+def iniciar_unidad(obtener) -> bool:
+    """
+    Activa una unidad de trabajo en el contexto actual si no hay una.
+
+    Args:
+        obtener: Función sin argumentos que devuelve una conexión del pool o None
+
+    Returns:
+        bool: True si se creó una unidad nueva, False si ya había una activa
+    """
+    if _unidad_actual.get() is not None:
+        return False
+    _unidad_actual.set(UnidadTrabajo(obtener))
+    return True
+
+
+def finalizar_unidad(error: BaseException = None) -> bool:
+    """
+    Finaliza y desactiva la unidad de trabajo del contexto actual.
+
+    Args:
+        error: Excepción que interrumpió el trabajo (opcional)
+
+    Returns:
+        bool: True si se confirmó (o no había unidad), False si se revirtió
+    """
+    unidad = _unidad_actual.get()
+    if unidad is None:
+        return True
+    # Se desactiva antes de finalizar para que las acciones usen conexiones propias
+    _unidad_actual.set(None)
+    return unidad.finalizar(error)
+
+
+def ejecutar_al_revertir(accion):
+    """Registra una acción de compensación en la unidad activa; sin unidad no hace nada."""
+    unidad = _unidad_actual.get()
+    if unidad is not None:
+        unidad.al_revertir(accion)
+
+
+def ejecutar_al_confirmar(accion):
+    """Ejecuta la acción si la unidad activa se confirma, o de inmediato si no hay unidad."""
+    unidad = _unidad_actual.get()
+    if unidad is None:
+        accion()
+    else:
+        unidad.al_confirmar(accion)
+
+
+def ejecutar_al_terminar(accion):
+    """Ejecuta la acción al terminar la unidad activa, o de inmediato si no hay unidad."""
+    unidad = _unidad_actual.get()
+    if unidad is None:
+        accion()
+    else:
+        unidad.al_terminar(accion)
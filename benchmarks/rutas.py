@@ -0,0 +1,418 @@
+"""
+Benchmark de extremo a extremo de las rutas principales del parqueo.
+
+Levanta la aplicación Flask con el backend SQLite embebido sobre una base
+temporal, siembra un parqueo de N espacios en fila y ejecuta cada escenario
+a través del cliente de pruebas de Flask. Por escenario reporta latencias
+(p50/p95/p99), rendimiento (solicitudes por segundo) y consultas SQL por
+solicitud, y guarda los resultados en JSON para comparar entre commits.
+
+Uso:
+    python benchmarks/rutas.py
+    python benchmarks/rutas.py --espacios 10 100 1000 10000 --solicitudes 500
+    python benchmarks/rutas.py --escenarios dashboard mover --salida base.json
+    python benchmarks/rutas.py --comparar benchmarks/resultados/base.json
+
+El dashboard lista todos los vehículos en el selector de cada fila, por lo
+que sin la caché de fragmentos su costo crece con espacios x vehículos.
+'dashboard' recalcula la instantánea en cada solicitud y reutiliza los
+fragmentos; 'dashboard_sin_fragmentos' además vacía la caché de fragmentos,
+así que la diferencia entre ambos es lo que ahorran los fragmentos:
+    python benchmarks/rutas.py --espacios 1000 --escenarios dashboard dashboard_sin_fragmentos
+Los escenarios de dashboard se omiten por encima de --max-espacios-dashboard
+y --tiempo-maximo corta cada escenario cuando agota su presupuesto para que
+los tamaños grandes terminen.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CAPACIDAD = 3
+SENTENCIAS_MEDIDAS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+
+class MedidorConsultas:
+    """
+    Cuenta las sentencias SQL que ejecutan las conexiones del backend.
+    Ignora las consultas de verificación del pool y el control de transacciones.
+
+    Atributos:
+        total (int): Sentencias contadas desde la última puesta a cero
+    """
+
+    def __init__(self):
+        self.total = 0
+
+    def registrar(self, sentencia: str):
+        """Callback de sqlite3.set_trace_callback."""
+        texto = sentencia.lstrip().upper()
+        if texto.startswith(SENTENCIAS_MEDIDAS) and texto.rstrip() != 'SELECT 1':
+            self.total += 1
+
+    def reiniciar(self):
+        """Pone el contador en cero."""
+        self.total = 0
+
+
+def configurar_almacenamiento(ruta: str, medidor: MedidorConsultas):
+    """
+    Configura app.db_config con un backend SQLite que reporta cada
+    sentencia al medidor. Debe llamarse antes de cargar app.py.
+
+    Args:
+        ruta: Archivo de la base SQLite temporal
+        medidor: Medidor de consultas
+    """
+    os.environ['PARQUEO_BACKEND'] = 'sqlite'
+    os.environ['PARQUEO_SQLITE_RUTA'] = ruta
+    # Sin hilos de fondo: el drenador atendería la lista de espera de
+    # 'procesar' antes que las solicitudes y ambos sumarían consultas
+    os.environ['PARQUEO_DRENADO'] = '0'
+    os.environ['PARQUEO_ARCHIVADO'] = '0'
+    # Un solo proceso: la instantánea del dashboard no necesita vencer
+    os.environ['PARQUEO_CACHE_VIGENCIA'] = '0'
+    sys.path.insert(0, RAIZ)
+
+    from app import condominios, db_config
+    from app.almacenamiento import BackendSQLite
+    from app.pool_conexiones import PoolConexiones
+
+    class BackendMedido(BackendSQLite):
+        def conectar(self):
+            conexion = super().conectar()
+            conexion.set_trace_callback(medidor.registrar)
+            return conexion
+
+    backend = BackendMedido(ruta)
+    db_config.configurar_condominio(condominios.predeterminado, backend,
+                                    PoolConexiones(backend.conectar, minimo=1, maximo=4))
+    backend.preparar()
+
+
+def cargar_aplicacion():
+    """
+    Carga app.py como módulo; el paquete 'app' tiene el mismo nombre,
+    por eso no puede importarse directamente.
+
+    Returns:
+        module: Módulo de la aplicación (app, motor_pilas, cache_dashboard, ...)
+    """
+    spec = importlib.util.spec_from_file_location('aplicacion_parqueo', os.path.join(RAIZ, 'app.py'))
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def sembrar(ruta: str, espacios: int, ocupacion: int, vehiculos: int,
+            en_espera: int = 0, salidas_por_fila: int = 0):
+    """
+    Vacía la base y siembra un parqueo sintético.
+
+    Args:
+        ruta: Archivo de la base SQLite
+        espacios: Cantidad de EspaciosFila
+        ocupacion: Vehículos estacionados por fila (0 a CAPACIDAD)
+        vehiculos: Vehículos registrados en total
+        en_espera: Vehículos no estacionados con solicitud pendiente
+        salidas_por_fila: Vehículos por fila con salida temporal pendiente
+    """
+    conexion = sqlite3.connect(ruta)
+    try:
+        for tabla in ('MovimientosTemporales', 'ListaEspera', 'PilaVehiculos',
+                      'Vehiculos', 'EspaciosFila', 'Usuarios'):
+            conexion.execute(f"DELETE FROM {tabla}")
+        conexion.execute("DELETE FROM sqlite_sequence")
+
+        conexion.execute(
+            "INSERT INTO Usuarios (cedula, nombre, telefono) VALUES ('100000000', 'Benchmark', '00000000')"
+        )
+        conexion.executemany(
+            "INSERT INTO EspaciosFila (numero_espacio, capacidad) VALUES (?, ?)",
+            ((f"F{i:05d}", CAPACIDAD) for i in range(1, espacios + 1))
+        )
+        conexion.executemany(
+            "INSERT INTO Vehiculos (placa, marca, modelo, id_usuario) VALUES (?, 'Marca', 'Modelo', 1)",
+            ((f"B{i:06d}",) for i in range(1, vehiculos + 1))
+        )
+
+        # Vehículos 1..espacios*ocupacion quedan estacionados, fila por fila
+        conexion.executemany(
+            "INSERT INTO PilaVehiculos (id_espacio_fila, id_vehiculo, posicion) VALUES (?, ?, ?)",
+            ((fila, (fila - 1) * ocupacion + posicion, posicion)
+             for fila in range(1, espacios + 1) for posicion in range(1, ocupacion + 1))
+        )
+        siguiente = espacios * ocupacion + 1
+
+        conexion.executemany(
+            "INSERT INTO ListaEspera (id_vehiculo) VALUES (?)",
+            ((id_vehiculo,) for id_vehiculo in range(siguiente, siguiente + en_espera))
+        )
+        siguiente += en_espera
+
+        conexion.executemany(
+            """INSERT INTO MovimientosTemporales (id_vehiculo, id_espacio_fila, posicion_origen)
+               VALUES (?, ?, ?)""",
+            ((siguiente + (fila - 1) * salidas_por_fila + posicion - 1, fila, ocupacion + posicion)
+             for fila in range(1, espacios + 1) for posicion in range(1, salidas_por_fila + 1))
+        )
+        conexion.commit()
+    finally:
+        conexion.close()
+
+
+def escenario_dashboard(ruta, aplicacion, espacios, cantidad):
+    """GET / con la caché invalidada antes de cada solicitud (fragmentos reutilizados)."""
+    sembrar(ruta, espacios, CAPACIDAD - 1, espacios * CAPACIDAD)
+
+    def solicitud(cliente, i):
+        aplicacion.cache_dashboard.invalidar()
+        return cliente.get('/')
+    return solicitud, cantidad
+
+
+def escenario_dashboard_sin_fragmentos(ruta, aplicacion, espacios, cantidad):
+    """GET / con la caché y los fragmentos descartados antes de cada solicitud."""
+    sembrar(ruta, espacios, CAPACIDAD - 1, espacios * CAPACIDAD)
+
+    def solicitud(cliente, i):
+        aplicacion.cache_dashboard.invalidar()
+        aplicacion.cache_fragmentos.vaciar()
+        return cliente.get('/')
+    return solicitud, cantidad
+
+
+def escenario_dashboard_cache(ruta, aplicacion, espacios, cantidad):
+    """GET / servido desde la caché del dashboard."""
+    sembrar(ruta, espacios, CAPACIDAD - 1, espacios * CAPACIDAD)
+    return (lambda cliente, i: cliente.get('/')), cantidad
+
+
+def escenario_estacionar(ruta, aplicacion, espacios, cantidad):
+    """POST /fila/estacionar de vehículos nuevos en filas con espacio."""
+    cantidad = min(cantidad, espacios * CAPACIDAD)
+    sembrar(ruta, espacios, 0, cantidad)
+
+    def solicitud(cliente, i):
+        return cliente.post('/fila/estacionar', data={
+            'id_espacio_fila': i % espacios + 1,
+            'id_vehiculo': i + 1,
+        })
+    return solicitud, cantidad
+
+
+def escenario_mover(ruta, aplicacion, espacios, cantidad):
+    """POST /fila/mover del vehículo en el tope de filas llenas."""
+    cantidad = min(cantidad, espacios * CAPACIDAD)
+    sembrar(ruta, espacios, CAPACIDAD, espacios * CAPACIDAD)
+
+    def solicitud(cliente, i):
+        fila = i % espacios + 1
+        return cliente.post('/fila/mover', data={
+            'id_espacio_fila': fila,
+            'id_vehiculo': aplicacion.motor_pilas.tope(fila),
+        })
+    return solicitud, cantidad
+
+
+def escenario_procesar(ruta, aplicacion, espacios, cantidad):
+    """
+    GET /lista_espera/procesar con una solicitud pendiente y filas libres.
+    Cada solicitud drena toda la lista, así que antes de cada una (fuera de
+    la medición) se agrega un pendiente nuevo.
+    """
+    cantidad = min(cantidad, espacios)
+    primero = espacios * (CAPACIDAD - 1) + 1
+    sembrar(ruta, espacios, CAPACIDAD - 1, primero - 1 + cantidad)
+
+    def encolar(i):
+        conexion = sqlite3.connect(ruta)
+        try:
+            conexion.execute("INSERT INTO ListaEspera (id_vehiculo) VALUES (?)", (primero + i,))
+            conexion.commit()
+        finally:
+            conexion.close()
+    return (lambda cliente, i: cliente.get('/lista_espera/procesar')), cantidad, encolar
+
+
+def escenario_retornar(ruta, aplicacion, espacios, cantidad):
+    """GET /fila/retornar/<id> re-apilando una salida temporal por fila."""
+    cantidad = min(cantidad, espacios)
+    sembrar(ruta, espacios, CAPACIDAD - 1, espacios * CAPACIDAD, salidas_por_fila=1)
+    return (lambda cliente, i: cliente.get(f'/fila/retornar/{i + 1}')), cantidad
+
+
+# Escenarios que renderizan el dashboard completo
+ESCENARIOS_DASHBOARD = ('dashboard', 'dashboard_sin_fragmentos', 'dashboard_cache')
+
+ESCENARIOS = {
+    'dashboard': escenario_dashboard,
+    'dashboard_sin_fragmentos': escenario_dashboard_sin_fragmentos,
+    'dashboard_cache': escenario_dashboard_cache,
+    'estacionar': escenario_estacionar,
+    'mover': escenario_mover,
+    'procesar': escenario_procesar,
+    'retornar': escenario_retornar,
+}
+
+
+def percentil(valores: list, p: int) -> float:
+    """Devuelve el percentil p (1-99) de una lista de valores."""
+    if len(valores) == 1:
+        return valores[0]
+    return statistics.quantiles(valores, n=100, method='inclusive')[p - 1]
+
+
+def ejecutar_escenario(nombre, ruta, aplicacion, medidor, espacios, solicitudes,
+                       calentamiento, tiempo_maximo=None):
+    """
+    Siembra la base, recarga el estado en memoria y mide un escenario.
+    Deja de medir cuando se supera tiempo_maximo (segundos), si se indica.
+    Un escenario puede devolver además una función antes(i) que prepara
+    cada solicitud sin contar en su tiempo ni en sus consultas.
+
+    Returns:
+        dict: Resultado del escenario
+    """
+    preparar, cantidad, *antes = ESCENARIOS[nombre](ruta, aplicacion, espacios, solicitudes + calentamiento)
+    antes = antes[0] if antes else (lambda i: None)
+    aplicacion.motor_pilas.cargar()
+    aplicacion.cache_dashboard.invalidar()
+
+    cliente = aplicacion.app.test_client()
+    calentamiento = min(calentamiento, cantidad // 2)
+    inicio = time.perf_counter()
+    for i in range(calentamiento):
+        antes(i)
+        preparar(cliente, i)
+        if tiempo_maximo is not None and time.perf_counter() - inicio > tiempo_maximo:
+            calentamiento = i + 1
+            break
+
+    latencias = []
+    medidor.reiniciar()
+    inicio = time.perf_counter()
+    pausa = 0.0
+    for i in range(calentamiento, cantidad):
+        consultas, t0 = medidor.total, time.perf_counter()
+        antes(i)
+        medidor.total, t1 = consultas, time.perf_counter()
+        pausa += t1 - t0
+        respuesta = preparar(cliente, i)
+        latencias.append((time.perf_counter() - t1) * 1000)
+        if respuesta.status_code >= 400:
+            raise RuntimeError(f"{nombre}: respuesta {respuesta.status_code} en la solicitud {i}")
+        if tiempo_maximo is not None and time.perf_counter() - inicio > tiempo_maximo:
+            break
+    duracion = time.perf_counter() - inicio - pausa
+
+    return {
+        'escenario': nombre,
+        'espacios': espacios,
+        'solicitudes': len(latencias),
+        'p50_ms': round(percentil(latencias, 50), 3),
+        'p95_ms': round(percentil(latencias, 95), 3),
+        'p99_ms': round(percentil(latencias, 99), 3),
+        'media_ms': round(statistics.fmean(latencias), 3),
+        'max_ms': round(max(latencias), 3),
+        'rendimiento_rps': round(len(latencias) / duracion, 1),
+        'consultas_por_solicitud': round(medidor.total / len(latencias), 2),
+    }
+
+
+def commit_actual() -> str:
+    """Devuelve el commit de git actual o None si no se puede obtener."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def imprimir_tabla(resultados: list, base: dict = None):
+    """Imprime los resultados y, si hay base, la variación del p50."""
+    encabezado = f"{'escenario':<26}{'espacios':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'SQL/req':>9}"
+    if base:
+        encabezado += f"{'Δ p50':>10}"
+    print(encabezado)
+    for r in resultados:
+        linea = (f"{r['escenario']:<26}{r['espacios']:>9}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}"
+                 f"{r['p99_ms']:>10.3f}{r['rendimiento_rps']:>10.1f}{r['consultas_por_solicitud']:>9.2f}")
+        anterior = base.get((r['escenario'], r['espacios'])) if base else None
+        if anterior:
+            linea += f"{(r['p50_ms'] / anterior['p50_ms'] - 1) * 100:>+9.1f}%"
+        print(linea)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de las rutas del sistema de parqueo")
+    parser.add_argument('--espacios', type=int, nargs='+', default=[10, 100, 1000],
+                        help="Tamaños de parqueo (cantidad de EspaciosFila), de 10 a 10000")
+    parser.add_argument('--escenarios', nargs='+', choices=list(ESCENARIOS), default=list(ESCENARIOS))
+    parser.add_argument('--solicitudes', type=int, default=200, help="Solicitudes medidas por escenario")
+    parser.add_argument('--calentamiento', type=int, default=10, help="Solicitudes previas sin medir")
+    parser.add_argument('--tiempo-maximo', type=float, default=30.0,
+                        help="Segundos máximos de medición por escenario")
+    parser.add_argument('--max-espacios-dashboard', type=int, default=1000,
+                        help="Tamaño máximo con el que se ejecutan los escenarios de dashboard")
+    parser.add_argument('--salida', help="Archivo JSON de resultados (por defecto benchmarks/resultados/<commit>.json)")
+    parser.add_argument('--comparar', help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix='parqueo-bench-')
+    ruta = os.path.join(directorio, 'bench.db')
+    medidor = MedidorConsultas()
+    configurar_almacenamiento(ruta, medidor)
+    aplicacion = cargar_aplicacion()
+
+    resultados = []
+    for espacios in args.espacios:
+        for nombre in args.escenarios:
+            if nombre in ESCENARIOS_DASHBOARD and espacios > args.max_espacios_dashboard:
+                print(f"  {nombre} ({espacios} espacios): omitido, supera --max-espacios-dashboard",
+                      file=sys.stderr)
+                continue
+            resultado = ejecutar_escenario(nombre, ruta, aplicacion, medidor, espacios,
+                                           args.solicitudes, args.calentamiento,
+                                           args.tiempo_maximo)
+            resultados.append(resultado)
+            print(f"  {nombre} ({espacios} espacios): p50 {resultado['p50_ms']} ms", file=sys.stderr)
+
+    commit = commit_actual()
+    informe = {
+        'commit': commit,
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'backend': 'sqlite',
+        'resultados': resultados,
+    }
+
+    salida = args.salida or os.path.join(RAIZ, 'benchmarks', 'resultados', f"{commit or 'actual'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as archivo:
+        json.dump(informe, archivo, indent=2, ensure_ascii=False)
+
+    base = None
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            base = {(r['escenario'], r['espacios']): r for r in json.load(archivo)['resultados']}
+
+    imprimir_tabla(resultados, base)
+    print(f"\nResultados guardados en {salida}")
+
+
+if __name__ == '__main__':
+    main()
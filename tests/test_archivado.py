@@ -0,0 +1,98 @@
+"""
+Pruebas del archivado por lotes del historial de la lista de espera y de
+las salidas temporales, y de los reportes que unen las tablas activas con
+las de archivo.
+"""
+import unittest
+from datetime import datetime
+from app.archivado import ArchivadorHistorial
+from app.models.lista_espera import GestorListaEspera
+from app.models.salidas_temporales import GestorSalidasTemporales
+from tests.utilidades import PruebaSQLite
+
+ANTES_DE = datetime(2026, 6, 1)
+COLUMNAS_ESPERA = "id_espera, id_vehiculo, fecha_solicitud, estado"
+COLUMNAS_MOVIMIENTOS = "id_movimiento, id_vehiculo, id_espacio_fila, posicion_origen, fecha_movimiento, fecha_retorno"
+
+
+class PruebaArchivado(PruebaSQLite):
+    """Historial con más de un lote para archivar."""
+
+    def setUp(self):
+        super().setUp()
+        self.gestor_espera = GestorListaEspera()
+        self.gestor_salidas = GestorSalidasTemporales()
+        # Lista de espera: 7 finalizados antiguos, 2 pendientes antiguos y 2 finalizados recientes
+        for dia in range(1, 12):
+            estado = 'pendiente' if dia in (3, 8) else ('cancelado' if dia % 4 == 0 else 'atendido')
+            fecha = f"2026-{'01' if dia <= 9 else '07'}-{dia:02d} 08:00:00"
+            self.ejecutar("INSERT INTO ListaEspera (id_vehiculo, fecha_solicitud, estado) VALUES (?, ?, ?)",
+                          (dia, fecha, estado))
+        # Movimientos: 5 retornados antiguos, 1 pendiente antiguo y 1 retornado reciente
+        for dia in range(1, 8):
+            retorno = None if dia == 4 else f"2026-{'02' if dia <= 6 else '07'}-{dia:02d} 09:00:00"
+            self.ejecutar("INSERT INTO MovimientosTemporales "
+                          "(id_vehiculo, id_espacio_fila, posicion_origen, fecha_movimiento, fecha_retorno) "
+                          "VALUES (?, 1, 2, ?, ?)", (dia, f"2026-02-{dia:02d} 08:00:00", retorno))
+        self.espera_inicial = self.consultar(f"SELECT {COLUMNAS_ESPERA} FROM ListaEspera ORDER BY id_espera")
+        self.movimientos_iniciales = self.consultar(
+            f"SELECT {COLUMNAS_MOVIMIENTOS} FROM MovimientosTemporales ORDER BY id_movimiento")
+
+    def archivar(self, lote: int = 3) -> dict:
+        return ArchivadorHistorial(self.gestor_espera, self.gestor_salidas, lote=lote).archivar(ANTES_DE)
+
+    def test_archiva_en_varios_lotes_sin_perder_registros(self):
+        self.assertEqual(self.archivar(), {'lista_espera': 7, 'movimientos_temporales': 5})
+
+        activos = self.consultar(f"SELECT {COLUMNAS_ESPERA} FROM ListaEspera ORDER BY id_espera")
+        archivados = self.consultar(f"SELECT {COLUMNAS_ESPERA} FROM ListaEsperaHistorico ORDER BY id_espera")
+        self.assertEqual(sorted(activos + archivados), self.espera_inicial)
+        self.assertEqual([row[0] for row in activos], [3, 8, 10, 11])
+        self.assertTrue(all(estado != 'pendiente' for *_, estado in archivados))
+
+        activos = self.consultar(f"SELECT {COLUMNAS_MOVIMIENTOS} FROM MovimientosTemporales ORDER BY id_movimiento")
+        archivados = self.consultar(
+            f"SELECT {COLUMNAS_MOVIMIENTOS} FROM MovimientosTemporalesHistorico ORDER BY id_movimiento")
+        self.assertEqual(sorted(activos + archivados), self.movimientos_iniciales)
+        self.assertEqual([row[0] for row in activos], [4, 7])
+
+    def test_no_toca_los_pendientes(self):
+        pendientes = "SELECT * FROM ListaEspera WHERE estado = 'pendiente' ORDER BY id_espera"
+        temporales = "SELECT * FROM MovimientosTemporales WHERE fecha_retorno IS NULL"
+        antes = self.consultar(pendientes), self.consultar(temporales)
+        self.archivar()
+        self.assertEqual((self.consultar(pendientes), self.consultar(temporales)), antes)
+        self.assertEqual(self.gestor_espera.contar_pendientes(), 2)
+
+    def test_cada_lote_mueve_los_mas_antiguos(self):
+        self.assertEqual(self.gestor_espera.archivar_finalizados(ANTES_DE, 3), 3)
+        self.assertEqual(self.consultar("SELECT id_espera FROM ListaEsperaHistorico ORDER BY id_espera"),
+                         [(1,), (2,), (4,)])
+        self.assertEqual(self.gestor_salidas.archivar_retornados(ANTES_DE, 2), 2)
+        self.assertEqual(self.consultar("SELECT id_movimiento FROM MovimientosTemporalesHistorico"),
+                         [(1,), (2,)])
+
+    def test_archivar_de_nuevo_no_mueve_nada(self):
+        self.archivar()
+        self.assertEqual(self.archivar(), {'lista_espera': 0, 'movimientos_temporales': 0})
+
+    def test_el_historial_incluye_los_archivados(self):
+        esperado_espera = [row[0] for row in reversed(self.espera_inicial) if row[3] != 'pendiente']
+        esperado_movimientos = [row[0] for row in reversed(self.movimientos_iniciales) if row[5] is not None]
+        self.archivar()
+
+        self.assertEqual([item.id for item in self.gestor_espera.obtener_historial(limite=100)],
+                         esperado_espera)
+        self.assertEqual([movimiento.id for movimiento in self.gestor_salidas.obtener_historial(limite=100)],
+                         esperado_movimientos)
+
+        archivado = self.gestor_espera.obtener_historial(id_vehiculo=2)
+        self.assertEqual([(item.id, item.estado, item.placa) for item in archivado], [(2, 'atendido', 'P0002')])
+        recientes = self.gestor_espera.obtener_historial(desde=ANTES_DE)
+        self.assertEqual([item.id for item in recientes], [11, 10])
+        movimientos = self.gestor_salidas.obtener_historial(id_vehiculo=1)
+        self.assertEqual([(movimiento.id, movimiento.placa) for movimiento in movimientos], [(1, 'P0001')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+Pruebas de la restauración del motor de pilas desde la bitácora de eventos:
+sólo se usa si coincide exactamente con la base de datos.
+"""
+import os
+import unittest
+from app import bitacora
+from app.models.pila_vehiculos import MotorPilas
+from tests.utilidades import PruebaSQLite
+
+
+class PruebaRestauracionBitacora(PruebaSQLite):
+    """Arranque del motor con una bitácora que puede no coincidir con la base."""
+
+    def setUp(self):
+        super().setUp()
+        self.carpeta = os.path.join(self.directorio, 'bitacora')
+        self.abrir_bitacora()
+        motor = self.motor()
+        for id_espacio_fila, vehiculos in ((1, (6, 9, 10)), (2, (2, 5, 8))):
+            for id_vehiculo in vehiculos:
+                self.assertTrue(motor.estacionar(id_espacio_fila, id_vehiculo))
+        self.reiniciar()
+
+    def tearDown(self):
+        self.bitacora.cerrar()
+        bitacora.bitacoras.fijar(self.clave, None)
+        super().tearDown()
+
+    def abrir_bitacora(self):
+        self.bitacora = bitacora.Bitacora(self.carpeta)
+        bitacora.bitacoras.fijar(self.clave, self.bitacora)
+
+    def reiniciar(self):
+        """Cierra y vuelve a abrir la bitácora, como al reiniciar el proceso."""
+        self.bitacora.cerrar()
+        self.abrir_bitacora()
+        self.assertTrue(self.bitacora.tiene_base)
+
+    def test_restaura_si_coincide(self):
+        self.assertTrue(MotorPilas()._restaurar_desde_bitacora())
+        self.assertEqual(self.pilas_motor(self.motor()), {1: [6, 9, 10], 2: [2, 5, 8]})
+
+    def test_intercambio_con_las_mismas_sumas_carga_la_base(self):
+        # (fila 1, posición 2) <-> (fila 2, posición 1): 1 + 2 == 2 + 1
+        self.ejecutar("UPDATE PilaVehiculos SET id_vehiculo = 0 WHERE id_vehiculo = 9")
+        self.ejecutar("UPDATE PilaVehiculos SET id_vehiculo = 9 WHERE id_vehiculo = 2")
+        self.ejecutar("UPDATE PilaVehiculos SET id_vehiculo = 2 WHERE id_vehiculo = 0")
+        self.assertEqual(self.pilas(), {1: [6, 2, 10], 2: [9, 5, 8]})
+
+        self.assertFalse(MotorPilas()._restaurar_desde_bitacora())
+        self.assertEqual(self.pilas_motor(self.motor()), {1: [6, 2, 10], 2: [9, 5, 8]})
+
+    def test_orden_distinto_en_la_fila_carga_la_base(self):
+        self.ejecutar("UPDATE PilaVehiculos SET posicion = 4 - posicion WHERE id_espacio_fila = 1")
+        self.assertFalse(MotorPilas()._restaurar_desde_bitacora())
+        self.assertEqual(self.pilas_motor(self.motor()), {1: [10, 9, 6], 2: [2, 5, 8]})
+
+    def test_numero_de_espacio_distinto_carga_la_base(self):
+        self.ejecutar("UPDATE EspaciosFila SET numero_espacio = 'Z999' WHERE id_espacio_fila = 3")
+        self.assertFalse(MotorPilas()._restaurar_desde_bitacora())
+        self.assertEqual(self.motor().obtener_fila(3).numero_espacio, 'Z999')
+
+    def test_espera_y_salidas_temporales_distintas_cargan_la_base(self):
+        self.ejecutar("INSERT INTO ListaEspera (id_vehiculo) VALUES (11)")
+        self.assertFalse(MotorPilas()._restaurar_desde_bitacora())
+        self.ejecutar("DELETE FROM ListaEspera")
+        self.ejecutar("INSERT INTO MovimientosTemporales (id_vehiculo, id_espacio_fila, posicion_origen) "
+                      "VALUES (12, 1, 2)")
+        self.assertFalse(MotorPilas()._restaurar_desde_bitacora())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Pruebas de los archivos estáticos con huella (ActivosEstaticos): construcción
+del manifiesto, elección de la variante comprimida según Accept-Encoding,
+cabeceras de caché y rechazo de nombres sin huella o fuera del destino.
+Usan una aplicación Flask mínima y carpetas temporales.
+
+Ejecutar con:
+    python -m pytest -q tests
+"""
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from flask import Flask
+from werkzeug.exceptions import NotFound
+from app.estaticos import MANIFIESTO, UN_ANO, ActivosEstaticos, nombre_con_huella
+
+CSS = b"body { margin: 0; padding: 0; }\n" * 40
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256))
+
+
+class PruebaActivosEstaticos(unittest.TestCase):
+    """Pruebas de la construcción y del servicio de /activos/."""
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp(prefix='parqueo-estaticos-')
+        self.origen = os.path.join(self.directorio, 'static')
+        self.destino = os.path.join(self.directorio, 'dist')
+        self.escribir_origen('css/style.css', CSS)
+        self.escribir_origen('img/parqueo.png', PNG)
+
+        self.activos = ActivosEstaticos(self.origen, self.destino)
+        self.manifiesto = self.activos.construir()
+        self.app = Flask(__name__)
+        self.activos.registrar(self.app)
+        self.cliente = self.app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.directorio, ignore_errors=True)
+
+    def escribir_origen(self, nombre: str, datos: bytes):
+        """Escribe (o reemplaza) un archivo original."""
+        ruta = os.path.join(self.origen, nombre)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, 'wb') as salida:
+            salida.write(datos)
+
+    def pedir(self, nombre: str, codificacion: str = None):
+        """Pide un activo, con Accept-Encoding si se indica."""
+        cabeceras = {'Accept-Encoding': codificacion} if codificacion is not None else {}
+        return self.cliente.get(f'/activos/{nombre}', headers=cabeceras)
+
+    def test_construir_escribe_huella_y_variante_gzip_solo_de_texto(self):
+        css = self.manifiesto['css/style.css']
+        png = self.manifiesto['img/parqueo.png']
+        self.assertEqual(css, nombre_con_huella('css/style.css', CSS))
+        self.assertTrue(os.path.isfile(os.path.join(self.destino, css + '.gz')))
+        self.assertFalse(os.path.exists(os.path.join(self.destino, png + '.gz')))
+        self.assertIn('gzip', self.activos.codificaciones(css))
+        self.assertEqual(self.activos.codificaciones(png), [])
+
+    def test_url_usa_la_huella_o_static_sin_manifiesto(self):
+        with self.app.test_request_context():
+            self.assertEqual(self.activos.url('css/style.css'),
+                             '/activos/' + self.manifiesto['css/style.css'])
+            self.assertEqual(self.activos.url('js/otro.js'), '/static/js/otro.js')
+
+    def test_sirve_gzip_si_el_cliente_lo_acepta(self):
+        respuesta = self.pedir(self.manifiesto['css/style.css'], 'gzip, deflate')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(respuesta.mimetype, 'text/css')
+        self.assertEqual(gzip.decompress(respuesta.data), CSS)
+        respuesta.close()
+
+    def test_sirve_sin_comprimir_si_el_cliente_no_acepta_gzip(self):
+        for codificacion in (None, 'identity', 'gzip;q=0, br;q=0'):
+            with self.subTest(codificacion=codificacion):
+                respuesta = self.pedir(self.manifiesto['css/style.css'], codificacion)
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertNotIn('Content-Encoding', respuesta.headers)
+                self.assertEqual(respuesta.data, CSS)
+                respuesta.close()
+
+    def test_cabeceras_vary_y_cache_immutable(self):
+        for nombre in self.manifiesto.values():
+            with self.subTest(nombre=nombre):
+                respuesta = self.pedir(nombre, 'gzip')
+                self.assertIn('Accept-Encoding', respuesta.vary)
+                self.assertTrue(respuesta.cache_control.public)
+                self.assertTrue(respuesta.cache_control.immutable)
+                self.assertEqual(respuesta.cache_control.max_age, UN_ANO)
+                respuesta.close()
+
+    def test_sirve_huellas_de_construcciones_anteriores(self):
+        anterior = self.manifiesto['css/style.css']
+        nuevo_css = CSS + b"a { color: red; }\n" * 40
+        self.escribir_origen('css/style.css', nuevo_css)
+        manifiesto = self.activos.construir()
+
+        self.assertNotEqual(manifiesto['css/style.css'], anterior)
+        self.assertNotIn(anterior, manifiesto.values())
+        respuesta = self.pedir(anterior, 'gzip')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(respuesta.data), CSS)
+        self.assertTrue(respuesta.cache_control.immutable)
+        respuesta.close()
+
+        respuesta = self.pedir(manifiesto['css/style.css'])
+        self.assertEqual(respuesta.data, nuevo_css)
+        respuesta.close()
+
+    def test_rechaza_nombres_sin_huella(self):
+        for nombre in ('css/style.css', MANIFIESTO, 'css/style.0123456789ab.css'):
+            with self.subTest(nombre=nombre):
+                self.assertEqual(self.pedir(nombre, 'gzip').status_code, 404)
+
+    def test_rechaza_salir_del_destino(self):
+        fuera = 'secreto.0123456789ab.css'
+        with open(os.path.join(self.directorio, fuera), 'wb') as salida:
+            salida.write(CSS)
+        with self.app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+            for nombre in ('../' + fuera, 'css/../../' + fuera):
+                with self.subTest(nombre=nombre):
+                    with self.assertRaises(NotFound):
+                        self.activos.servir(nombre)
+
+    def test_cargar_sin_manifiesto_no_sirve_nada(self):
+        activos = ActivosEstaticos(self.origen, os.path.join(self.directorio, 'vacio'))
+        activos.cargar()
+        with self.app.test_request_context():
+            self.assertEqual(activos.url('css/style.css'), '/static/css/style.css')
+            with self.assertRaises(NotFound):
+                activos.servir(self.manifiesto['css/style.css'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+Pruebas del mapa de ocupación compartido: dos motores de pilas sobre el
+mismo bloque (como dos procesos), el seqlock de las lecturas y el rechazo
+de filas que no caben en las ranuras.
+"""
+import itertools
+import os
+import tempfile
+import unittest
+from unittest import mock
+from app import ocupacion_compartida
+from app.ocupacion_compartida import OcupacionCompartida
+from tests.utilidades import PruebaSQLite
+
+_contador = itertools.count()
+
+
+def nombre_bloque() -> str:
+    """Nombre de bloque único para la prueba."""
+    return f"pq-prueba-{os.getpid()}-{next(_contador)}"
+
+
+def borrar_bloqueo(nombre: str):
+    """Borra el archivo de bloqueo que deja el bloque en la carpeta temporal."""
+    try:
+        os.remove(os.path.join(tempfile.gettempdir(), f"{nombre}.lock"))
+    except OSError:
+        pass
+
+
+class PruebaBloque(unittest.TestCase):
+    """Escrituras y lecturas sobre el bloque compartido."""
+
+    def setUp(self):
+        self.mapa = OcupacionCompartida(nombre_bloque(), filas_maximas=4, vehiculos_por_fila=3)
+        self.otro = OcupacionCompartida(self.mapa.nombre)
+
+    def tearDown(self):
+        self.otro.cerrar()
+        self.mapa.destruir()
+        borrar_bloqueo(self.mapa.nombre)
+
+    def test_otro_proceso_abre_el_formato_del_creador(self):
+        self.assertEqual((self.otro.filas_maximas, self.otro.vehiculos_por_fila), (4, 3))
+
+    def test_lee_solo_las_filas_con_otra_version(self):
+        generacion = self.mapa.publicar([(1, 3, [10, 11]), (2, 3, [])])
+        self.assertEqual(generacion % 2, 0)
+        leida, cambios = self.otro.leer_cambios({})
+        self.assertEqual(leida, generacion)
+        self.assertEqual(cambios, {1: (generacion, 3, [10, 11]), 2: (generacion, 3, [])})
+
+        nueva = self.mapa.publicar([(2, 3, [12])])
+        self.assertEqual(self.otro.leer_cambios({1: generacion, 2: generacion}),
+                         (nueva, {2: (nueva, 3, [12])}))
+
+    def test_pila_mayor_que_la_ranura_se_rechaza_sin_escribir(self):
+        generacion = self.mapa.publicar([(1, 3, [10])])
+        with self.assertRaises(ValueError):
+            self.mapa.publicar([(2, 3, [20]), (1, 4, [10, 11, 12, 13])])
+        self.assertEqual(self.mapa.generacion, generacion)
+        self.assertEqual(self.otro.leer_cambios({})[1], {1: (generacion, 3, [10])})
+
+    def test_sin_ranuras_libres_se_rechaza_sin_escribir(self):
+        self.mapa.publicar([(fila, 3, []) for fila in range(1, 5)])
+        generacion = self.mapa.generacion
+        with self.assertRaises(ValueError):
+            self.mapa.publicar([(5, 3, [])])
+        self.assertEqual(self.mapa.generacion, generacion)
+
+    def test_admite(self):
+        self.assertTrue(self.mapa.admite([(1, 3), (2, 2)]))
+        self.assertFalse(self.mapa.admite([(1, 4)]))
+        self.assertFalse(self.mapa.admite([(fila, 3) for fila in range(1, 6)]))
+
+    def test_lectura_interrumpida_se_repite(self):
+        self.mapa.publicar([(1, 3, [10])])
+        leer = self.otro._leer
+        llamadas = []
+
+        def leer_con_escritura(versiones):
+            llamadas.append(versiones)
+            resultado = leer(versiones)
+            if len(llamadas) == 1:
+                self.mapa.publicar([(1, 3, [10, 11])])  # Un escritor cambia el bloque a mitad de la lectura
+            return resultado
+
+        with mock.patch.object(self.otro, '_leer', leer_con_escritura):
+            generacion, cambios = self.otro.leer_cambios({})
+        self.assertEqual(len(llamadas), 2)
+        self.assertEqual(cambios[1][2], [10, 11])
+        self.assertEqual(generacion, self.mapa.generacion)
+
+    def test_escritura_inconclusa_lee_con_el_bloqueo(self):
+        self.mapa.publicar([(1, 3, [10])])
+        generacion = self.mapa.generacion
+        # Generación impar: un escritor quedó a mitad de su escritura
+        ocupacion_compartida.GENERACION.pack_into(self.mapa._memoria.buf, ocupacion_compartida.POSICION_GENERACION,
+                                                  generacion + 1)
+        with mock.patch.object(ocupacion_compartida, 'ESPERA_LECTURA', 0), \
+                mock.patch.object(self.otro._bloqueo, 'adquirir', wraps=self.otro._bloqueo.adquirir) as adquirir:
+            leida, cambios = self.otro.leer_cambios({})
+        adquirir.assert_called_once()
+        self.assertEqual(leida, generacion + 1)
+        self.assertEqual(cambios[1][2], [10])
+
+
+class PruebaMotoresCompartidos(PruebaSQLite):
+    """Dos motores de pilas, como dos procesos, sobre la misma base y el mismo bloque."""
+
+    def setUp(self):
+        super().setUp()
+        self.nombre = nombre_bloque()
+        self.mapas = []
+
+    def tearDown(self):
+        for mapa in self.mapas:
+            mapa.cerrar()
+        OcupacionCompartida(self.nombre).destruir()
+        borrar_bloqueo(self.nombre)
+        super().tearDown()
+
+    def motor_compartido(self, vehiculos_por_fila: int = 3):
+        mapa = OcupacionCompartida(self.nombre, filas_maximas=16, vehiculos_por_fila=vehiculos_por_fila)
+        self.mapas.append(mapa)
+        return self.motor(ocupacion=mapa)
+
+    def test_lo_estacionado_en_uno_lo_ve_elegir_fila_del_otro(self):
+        uno, otro = self.motor_compartido(), self.motor_compartido()
+        self.assertEqual(otro.elegir_fila(9), 1)
+        for id_vehiculo in (1, 2, 3):
+            self.assertTrue(uno.estacionar(1, id_vehiculo))
+
+        self.assertEqual(otro.elegir_fila(9), 2)
+        self.assertEqual(otro.obtener_fila(1).vehiculos, [1, 2, 3])
+        self.assertFalse(otro.estacionar(1, 9))
+        self.assertEqual(otro.ubicacion(2), 1)
+
+        self.assertTrue(otro.sacar(1, 2))
+        self.assertEqual(uno.obtener_fila(1).vehiculos, [1, 3])
+        self.assertFalse(uno.esta_estacionado(2))
+        self.assertEqual(self.pilas(), {1: [1, 3]})
+
+    def test_fila_mayor_que_la_ranura_deshabilita_el_mapa(self):
+        self.ejecutar("UPDATE EspaciosFila SET capacidad = 5 WHERE id_espacio_fila = 2")
+        motor = self.motor_compartido(vehiculos_por_fila=3)
+        self.assertIsNone(motor.ocupacion)
+
+        # Sin el mapa el motor sigue funcionando con la base de datos
+        for id_vehiculo in (1, 2, 3, 4, 5):
+            self.assertTrue(motor.estacionar(2, id_vehiculo))
+        self.assertEqual(self.pilas(), {2: [1, 2, 3, 4, 5]})
+
+
+if __name__ == '__main__':
+    unittest.main()
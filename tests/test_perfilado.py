@@ -0,0 +1,121 @@
+"""
+Pruebas del perfilado de solicitudes (PerfiladorSolicitudes): un solo perfil
+en curso por proceso y ninguna falla del perfilado llega a la solicitud.
+Usan una aplicación Flask mínima y una carpeta temporal.
+
+Ejecutar con:
+    python -m pytest -q tests
+"""
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from flask import Flask
+from app import perfilado
+from app.perfilado import PerfiladorSolicitudes, PerfilSolicitud
+
+CLAVE = 'clave-pruebas'
+
+
+class PruebaPerfilado(unittest.TestCase):
+    """Pruebas de los hooks de perfilado en una aplicación Flask."""
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp(prefix='parqueo-perfiles-')
+        self.perfilador = PerfiladorSolicitudes(self.directorio, clave=CLAVE)
+        self.app = Flask(__name__)
+        self.perfilador.registrar(self.app)
+        self.app.add_url_rule('/hola', 'hola', lambda: 'hola')
+        self.cliente = self.app.test_client()
+
+    def tearDown(self):
+        self.assertFalse(perfilado._perfil_en_curso.locked(), "el perfil quedó en curso")
+        shutil.rmtree(self.directorio, ignore_errors=True)
+
+    def pedir(self):
+        """Pide /hola con la cabecera de perfilado."""
+        return self.cliente.get('/hola', headers={'X-Perfilar': CLAVE})
+
+    def perfiles(self) -> list:
+        """Devuelve los archivos .prof guardados de la ruta /hola."""
+        carpeta = os.path.join(self.directorio, 'hola')
+        if not os.path.isdir(carpeta):
+            return []
+        return [nombre for nombre in os.listdir(carpeta) if nombre.endswith('.prof')]
+
+    def test_perfila_con_la_clave(self):
+        respuesta = self.pedir()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('X-Perfil', respuesta.headers)
+        self.assertEqual(len(self.perfiles()), 1)
+
+    def test_sin_clave_no_perfila(self):
+        respuesta = self.cliente.get('/hola', headers={'X-Perfilar': 'otra'})
+        self.assertNotIn('X-Perfil', respuesta.headers)
+        self.assertEqual(self.perfiles(), [])
+
+    def test_con_otro_perfil_en_curso_atiende_sin_perfilar(self):
+        en_curso = PerfilSolicitud('otra', os.path.join(self.directorio, 'otra'))
+        self.assertTrue(en_curso.iniciar())
+        try:
+            respuesta = self.pedir()
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertEqual(respuesta.data, b'hola')
+            self.assertNotIn('X-Perfil', respuesta.headers)
+            self.assertFalse(PerfilSolicitud('otra', en_curso.base).iniciar())
+        finally:
+            en_curso.terminar()
+
+        self.assertIn('X-Perfil', self.pedir().headers)
+
+    def test_solicitudes_simultaneas_en_hilos(self):
+        dentro, seguir = threading.Event(), threading.Event()
+        respuestas = {}
+
+        def lenta():
+            dentro.set()
+            seguir.wait(5)
+            return 'lenta'
+        self.app.add_url_rule('/lenta', 'lenta', lenta)
+
+        def pedir_lenta():
+            respuestas['lenta'] = self.app.test_client().get('/lenta', headers={'X-Perfilar': CLAVE})
+        hilo = threading.Thread(target=pedir_lenta)
+        hilo.start()
+        self.assertTrue(dentro.wait(5))
+        try:
+            respuestas['hola'] = self.pedir()
+        finally:
+            seguir.set()
+            hilo.join(5)
+
+        self.assertEqual(respuestas['hola'].status_code, 200)
+        self.assertNotIn('X-Perfil', respuestas['hola'].headers)
+        self.assertEqual(respuestas['lenta'].status_code, 200)
+        self.assertIn('X-Perfil', respuestas['lenta'].headers)
+
+    def test_falla_al_iniciar_no_afecta_la_solicitud(self):
+        with mock.patch('cProfile.Profile.enable', side_effect=ValueError("otro perfilador activo")):
+            respuesta = self.pedir()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn('X-Perfil', respuesta.headers)
+        self.assertIn('X-Perfil', self.pedir().headers)
+
+    def test_falla_al_guardar_no_afecta_la_solicitud(self):
+        with mock.patch('cProfile.Profile.dump_stats', side_effect=OSError("disco lleno")):
+            respuesta = self.pedir()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(self.perfiles(), [])
+        self.assertIn('X-Perfil', self.pedir().headers)
+
+    def test_falla_al_crear_la_carpeta_no_afecta_la_solicitud(self):
+        with mock.patch('os.makedirs', side_effect=OSError("sin permiso")):
+            respuesta = self.pedir()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn('X-Perfil', respuesta.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+"""
+Pruebas del motor de pilas en memoria (MotorPilas.en_memoria()): estacionar,
+sacar, extraer y retornar bloqueadores, más los invariantes de posición y
+capacidad de cada fila. No usan la base de datos.
+
+Ejecutar con:
+    python -m pytest -q tests
+"""
+import unittest
+from app.models.estancias import EstimadorEstancias
+from app.models.lista_espera import ListaEspera
+from app.models.pila_vehiculos import MotorPilas
+
+AHORA = 1_700_000_000.0
+HORA = 3600
+
+
+def espera(id_espera: int, id_vehiculo: int) -> ListaEspera:
+    """Crea un pendiente de la lista de espera con su ID ya asignado."""
+    elemento = ListaEspera(id_vehiculo)
+    elemento._id = id_espera
+    return elemento
+
+
+class PruebaMotorPilas(unittest.TestCase):
+    """Pruebas del motor de pilas sin persistencia."""
+
+    def setUp(self):
+        self.reloj = [AHORA]
+        self.motor = MotorPilas.en_memoria(3, capacidad=3, estimador=EstimadorEstancias(),
+                                           reloj=lambda: self.reloj[0])
+
+    def tearDown(self):
+        self.verificar_invariantes()
+
+    def verificar_invariantes(self):
+        """Comprueba que filas, ubicaciones e índices describan el mismo estado."""
+        ubicados = {}
+        for id_espacio_fila, fila in self.motor._filas.items():
+            self.assertLessEqual(fila.total, fila.capacidad)
+            for posicion, id_vehiculo in enumerate(fila.vehiculos, start=1):
+                self.assertNotIn(id_vehiculo, ubicados, "vehículo en dos filas")
+                ubicados[id_vehiculo] = id_espacio_fila
+                self.assertEqual(fila.posicion(id_vehiculo), posicion)
+        self.assertEqual(self.motor._ubicacion, ubicados)
+        self.assertEqual(self.motor.espacios_libres(),
+                         sum(fila.libres for fila in self.motor._filas.values()))
+        disponibles = [fila for fila in self.motor._filas.values() if not fila.llena]
+        primera = min(disponibles, key=lambda fila: fila.numero_espacio) if disponibles else None
+        self.assertEqual(self.motor.buscar_fila_disponible(),
+                         primera.id_espacio_fila if primera else None)
+
+    def llenar(self, id_espacio_fila: int, *ids_vehiculo: int):
+        """Estaciona los vehículos en la fila, del fondo al tope."""
+        for id_vehiculo in ids_vehiculo:
+            self.assertTrue(self.motor.estacionar(id_espacio_fila, id_vehiculo))
+
+    def test_estacionar_apila_del_fondo_al_tope(self):
+        self.llenar(1, 10, 11, 12)
+        fila = self.motor.obtener_fila(1)
+        self.assertEqual(fila.vehiculos, [10, 11, 12])
+        self.assertEqual(self.motor.tope(1), 12)
+        self.assertEqual(self.motor.ubicacion(11), 1)
+        self.assertFalse(self.motor.tiene_espacio(1))
+
+    def test_estacionar_rechaza_fila_llena_repetidos_y_filas_inexistentes(self):
+        self.llenar(1, 10, 11, 12)
+        self.assertFalse(self.motor.estacionar(1, 13))
+        self.assertFalse(self.motor.estacionar(2, 10))
+        self.assertFalse(self.motor.estacionar(99, 14))
+        self.assertIsNone(self.motor.ubicacion(13))
+        self.assertEqual(self.motor.obtener_fila(2).vehiculos, [])
+
+    def test_sacar_compacta_la_pila(self):
+        self.llenar(1, 10, 11, 12)
+        self.assertTrue(self.motor.sacar(1, 11))
+        self.assertEqual(self.motor.obtener_fila(1).vehiculos, [10, 12])
+        self.assertEqual(self.motor.obtener_fila(1).posicion(12), 2)
+        self.assertFalse(self.motor.esta_estacionado(11))
+        self.assertFalse(self.motor.sacar(1, 11))
+
+    def test_sacar_avisa_la_liberacion(self):
+        avisos = []
+        self.motor.suscribir_liberacion(lambda: avisos.append(True))
+        self.llenar(1, 10)
+        self.motor.sacar(1, 10)
+        self.assertEqual(avisos, [True])
+
+    def test_sacar_ensena_la_estancia_al_estimador(self):
+        self.llenar(1, 10)
+        self.reloj[0] += 2 * HORA
+        self.motor.sacar(1, 10)
+        self.assertAlmostEqual(self.motor.estimador.estimar(10), 2 * HORA)
+
+    def test_extraer_tope_no_mueve_a_nadie(self):
+        self.llenar(1, 10, 11)
+        plan = self.motor.extraer(11)
+        self.assertEqual(plan.bloqueadores, [])
+        self.assertEqual([paso.accion for paso in plan.pasos], ['salida'])
+        self.assertEqual(self.motor.obtener_fila(1).vehiculos, [10])
+
+    def test_extraer_retorna_bloqueadores_en_su_orden_original(self):
+        self.llenar(1, 10, 11, 12)
+        plan = self.motor.extraer(10)
+
+        self.assertEqual(plan.posicion, 1)
+        self.assertEqual(plan.bloqueadores, [12, 11])
+        self.assertEqual([(paso.accion, paso.id_vehiculo) for paso in plan.pasos],
+                         [('apartar', 12), ('apartar', 11), ('salida', 10),
+                          ('retorno', 11), ('retorno', 12)])
+        self.assertEqual(plan.movimientos, 5)
+        self.assertEqual(plan.retornados, [11, 12])
+        self.assertEqual(self.motor.obtener_fila(1).vehiculos, [11, 12])
+        self.assertFalse(self.motor.esta_estacionado(10))
+
+    def test_extraer_aparta_en_otras_filas_en_orden_de_espacio(self):
+        self.llenar(1, 10, 11, 12)
+        self.llenar(2, 20, 21)
+        plan = self.motor.planificar_extraccion(10)
+        apartados = [(paso.id_vehiculo, paso.destino) for paso in plan.pasos if paso.accion == 'apartar']
+        self.assertEqual(apartados, [(12, 2), (11, 3)])
+        retornos = [(paso.id_vehiculo, paso.origen) for paso in plan.pasos if paso.accion == 'retorno']
+        self.assertEqual(retornos, [(11, 3), (12, 2)])
+
+    def test_extraer_sin_espacio_aparta_fuera_del_parqueo(self):
+        self.llenar(1, 10, 11, 12)
+        self.llenar(2, 20, 21, 22)
+        self.llenar(3, 30, 31, 32)
+        plan = self.motor.extraer(11)
+        self.assertEqual([paso.destino for paso in plan.pasos if paso.accion == 'apartar'], [None])
+        self.assertEqual(self.motor.obtener_fila(1).vehiculos, [10, 12])
+
+    def test_extraer_sin_retornar_deja_bloqueadores_reubicados(self):
+        self.llenar(1, 10, 11, 12)
+        plan = self.motor.extraer(10, retornar=False)
+        self.assertEqual(plan.reubicados, {12: 2, 11: 2})
+        self.assertEqual(plan.retornados, [])
+        self.assertEqual(self.motor.obtener_fila(1).vehiculos, [])
+        self.assertEqual(self.motor.obtener_fila(2).vehiculos, [12, 11])
+        self.assertEqual(self.motor.ubicacion(11), 2)
+
+    def test_extraer_vehiculo_no_estacionado(self):
+        self.assertIsNone(self.motor.planificar_extraccion(10))
+        self.assertIsNone(self.motor.extraer(10))
+
+    def test_planificar_no_cambia_el_estado(self):
+        self.llenar(1, 10, 11, 12)
+        self.motor.planificar_extraccion(10)
+        self.assertEqual(self.motor.obtener_fila(1).vehiculos, [10, 11, 12])
+        self.assertEqual(self.motor.obtener_fila(2).vehiculos, [])
+
+    def test_retornar_sin_base_de_datos_no_hace_nada(self):
+        self.llenar(1, 10)
+        self.assertEqual(self.motor.retornar(None), 0)
+
+    def test_elegir_fila_no_entierra_a_quien_sale_antes(self):
+        self.assertTrue(self.motor.estacionar(1, 10, salida_estimada=AHORA + HORA))
+        self.assertTrue(self.motor.estacionar(2, 20, salida_estimada=AHORA + 5 * HORA))
+        self.assertEqual(self.motor.elegir_fila(30, AHORA + 4 * HORA), 2)
+        self.assertEqual(self.motor.elegir_fila(31, AHORA + 6 * HORA), 3)
+
+    def test_estacionar_lote_respeta_el_orden_y_la_capacidad(self):
+        self.llenar(1, 10, 11)
+        pendientes = [espera(indice, id_vehiculo)
+                      for indice, id_vehiculo in enumerate([11, 40, 41, 42, 43, 44, 45, 46, 47], start=1)]
+        estacionados = self.motor.estacionar_lote(pendientes)
+
+        self.assertEqual([id_vehiculo for id_vehiculo, _ in estacionados], [40, 41, 42, 43, 44, 45, 46])
+        self.assertEqual(self.motor.espacios_libres(), 0)
+        self.assertFalse(self.motor.esta_estacionado(47))
+        for id_vehiculo, id_espacio_fila in estacionados:
+            self.assertEqual(self.motor.ubicacion(id_vehiculo), id_espacio_fila)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Pruebas de las lecturas en la réplica y de la lectura de lo propio escrito:
+la réplica es una copia SQLite con query_only que se queda atrás de la
+primaria, así que una lectura que ve los cambios recientes fue a la primaria.
+"""
+import os
+import sqlite3
+import time
+import unittest
+from app import db_config
+from app.almacenamiento import BackendSQLite
+from app.models.lista_espera import GestorListaEspera, ListaEspera
+from tests.utilidades import PruebaAplicacion
+
+COOKIE = 'parqueo_escritura'
+
+
+class PruebaReplica(PruebaAplicacion):
+    """Elección entre réplica y primaria para las lecturas."""
+
+    def setUp(self):
+        super().setUp()
+        ruta_replica = os.path.join(self.directorio, 'replica.db')
+        origen, destino = sqlite3.connect(self.ruta), sqlite3.connect(ruta_replica)
+        origen.backup(destino)
+        origen.close()
+        destino.close()
+        self.configurar(replica=BackendSQLite(ruta_replica, solo_lectura=True))
+        self.gestor = GestorListaEspera()
+        # Sólo la primaria tiene este pendiente y esta solicitud atendida
+        self.ejecutar("INSERT INTO ListaEspera (id_vehiculo) VALUES (4)")
+        self.ejecutar("INSERT INTO ListaEspera (id_vehiculo, estado) VALUES (6, 'atendido')")
+
+    def tearDown(self):
+        db_config.recursos.obtener(self.clave).pool_lectura.cerrar()
+        super().tearDown()
+
+    def olvidar_escrituras(self):
+        """Simula que pasó PARQUEO_REPLICA_RETRASO o que la escritura fue en otro proceso."""
+        db_config.recursos.obtener(self.clave).ultima_escritura = 0.0
+
+    def pendientes(self, escritura_cliente: float = 0.0) -> int:
+        """Cuenta los pendientes en una unidad nueva, como lo haría una solicitud."""
+        db_config.iniciar_unidad_trabajo(escritura_cliente)
+        try:
+            return self.gestor.contar_pendientes()
+        finally:
+            db_config.finalizar_unidad_trabajo()
+
+    def vehiculos_en_espera(self, cliente) -> list:
+        """Vehículos atendidos o cancelados según la base donde leyó la solicitud."""
+        respuesta = cliente.get('/reportes/historial')
+        self.assertEqual(respuesta.status_code, 200)
+        return [registro['id_vehiculo'] for registro in respuesta.get_json()['registros']]
+
+    def test_sin_escrituras_lee_de_la_replica(self):
+        self.assertEqual(self.pendientes(), 0)
+
+    def test_la_replica_rechaza_escrituras(self):
+        conexion = db_config.recursos.obtener(self.clave).replica.conectar()
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                conexion.execute("INSERT INTO ListaEspera (id_vehiculo) VALUES (5)")
+        finally:
+            conexion.close()
+
+    def test_unidad_con_conexion_lee_de_la_primaria(self):
+        with db_config.transaccion():
+            db_config.get_conexion().cursor().execute("SELECT 1")
+            self.assertEqual(self.gestor.contar_pendientes(), 1)
+
+    def test_escritura_reciente_lee_de_la_primaria(self):
+        with db_config.transaccion():
+            self.assertTrue(self.gestor.crear(ListaEspera(5)))
+        self.assertEqual(self.pendientes(), 2)
+
+        self.olvidar_escrituras()
+        self.assertEqual(self.pendientes(), 0)
+
+    def test_unidad_de_solo_consultas_no_cuenta_como_escritura(self):
+        with db_config.transaccion():
+            cursor = db_config.get_conexion().cursor()
+            cursor.execute("SELECT COUNT(*) FROM ListaEspera")
+        self.assertEqual(db_config.recursos.obtener(self.clave).ultima_escritura, 0.0)
+        self.assertEqual(self.pendientes(), 0)
+
+    def test_escritura_revertida_no_cuenta(self):
+        with db_config.transaccion() as unidad:
+            self.assertTrue(self.gestor.crear(ListaEspera(5)))
+            unidad.marcar_fallida()
+        self.assertEqual(self.pendientes(), 0)
+
+    def test_escritura_del_cliente_lee_de_la_primaria(self):
+        self.assertEqual(self.pendientes(time.time()), 1)
+        self.assertEqual(self.pendientes(time.time() - 2 * db_config.RETRASO_REPLICA), 0)
+
+    def test_la_escritura_fija_la_cookie_y_las_lecturas_siguientes_van_a_la_primaria(self):
+        respuesta = self.cliente.post('/lista_espera/agregar', data={'id_vehiculo': 5})
+        self.assertEqual(respuesta.status_code, 302)
+        cookies = [cookie for cookie in respuesta.headers.getlist('Set-Cookie') if cookie.startswith(COOKIE)]
+        self.assertEqual(len(cookies), 1)
+        self.assertIn(f"Max-Age={int(db_config.RETRASO_REPLICA + 0.999)}", cookies[0])
+
+        # La siguiente solicitud la atiende un proceso que no vio la escritura
+        self.olvidar_escrituras()
+        self.assertEqual(self.vehiculos_en_espera(self.cliente), [6])
+        self.assertEqual(self.vehiculos_en_espera(self.aplicacion.app.test_client()), [])
+
+    def test_las_consultas_no_fijan_la_cookie(self):
+        respuesta = self.cliente.get('/reportes/historial')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse([cookie for cookie in respuesta.headers.getlist('Set-Cookie')
+                          if cookie.startswith(COOKIE)])
+        self.assertEqual(respuesta.get_json()['registros'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Pruebas del retorno por conjuntos de las salidas temporales
+(GestorSalidasTemporales.retornar_pendientes y MotorPilas.retornar)
+sobre una base SQLite.
+"""
+import functools
+import unittest
+from unittest import mock
+from app.models import base, salidas_temporales
+from app.models.salidas_temporales import GestorSalidasTemporales, SalidaTemporal
+from tests.utilidades import PruebaSQLite
+
+
+class PruebaRetornoPendientes(PruebaSQLite):
+    """Retorno de vehículos apartados temporalmente de sus filas."""
+
+    def setUp(self):
+        super().setUp()
+        self.gestor = GestorSalidasTemporales()
+        self.motor_pilas = self.motor()
+
+    def estacionar(self, id_espacio_fila: int, *ids_vehiculo: int):
+        for id_vehiculo in ids_vehiculo:
+            self.assertTrue(self.motor_pilas.estacionar(id_espacio_fila, id_vehiculo))
+
+    def apartar(self, id_vehiculo: int):
+        """Saca temporalmente el vehículo del tope de su fila, dejando el movimiento pendiente."""
+        id_espacio_fila = self.motor_pilas.ubicacion(id_vehiculo)
+        fila = self.motor_pilas.obtener_fila(id_espacio_fila)
+        self.assertEqual(fila.tope, id_vehiculo)
+        posicion = fila.posicion(id_vehiculo)
+        self.ejecutar("DELETE FROM PilaVehiculos WHERE id_vehiculo = ?", (id_vehiculo,))
+        self.assertTrue(self.gestor.crear(SalidaTemporal(id_vehiculo, id_espacio_fila, posicion)))
+        self.assertTrue(self.motor_pilas.cargar())
+
+    def pendientes(self) -> list:
+        return [row[0] for row in self.consultar(
+            "SELECT id_vehiculo FROM MovimientosTemporales WHERE fecha_retorno IS NULL ORDER BY id_vehiculo")]
+
+    def verificar_motor(self):
+        """El motor y PilaVehiculos deben tener las mismas pilas, con posiciones 1..n."""
+        self.assertEqual(self.pilas_motor(self.motor_pilas), self.pilas())
+        for id_espacio_fila, cantidad, maxima in self.consultar(
+                "SELECT id_espacio_fila, COUNT(*), MAX(posicion) FROM PilaVehiculos GROUP BY id_espacio_fila"):
+            self.assertEqual(cantidad, maxima, f"posiciones con huecos en la fila {id_espacio_fila}")
+
+    def test_retorna_varias_filas_a_la_vez(self):
+        self.estacionar(1, 1, 2, 3)
+        self.estacionar(2, 4, 5)
+        for id_vehiculo in (3, 2, 5):
+            self.apartar(id_vehiculo)
+        self.assertEqual(self.pilas(), {1: [1], 2: [4]})
+
+        self.assertEqual(self.motor_pilas.retornar(self.gestor), 3)
+        self.assertEqual(self.pilas(), {1: [1, 2, 3], 2: [4, 5]})
+        self.assertEqual(self.pendientes(), [])
+        self.verificar_motor()
+
+    def test_conserva_la_hora_de_entrada_original(self):
+        self.estacionar(1, 1, 2)
+        self.ejecutar("UPDATE Vehiculos SET hora_entrada = '2026-01-02 08:00:00' WHERE id_vehiculo = 2")
+        self.apartar(2)
+        self.assertEqual(self.motor_pilas.retornar(self.gestor), 1)
+        self.assertEqual(self.consultar("SELECT fecha_entrada FROM PilaVehiculos WHERE id_vehiculo = 2"),
+                         [('2026-01-02 08:00:00',)])
+
+    def test_solo_las_filas_indicadas(self):
+        self.estacionar(1, 1, 2)
+        self.estacionar(2, 4, 5)
+        self.apartar(2)
+        self.apartar(5)
+
+        self.assertEqual(self.motor_pilas.retornar(self.gestor, [2]), 1)
+        self.assertEqual(self.pilas(), {1: [1], 2: [4, 5]})
+        self.assertEqual(self.pendientes(), [2])
+        self.verificar_motor()
+
+    def test_fila_sin_espacio_deja_pendientes_los_que_no_caben(self):
+        self.estacionar(1, 1, 2, 3)
+        self.estacionar(2, 4, 5, 6)
+        for id_vehiculo in (3, 2, 6):
+            self.apartar(id_vehiculo)
+        self.estacionar(1, 7)  # Ocupa uno de los dos espacios que dejaron 2 y 3
+        self.estacionar(2, 8)  # Ocupa el espacio de 6
+
+        # 2 tiene la posición de origen más baja y entra; 3 y 6 no caben
+        self.assertEqual(self.motor_pilas.retornar(self.gestor), 1)
+        self.assertEqual(self.pilas(), {1: [1, 7, 2], 2: [4, 5, 8]})
+        self.assertEqual(self.pendientes(), [3, 6])
+        self.verificar_motor()
+
+        self.assertTrue(self.motor_pilas.sacar(1, 7))
+        self.assertEqual(self.motor_pilas.retornar(self.gestor), 1)
+        self.assertEqual(self.pilas(), {1: [1, 2, 3], 2: [4, 5, 8]})
+        self.assertEqual(self.pendientes(), [6])
+        self.verificar_motor()
+
+    def test_vehiculo_estacionado_en_otra_fila_no_se_retorna(self):
+        self.estacionar(1, 1, 2)
+        self.apartar(2)
+        self.estacionar(2, 2)
+
+        self.assertEqual(self.motor_pilas.retornar(self.gestor), 0)
+        self.assertEqual(self.pilas(), {1: [1], 2: [2]})
+        self.assertEqual(self.pendientes(), [2])
+        self.verificar_motor()
+
+    def test_sin_pendientes_no_retorna_nada(self):
+        self.estacionar(1, 1)
+        self.assertEqual(self.gestor.retornar_pendientes(), 0)
+        self.assertEqual(self.gestor.retornar_pendientes([]), 0)
+        self.assertEqual(self.pilas(), {1: [1]})
+
+    def test_muchas_filas_en_varios_bloques(self):
+        self.estacionar(1, 1, 2)
+        self.estacionar(2, 4, 5)
+        self.estacionar(3, 7, 8)
+        for id_vehiculo in (2, 5, 8):
+            self.apartar(id_vehiculo)
+
+        with mock.patch.object(salidas_temporales, 'en_bloques',
+                               functools.partial(base.en_bloques, tamano=2)):
+            self.assertEqual(self.motor_pilas.retornar(self.gestor, [1, 2, 3]), 3)
+        self.assertEqual(self.pilas(), {1: [1, 2], 2: [4, 5], 3: [7, 8]})
+        self.verificar_motor()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Pruebas de la unidad de trabajo: una falla capturada por un gestor revierte
+toda la solicitud, el motor de pilas se recarga al revertir y las acciones
+de fin de unidad corren en orden, después de confirmar o revertir.
+"""
+import unittest
+from app import db_config
+from app.models.lista_espera import GestorListaEspera, ListaEspera
+from app.unidad_trabajo import ejecutar_al_confirmar, ejecutar_al_revertir, ejecutar_al_terminar
+from tests.utilidades import PruebaAplicacion, PruebaSQLite
+
+FALLA_ATENDER = """CREATE TRIGGER falla_atender BEFORE UPDATE OF estado ON ListaEspera
+                   BEGIN SELECT RAISE(ABORT, 'falla de prueba'); END"""
+
+
+class PruebaAccionesUnidad(PruebaSQLite):
+    """Orden y momento de las acciones registradas en la unidad."""
+
+    def registrar_acciones(self, orden: list):
+        ejecutar_al_terminar(lambda: orden.append('terminar'))
+        ejecutar_al_revertir(lambda: orden.append('revertir'))
+        ejecutar_al_confirmar(lambda: orden.append(
+            ('confirmar', self.consultar("SELECT COUNT(*) FROM ListaEspera")[0][0])))
+
+    def test_confirmar_corre_despues_del_commit_y_antes_de_terminar(self):
+        orden = []
+        with db_config.transaccion():
+            self.assertTrue(GestorListaEspera().crear(ListaEspera(1)))
+            self.registrar_acciones(orden)
+        # La acción de confirmar ya ve la fila desde otra conexión
+        self.assertEqual(orden, [('confirmar', 1), 'terminar'])
+
+    def test_falla_capturada_revierte_toda_la_unidad(self):
+        self.ejecutar(FALLA_ATENDER)
+        gestor = GestorListaEspera()
+        orden = []
+        with db_config.transaccion() as unidad:
+            self.assertTrue(gestor.crear(ListaEspera(1)))
+            self.assertTrue(gestor.crear(ListaEspera(2)))
+            # El gestor captura el error y devuelve False
+            atendido = gestor.obtener(1)
+            atendido.estado = 'atendido'
+            self.assertFalse(gestor.actualizar(atendido))
+            self.assertTrue(unidad.fallida)
+            self.registrar_acciones(orden)
+        self.assertEqual(orden, ['revertir', 'terminar'])
+        self.assertEqual(self.consultar("SELECT COUNT(*) FROM ListaEspera"), [(0,)])
+
+    def test_excepcion_revierte_la_unidad(self):
+        orden = []
+        with self.assertRaises(RuntimeError):
+            with db_config.transaccion():
+                GestorListaEspera().crear(ListaEspera(1))
+                self.registrar_acciones(orden)
+                raise RuntimeError("falla de la vista")
+        self.assertEqual(orden, ['revertir', 'terminar'])
+        self.assertEqual(self.consultar("SELECT COUNT(*) FROM ListaEspera"), [(0,)])
+
+    def test_una_accion_que_falla_no_impide_las_demas(self):
+        orden = []
+        with db_config.transaccion():
+            ejecutar_al_confirmar(lambda: 1 / 0)
+            ejecutar_al_terminar(lambda: orden.append('terminar'))
+        self.assertEqual(orden, ['terminar'])
+
+
+class PruebaUnidadSolicitud(PruebaAplicacion):
+    """Unidad de trabajo de cada solicitud Flask."""
+
+    def setUp(self):
+        super().setUp()
+        for id_vehiculo in (1, 2, 3):
+            self.assertTrue(self.motor_pilas.estacionar(1, id_vehiculo))
+
+    def test_solicitud_confirmada(self):
+        respuesta = self.cliente.post('/fila/mover', data={'id_espacio_fila': 1, 'id_vehiculo': 3})
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(self.pilas(), {1: [1, 2]})
+        self.assertEqual(self.pilas_motor(self.motor_pilas), {1: [1, 2]})
+
+    def test_falla_capturada_revierte_la_solicitud_y_recarga_el_motor(self):
+        self.assertTrue(GestorListaEspera().crear(ListaEspera(4)))
+        self.ejecutar(FALLA_ATENDER)
+
+        # Sacar el vehículo 3 funciona; estacionar al 4 desde la espera falla
+        # al marcarlo atendido y el gestor captura el error
+        respuesta = self.cliente.post('/fila/mover', data={'id_espacio_fila': 1, 'id_vehiculo': 3})
+        self.assertEqual(respuesta.status_code, 302)
+
+        self.assertEqual(self.pilas(), {1: [1, 2, 3]})
+        self.assertEqual(self.consultar("SELECT hora_salida FROM Vehiculos WHERE id_vehiculo = 3"), [(None,)])
+        self.assertEqual(self.consultar("SELECT id_vehiculo, estado FROM ListaEspera"), [(4, 'pendiente')])
+        self.assertEqual(self.pilas_motor(self.motor_pilas), {1: [1, 2, 3]})
+        self.assertFalse(self.motor_pilas.esta_estacionado(4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+Utilidades de las pruebas que usan una base SQLite temporal.
+Cada prueba crea su propia base, le aplica las migraciones y la asigna al
+condominio predeterminado con configurar_condominio(), de modo que los
+gestores y el motor de pilas la usan a través de get_conexion().
+"""
+import atexit
+import importlib.util
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+# Antes de importar la aplicación: sin SQL Server ni hilos de fondo
+DIRECTORIO_PRUEBAS = tempfile.mkdtemp(prefix='parqueo-pruebas-')
+atexit.register(shutil.rmtree, DIRECTORIO_PRUEBAS, ignore_errors=True)
+os.environ['PARQUEO_BACKEND'] = 'sqlite'
+os.environ['PARQUEO_SQLITE_RUTA'] = os.path.join(DIRECTORIO_PRUEBAS, 'inicio.db')
+os.environ['PARQUEO_DRENADO'] = '0'
+os.environ['PARQUEO_ARCHIVADO'] = '0'
+for variable in ('PARQUEO_CONDOMINIOS', 'PARQUEO_BITACORA_DIRECTORIO',
+                 'PARQUEO_OCUPACION_COMPARTIDA', 'PARQUEO_PERFILADO'):
+    os.environ.pop(variable, None)
+
+from app import condominios, db_config
+from app.almacenamiento import BackendSQLite
+from app.models.pila_vehiculos import MotorPilas
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_aplicacion = None
+
+
+def cargar_aplicacion():
+    """
+    Importa app.py una sola vez (su nombre choca con el paquete app).
+
+    Returns:
+        module: Módulo de la aplicación Flask
+    """
+    global _aplicacion
+    if _aplicacion is None:
+        spec = importlib.util.spec_from_file_location('parqueo_app', os.path.join(RAIZ, 'app.py'))
+        _aplicacion = importlib.util.module_from_spec(spec)
+        sys.modules['parqueo_app'] = _aplicacion
+        spec.loader.exec_module(_aplicacion)
+    return _aplicacion
+
+
+class PruebaSQLite(unittest.TestCase):
+    """
+    Prueba con una base SQLite nueva: un usuario, FILAS filas de
+    CAPACIDAD vehículos y VEHICULOS vehículos sin estacionar.
+    """
+    FILAS = 3
+    CAPACIDAD = 3
+    VEHICULOS = 12
+
+    def setUp(self):
+        self.clave = condominios.predeterminado
+        self.directorio = tempfile.mkdtemp(dir=DIRECTORIO_PRUEBAS)
+        self.ruta = os.path.join(self.directorio, 'parqueo.db')
+        self.backend = BackendSQLite(self.ruta)
+        self.backend.preparar()
+        self.ejecutar("INSERT INTO Usuarios (cedula, nombre) VALUES ('1-0001-0001', 'Ana')")
+        for indice in range(1, self.FILAS + 1):
+            self.ejecutar("INSERT INTO EspaciosFila (numero_espacio, capacidad) VALUES (?, ?)",
+                          (f"F{indice:03d}", self.CAPACIDAD))
+        for indice in range(1, self.VEHICULOS + 1):
+            self.ejecutar("INSERT INTO Vehiculos (placa, marca, modelo, id_usuario) VALUES (?, 'M', 'X', 1)",
+                          (f"P{indice:04d}",))
+        self.configurar()
+
+    def tearDown(self):
+        db_config.recursos.obtener(self.clave).pool.cerrar()
+        shutil.rmtree(self.directorio, ignore_errors=True)
+
+    def configurar(self, replica=None):
+        """Asigna la base de la prueba (y opcionalmente una réplica) al condominio."""
+        db_config.configurar_condominio(self.clave, self.backend, replica=replica)
+
+    def ejecutar(self, sql: str, parametros: tuple = ()):
+        """Ejecuta y confirma una sentencia directamente sobre la base, fuera del pool."""
+        conexion = sqlite3.connect(self.ruta)
+        try:
+            conexion.execute(sql, parametros)
+            conexion.commit()
+        finally:
+            conexion.close()
+
+    def consultar(self, sql: str, parametros: tuple = ()) -> list:
+        """Devuelve las filas de una consulta hecha directamente sobre la base."""
+        conexion = sqlite3.connect(self.ruta)
+        try:
+            return conexion.execute(sql, parametros).fetchall()
+        finally:
+            conexion.close()
+
+    def pilas(self) -> dict:
+        """Devuelve los vehículos de cada fila según PilaVehiculos, del fondo al tope."""
+        pilas = {}
+        for id_espacio_fila, id_vehiculo in self.consultar(
+                "SELECT id_espacio_fila, id_vehiculo FROM PilaVehiculos ORDER BY id_espacio_fila, posicion"):
+            pilas.setdefault(id_espacio_fila, []).append(id_vehiculo)
+        return pilas
+
+    def pilas_motor(self, motor: MotorPilas) -> dict:
+        """Devuelve los vehículos de cada fila no vacía del motor, del fondo al tope."""
+        return {id_espacio_fila: list(fila.vehiculos)
+                for id_espacio_fila, fila in motor._filas.items() if fila.vehiculos}
+
+    def motor(self, **opciones) -> MotorPilas:
+        """Crea y carga un motor de pilas sobre la base de la prueba."""
+        with condominios.usar(self.clave):
+            motor = MotorPilas(**opciones)
+            self.assertTrue(motor.cargar())
+        return motor
+
+
+class PruebaAplicacion(PruebaSQLite):
+    """Prueba de la aplicación Flask con servicios nuevos sobre la base de la prueba."""
+
+    def setUp(self):
+        super().setUp()
+        self.aplicacion = cargar_aplicacion()
+        self.crear_servicios()
+        self.cliente = self.aplicacion.app.test_client()
+
+    def crear_servicios(self):
+        """Reemplaza los servicios del condominio por unos cargados desde la base de la prueba."""
+        with condominios.usar(self.clave) as condominio:
+            self.aplicacion.servicios.fijar(self.clave, self.aplicacion.crear_servicios(condominio))
+        self.motor_pilas = self.aplicacion.servicios.obtener(self.clave)['motor']